@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: .docx readers
+
+Compares the streaming reader (read_docx_plaintext_stream) with the
+python-docx reader (read_docx_plaintext_python_docx) on wall time and peak
+memory, and checks that both produce identical text.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_docx_reader.py [file.docx ...]
+    PYTHONPATH=. python benchmarks/bench_docx_reader.py --articles 5000 --tables 50
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.readers.docx_reader import read_docx_plaintext_stream, read_docx_plaintext_python_docx
+
+READERS = {
+    'stream': read_docx_plaintext_stream,
+    'python-docx': read_docx_plaintext_python_docx,
+}
+
+def make_sample_docx(file_path, articles, tables, rows_per_table=20, cols=4):
+    """
+    生成一个包含大量条文段落和附表的 .docx 样本（需要 python-docx）
+    """
+    from docx import Document
+
+    doc = Document()
+    doc.add_paragraph("中华人民共和国样本法典")
+    for i in range(1, articles + 1):
+        doc.add_paragraph(f"第{i}条 民事主体从事民事活动，应当遵循诚信原则，秉持诚实，恪守承诺。")
+    for t in range(tables):
+        table = doc.add_table(rows=rows_per_table, cols=cols)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"附表{t}-{r}-{c}"
+        # 加入横向与纵向合并单元格
+        table.cell(0, 0).merge(table.cell(0, 1))
+        table.cell(1, cols - 1).merge(table.cell(rows_per_table - 1, cols - 1))
+    doc.save(file_path)
+
+def _run_reader(reader_name, file_path, repeat):
+    """
+    在独立子进程中运行读取器，返回 (最短耗时, 峰值常驻内存 KB, 文本)
+    """
+    reader = READERS[reader_name]
+    best = None
+    text = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = reader(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024
+    return best, peak_rss, text
+
+def benchmark_file(file_path, repeat):
+    """
+    对单个文件运行所有读取器，打印结果并检查输出一致
+    """
+    size = os.path.getsize(file_path)
+    print(f"\n{file_path} ({size / 1e6:.2f} MB)")
+    texts = {}
+    for name in READERS:
+        # 每个读取器使用新的进程，使峰值内存互不影响
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            elapsed, peak_rss, text = executor.submit(_run_reader, name, file_path, repeat).result()
+        texts[name] = text
+        print(f"  {name:<12} {elapsed * 1000:10.1f} ms  {size / 1e6 / elapsed:8.2f} MB/s  "
+              f"peak RSS {peak_rss / 1024:8.1f} MB")
+
+    if len(set(texts.values())) != 1:
+        print("  WARNING: readers produced different output")
+        return False
+    print(f"  Output identical ({len(texts['stream'])} chars)")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming vs python-docx .docx readers')
+    parser.add_argument("files", nargs='*', help=".docx files to benchmark (default: generate a sample)")
+    parser.add_argument("--articles", type=int, default=3000,
+                       help="Number of article paragraphs in the generated sample (default: 3000)")
+    parser.add_argument("--tables", type=int, default=30,
+                       help="Number of tables in the generated sample (default: 30)")
+    parser.add_argument("--repeat", type=int, default=3,
+                       help="Repetitions per reader, best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    files = args.files
+    tmp_dir = None
+    if not files:
+        tmp_dir = tempfile.TemporaryDirectory()
+        sample = os.path.join(tmp_dir.name, "sample.docx")
+        print(f"Generating sample: {args.articles} articles, {args.tables} tables")
+        make_sample_docx(sample, args.articles, args.tables)
+        files = [sample]
+
+    try:
+        ok = all([benchmark_file(f, args.repeat) for f in files])
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
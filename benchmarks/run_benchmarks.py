@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark Suite
+
+Measures the throughput of the pipeline on a synthetic corpus
+(benchmarks/synthetic_corpus.py) and saves the results as JSON, so runs on
+different commits can be compared:
+
+    readers     read_docx_plaintext / read_doc_plaintext over every raw law
+    convert     convert_raw_law_to_plaintext.main() on an empty output
+                folder (cold) and again on the finished one (warm, cache hits)
+    vote        vote_selection() over generated vote files
+    graph       FactStore / MorphismStore / ReachabilityIndex: interning
+                facts, bulk-adding morphisms, the CSR adjacency, building
+                the reachability index, queries and witness paths
+
+Every benchmark runs --warmup untimed and --repeat timed rounds and reports
+the median and best wall time, CPU time of this process, docs/s and MB/s
+(input bytes). --compare flags benchmarks whose median got slower than the
+baseline by more than --tolerance.
+
+Usage:
+    PYTHONPATH=. python benchmarks/run_benchmarks.py --output results.json
+    PYTHONPATH=. python benchmarks/run_benchmarks.py --scale large --only convert,readers \\
+        --output new.json --compare results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import generate_corpus, generate_vote_files
+
+RESULTS_VERSION = 1
+# 每个规模的语料与数据参数
+SCALES = {
+    'small': {'laws': 20, 'articles': 60, 'tables': 1, 'vote_files': 30, 'vote_items': 2000,
+              'items_per_file': 300, 'facts': 5000, 'morphisms': 20000, 'queries': 20000},
+    'medium': {'laws': 100, 'articles': 120, 'tables': 2, 'vote_files': 200, 'vote_items': 20000,
+               'items_per_file': 2000, 'facts': 50000, 'morphisms': 200000, 'queries': 100000},
+    'large': {'laws': 500, 'articles': 200, 'tables': 3, 'vote_files': 1000, 'vote_items': 100000,
+              'items_per_file': 10000, 'facts': 200000, 'morphisms': 1000000, 'queries': 500000},
+}
+BENCHMARK_GROUPS = ['readers', 'convert', 'vote', 'graph']
+# 见证路径查询较慢（每次一次 BFS），只测前若干个可达的查询对
+WITNESS_QUERIES = 200
+
+def measure(run, repeat=3, warmup=1, setup=None):
+    """
+    运行 warmup 次不计时、repeat 次计时，返回 {'times', 'cpu_times', 'median', 'best', 'cpu_median'}
+    setup 在每次运行前调用（不计时），其返回值传给 run
+    """
+    for _ in range(warmup):
+        run(setup() if setup else None)
+    times, cpu_times = [], []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        run(state)
+        times.append(time.perf_counter() - wall)
+        cpu_times.append(time.process_time() - cpu)
+    return {
+        'times': [round(t, 6) for t in times],
+        'cpu_times': [round(t, 6) for t in cpu_times],
+        'median': statistics.median(times),
+        'best': min(times),
+        'cpu_median': statistics.median(cpu_times),
+    }
+
+def result(timing, items=None, item_unit='docs', input_bytes=None):
+    """
+    在计时结果上加入吞吐量（按中位数计算）
+    """
+    entry = dict(timing)
+    if items is not None:
+        entry['items'] = items
+        entry['item_unit'] = item_unit
+        entry['items_per_sec'] = items / timing['median'] if timing['median'] > 0 else None
+    if input_bytes is not None:
+        entry['bytes'] = input_bytes
+        entry['mb_per_sec'] = input_bytes / 1e6 / timing['median'] if timing['median'] > 0 else None
+    return entry
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """
+    屏蔽被测代码的标准输出（打印本身会影响计时）
+    """
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_readers(corpus, repeat, warmup, verbose=False):
+    """
+    逐个读取所有 .docx / .doc 文件
+    """
+    from utils.readers.doc_reader import read_doc_plaintext
+    from utils.readers.docx_reader import read_docx_plaintext
+
+    results, skipped = {}, {}
+    for name, reader, paths in (('read_docx_plaintext', read_docx_plaintext, corpus['docx']),
+                                ('read_doc_plaintext', read_doc_plaintext, corpus['doc'])):
+        if not paths:
+            skipped[name] = (name == 'read_doc_plaintext' and corpus['doc_skipped']) or "no files in the corpus"
+            continue
+
+        def run(_, reader=reader, paths=paths):
+            with quiet(not verbose):
+                for path in paths:
+                    reader(path)
+
+        timing = measure(run, repeat, warmup)
+        results[name] = result(timing, len(paths), 'docs', sum(os.path.getsize(path) for path in paths))
+    return results, skipped
+
+def bench_convert(corpus, repeat, warmup, workers=1, verbose=False):
+    """
+    完整运行 convert_raw_law_to_plaintext.main()：冷启动（空输出目录）和热启动（转换缓存全部命中）
+    """
+    from scripts import convert_raw_law_to_plaintext
+
+    work_dir = tempfile.mkdtemp(prefix="bench_convert_")
+    output_folder = os.path.join(work_dir, "law_text")
+    argv = ["convert_raw_law_to_plaintext.py",
+            "--file_titles_selected_laws", corpus['titles_file'],
+            "--raw_laws_folder", corpus['raw_laws_folder'],
+            "--output_folder", output_folder,
+            "--output_merged_file",
+            "--workers", str(workers)]
+
+    def run(_):
+        saved_argv = sys.argv
+        sys.argv = argv
+        try:
+            with quiet(not verbose):
+                convert_raw_law_to_plaintext.main()
+        finally:
+            sys.argv = saved_argv
+
+    def clean():
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+    docs = len(corpus['docx']) + len(corpus['doc'])
+    try:
+        results = {'convert_cold': result(measure(run, repeat, warmup, setup=clean), docs, 'docs', corpus['bytes'])}
+        run(None)
+        results['convert_warm'] = result(measure(run, repeat, warmup), docs, 'docs', corpus['bytes'])
+        results['convert_cold']['workers'] = results['convert_warm']['workers'] = workers
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results, {}
+
+def bench_vote(vote_paths, repeat, warmup, workers=8, verbose=False):
+    """
+    对生成的投票文件运行 vote_selection()
+    """
+    from scripts.vote_items import vote_selection
+
+    def run(_):
+        with quiet(not verbose):
+            vote_selection(vote_paths, ratio=2/3, workers=workers)
+
+    timing = measure(run, repeat, warmup)
+    entry = result(timing, len(vote_paths), 'files', sum(os.path.getsize(path) for path in vote_paths))
+    entry['workers'] = workers
+    return {'vote_selection': entry}, {}
+
+def bench_graph(facts, morphisms, queries, repeat, warmup, seed=1):
+    """
+    事实/态射图的操作：事实驻留、批量加入态射、邻接表、可达性索引的构建与查询、见证路径
+    随机图的边大多指向编号稍大的事实，另有 1% 的回边形成强连通分量
+    """
+    from utils.category.facts import FactStore
+    from utils.category.morphisms import MorphismStore
+    from utils.category.reachability import ReachabilityIndex
+
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, facts, size=morphisms)
+    offsets = rng.integers(1, max(2, facts // 50), size=morphisms)
+    targets = np.minimum(sources + offsets, facts - 1)
+    back = rng.random(morphisms) < 0.01
+    targets[back] = np.maximum(sources[back] - offsets[back], 0)
+    pairs = rng.integers(0, facts, size=(queries, 2)).tolist()
+    results = {}
+
+    def build_facts(_):
+        store = FactStore()
+        for i in range(facts):
+            store.parameter(f"S{i}")
+        return store
+
+    results['fact_parameters'] = result(measure(build_facts, repeat, warmup), facts, 'facts')
+    fact_store = build_facts(None)
+
+    def add_morphisms(_):
+        store = MorphismStore(fact_store)
+        store.add_morphisms(sources, targets)
+        return store
+
+    results['add_morphisms'] = result(measure(add_morphisms, repeat, warmup), morphisms, 'morphisms')
+    store = add_morphisms(None)
+
+    def adjacency(_):
+        store._adjacency = None
+        store.adjacency()
+
+    results['adjacency'] = result(measure(adjacency, repeat, warmup), morphisms, 'morphisms')
+    results['reachability_build'] = result(measure(lambda _: ReachabilityIndex(store), repeat, warmup),
+                                           morphisms, 'morphisms')
+    index = ReachabilityIndex(store)
+
+    def query(_):
+        reachable = index.reachable
+        for source, target in pairs:
+            reachable(source, target)
+
+    results['reachability_query'] = result(measure(query, repeat, warmup), queries, 'queries')
+
+    reachable_pairs = [(source, target) for source, target in pairs[:WITNESS_QUERIES] if index.reachable(source, target)]
+
+    def witness(_):
+        for source, target in reachable_pairs:
+            index.witness(source, target)
+
+    if reachable_pairs:
+        results['reachability_witness'] = result(measure(witness, repeat, warmup), len(reachable_pairs), 'paths')
+    return results, {}
+
+def git_revision():
+    """
+    返回 {'commit', 'dirty'}；不在 git 仓库中时返回 None
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {'commit': commit, 'dirty': bool(status.strip())}
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+
+def compare_results(current, baseline, tolerance):
+    """
+    按中位数（有条目数时为每个条目的中位耗时）比较两次运行的结果，返回 [(名称, 基准中位数, 当前中位数, 比值, 状态)] 和是否有性能退化
+    比值 > 1 + tolerance 为 REGRESSION，< 1 - tolerance 为 faster
+    """
+    rows = []
+    regressed = False
+    for name, entry in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            rows.append((name, None, entry['median'], None, "new"))
+            continue
+        # 数据量不同时按单位时间比较
+        new_cost = entry['median'] / entry['items'] if entry.get('items') else entry['median']
+        old_cost = old['median'] / old['items'] if old.get('items') else old['median']
+        ratio = new_cost / old_cost if old_cost > 0 else float('inf')
+        if ratio > 1 + tolerance:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, old['median'], entry['median'], ratio, status))
+    for name in baseline.get('results', {}):
+        if name not in current['results']:
+            rows.append((name, baseline['results'][name]['median'], None, None, "missing"))
+    return rows, regressed
+
+def print_results(results, skipped):
+    print(f"\n{'benchmark':<24} {'median':>10} {'best':>10} {'throughput':>22} {'MB/s':>9}")
+    for name, entry in results.items():
+        throughput = (f"{entry['items_per_sec']:.1f} {entry['item_unit']}/s"
+                      if entry.get('items_per_sec') is not None else "")
+        mb_per_sec = f"{entry['mb_per_sec']:.2f}" if entry.get('mb_per_sec') is not None else ""
+        print(f"{name:<24} {entry['median'] * 1000:8.1f}ms {entry['best'] * 1000:8.1f}ms "
+              f"{throughput:>22} {mb_per_sec:>9}")
+    for name, reason in skipped.items():
+        print(f"{name:<24} skipped: {reason}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the throughput benchmark suite on a synthetic corpus")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small",
+                       help="Corpus and graph size preset (default: small)")
+    parser.add_argument("--only", type=str, default=None,
+                       help=f"Comma-separated benchmark groups to run: {', '.join(BENCHMARK_GROUPS)} (default: all)")
+    parser.add_argument("--laws", type=int, default=None, help="Override the number of laws")
+    parser.add_argument("--articles", type=int, default=None, help="Override the average articles per law")
+    parser.add_argument("--tables", type=int, default=None, help="Override the annex tables per law")
+    parser.add_argument("--cjk_ratio", type=float, default=0.95,
+                       help="Share of CJK phrases in the generated text (default: 0.95)")
+    parser.add_argument("--doc_fraction", type=float, default=0.25,
+                       help="Share of laws saved as .doc when LibreOffice is installed (default: 0.25)")
+    parser.add_argument("--corpus", type=str, default=None,
+                       help="Folder to generate (or reuse) the corpus in (default: a temporary folder)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="--workers passed to the conversion (default: 1)")
+    parser.add_argument("--vote_workers", type=int, default=8,
+                       help="Reader threads for vote_selection (default: 8)")
+    parser.add_argument("--repeat", type=int, default=3,
+                       help="Timed rounds per benchmark; the median is reported (default: 3)")
+    parser.add_argument("--warmup", type=int, default=1,
+                       help="Untimed rounds before timing (default: 1)")
+    parser.add_argument("--seed", type=int, default=1,
+                       help="Random seed of the synthetic data (default: 1)")
+    parser.add_argument("--output", type=str, default=None,
+                       help="Write the results as JSON to this file")
+    parser.add_argument("--compare", type=str, default=None,
+                       help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                       help="Relative slowdown of the median reported as a regression (default: 0.10)")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Do not silence the output of the benchmarked code")
+    args = parser.parse_args()
+
+    groups = BENCHMARK_GROUPS if not args.only else [group.strip() for group in args.only.split(',')]
+    unknown = [group for group in groups if group not in BENCHMARK_GROUPS]
+    if unknown:
+        parser.error(f"Unknown benchmark group: {', '.join(unknown)}")
+    parameters = dict(SCALES[args.scale])
+    for key in ('laws', 'articles', 'tables'):
+        if getattr(args, key) is not None:
+            parameters[key] = getattr(args, key)
+    parameters.update({'scale': args.scale, 'cjk_ratio': args.cjk_ratio, 'doc_fraction': args.doc_fraction,
+                       'seed': args.seed, 'repeat': args.repeat, 'warmup': args.warmup})
+
+    print("=" * 60)
+    print("Benchmark Suite")
+    print("=" * 60)
+
+    tmp_dir = None
+    corpus_dir = args.corpus
+    if corpus_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="bench_corpus_")
+        corpus_dir = tmp_dir.name
+    results, skipped = {}, {}
+    try:
+        corpus = None
+        if 'readers' in groups or 'convert' in groups:
+            start = time.time()
+            corpus_params = os.path.join(corpus_dir, "corpus.json")
+            wanted = {key: parameters[key] for key in ('laws', 'articles', 'tables', 'cjk_ratio', 'doc_fraction', 'seed')}
+            try:
+                with open(corpus_params, 'r', encoding='utf-8') as f:
+                    corpus = json.load(f)
+                if corpus.get('parameters') != wanted:
+                    corpus = None
+            except (OSError, ValueError):
+                corpus = None
+            if corpus is None:
+                shutil.rmtree(os.path.join(corpus_dir, "raw_laws"), ignore_errors=True)
+                corpus = generate_corpus(corpus_dir, parameters['laws'], parameters['articles'], parameters['tables'],
+                                         args.cjk_ratio, args.seed, args.doc_fraction)
+                corpus['parameters'] = wanted
+                with open(corpus_params, 'w', encoding='utf-8') as f:
+                    json.dump(corpus, f, ensure_ascii=False)
+                print(f"Generated corpus in {time.time() - start:.1f}s: ", end="")
+            else:
+                print("Reusing corpus: ", end="")
+            print(f"{len(corpus['docx'])} .docx, {len(corpus['doc'])} .doc, {corpus['bytes'] / 1e6:.2f} MB")
+            if corpus['doc_skipped']:
+                print(f"Warning: No .doc fixtures: {corpus['doc_skipped']}")
+            parameters['corpus_bytes'] = corpus['bytes']
+
+        for group in groups:
+            print(f"Running {group}...")
+            if group == 'readers':
+                group_results, group_skipped = bench_readers(corpus, args.repeat, args.warmup, args.verbose)
+            elif group == 'convert':
+                group_results, group_skipped = bench_convert(corpus, args.repeat, args.warmup, args.workers,
+                                                             args.verbose)
+            elif group == 'vote':
+                vote_paths = generate_vote_files(os.path.join(corpus_dir, "votes"), parameters['vote_files'],
+                                                 parameters['vote_items'], parameters['items_per_file'], args.seed)
+                group_results, group_skipped = bench_vote(vote_paths, args.repeat, args.warmup, args.vote_workers,
+                                                          args.verbose)
+            else:
+                group_results, group_skipped = bench_graph(parameters['facts'], parameters['morphisms'],
+                                                           parameters['queries'], args.repeat, args.warmup, args.seed)
+            results.update(group_results)
+            skipped.update(group_skipped)
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    report = {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git': git_revision(),
+        'environment': environment(),
+        'parameters': parameters,
+        'results': results,
+        'skipped': skipped,
+    }
+    print_results(results, skipped)
+
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        tmp_path = args.output + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, args.output)
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        baseline_commit = (baseline.get('git') or {}).get('commit', 'unknown')
+        print(f"\nCompared with {args.compare} (commit {baseline_commit[:12]}, tolerance {args.tolerance:.0%})")
+        if baseline.get('parameters') != parameters:
+            print("Warning: Benchmark parameters differ from the baseline")
+        if baseline.get('environment') != report['environment']:
+            print("Warning: Baseline was measured in a different environment")
+        rows, regressed = compare_results(report, baseline, args.tolerance)
+        for name, old, new, ratio, status in rows:
+            old_text = f"{old * 1000:.1f}ms" if old is not None else "-"
+            new_text = f"{new * 1000:.1f}ms" if new is not None else "-"
+            ratio_text = f"x{ratio:.2f}" if ratio is not None else ""
+            print(f"  {name:<24} {old_text:>10} -> {new_text:>10} {ratio_text:>7}  {status}")
+        sys.exit(1 if regressed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic Legal Corpus
+
+Generates a reproducible corpus shaped like raw_laws_folder for the
+benchmark suite (benchmarks/run_benchmarks.py): .docx laws written with
+python-docx (title, chapters, numbered articles citing other laws, and
+annex tables), a titles file for convert_raw_law_to_plaintext.py, and
+vote files for vote_items.py.
+
+Size, table density and the share of CJK text are configurable; the same
+seed always produces the same text. .doc copies are made with LibreOffice
+(soffice --convert-to doc) when it is installed, since nothing in Python
+writes Word 97 files.
+
+Usage:
+    PYTHONPATH=. python benchmarks/synthetic_corpus.py --output ./bench_corpus \\
+        --laws 200 --articles 120 --tables 2 --cjk_ratio 0.95 --doc_fraction 0.25
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+
+from utils.readers.external_tools import tool_path
+
+DIGITS = "零一二三四五六七八九"
+CHAPTER_SIZE = 20
+# 生成条文用的词汇
+SUBJECTS = ["民事主体", "当事人", "债权人", "债务人", "出卖人", "买受人", "出租人", "承租人", "监护人",
+            "行政机关", "人民法院", "物权人", "抵押权人", "继承人", "受托人", "用人单位"]
+VERBS = ["应当", "可以", "不得", "有权", "依法", "按照约定"]
+ACTIONS = ["履行合同义务", "请求损害赔偿", "行使撤销权", "办理登记手续", "承担连带责任", "返还不当得利",
+           "支付违约金", "通知对方当事人", "采取补救措施", "提出书面异议", "保护合法权益", "遵循诚信原则"]
+CONDITIONS = ["在合理期限内", "自知道或者应当知道之日起", "经双方协商一致", "除法律另有规定外",
+              "因不可抗力不能履行的", "违反法律、行政法规的强制性规定的"]
+LATIN_WORDS = ["contract", "party", "damages", "liability", "property", "article", "section",
+               "obligation", "court", "registration", "ISO", "2021", "No.", "EUR", "USD"]
+LAW_NAMES = ["民法典", "合同法", "物权法", "担保法", "公司法", "劳动合同法", "行政许可法", "著作权法",
+             "专利法", "商标法", "消费者权益保护法", "侵权责任法", "证券法", "票据法", "保险法", "破产法"]
+
+def _chinese_below_10000(n):
+    units = ["", "十", "百", "千"]
+    digits = [int(d) for d in str(n)]
+    parts = []
+    zero = False
+    for i, d in enumerate(digits):
+        if d == 0:
+            zero = True
+            continue
+        if zero and parts:
+            parts.append("零")
+        zero = False
+        parts.append(DIGITS[d] + units[len(digits) - 1 - i])
+    return "".join(parts)
+
+def chinese_number(n):
+    """
+    把正整数写成中文数字（1 -> 一，12 -> 十二，105 -> 一百零五），用于条、章的编号
+    """
+    if n <= 0:
+        raise ValueError(f"Expected a positive integer: {n}")
+    high, low = divmod(n, 10000)
+    if high:
+        text = chinese_number(high) + "万" + (("零" if low < 1000 else "") + _chinese_below_10000(low) if low else "")
+    else:
+        text = _chinese_below_10000(low)
+    # 十一 而不是 一十一
+    return text[1:] if text.startswith("一十") else text
+
+class LawTextGenerator:
+    """
+    按种子生成可重复的法律条文；cjk_ratio 为句子中中文词的比例，其余为拉丁字母词和数字
+    """
+
+    def __init__(self, seed=1, cjk_ratio=0.95, titles=None):
+        self.random = random.Random(seed)
+        self.cjk_ratio = cjk_ratio
+        self.titles = titles or [f"中华人民共和国{name}" for name in LAW_NAMES]
+
+    def _phrase(self, words):
+        if self.random.random() < self.cjk_ratio:
+            return self.random.choice(words)
+        return " " + " ".join(self.random.choices(LATIN_WORDS, k=self.random.randint(1, 3))) + " "
+
+    def sentence(self):
+        parts = [self._phrase(CONDITIONS), "，", self._phrase(SUBJECTS), self._phrase(VERBS), self._phrase(ACTIONS)]
+        if self.random.random() < 0.15:
+            # 引用其他法律的条文，使引文抽取有内容可扫描
+            parts.append(f"，适用《{self.random.choice(self.titles)}》第{chinese_number(self.random.randint(1, 300))}条的规定")
+        return "".join(parts) + "。"
+
+    def article(self, number, sentences=3):
+        body = "".join(self.sentence() for _ in range(max(1, self.random.randint(1, 2 * sentences - 1))))
+        return f"第{chinese_number(number)}条 {body}"
+
+def make_law_docx(file_path, title, generator, articles=100, tables=0, rows_per_table=12, cols=4,
+                  sentences=3):
+    """
+    用 python-docx 生成一部法律：标题、每 CHAPTER_SIZE 条一章、编号条文，以及 tables 个附表
+    附表插在条文之间，并含有横向和纵向合并的单元格
+    """
+    from docx import Document
+
+    doc = Document()
+    doc.add_paragraph(title)
+    # 第 t 个附表紧跟在第 table_after[t] 条之后
+    table_after = [max(1, round((t + 1) * articles / (tables + 1))) for t in range(tables)]
+    table_count = 0
+    for i in range(1, articles + 1):
+        if (i - 1) % CHAPTER_SIZE == 0:
+            doc.add_paragraph(f"第{chinese_number((i - 1) // CHAPTER_SIZE + 1)}章 {generator.random.choice(ACTIONS)}")
+        doc.add_paragraph(generator.article(i, sentences))
+        while table_count < tables and table_after[table_count] == i:
+            table = doc.add_table(rows=rows_per_table, cols=cols)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"附表{table_count + 1}-{r}-{c} {generator.random.choice(SUBJECTS)}"
+            if rows_per_table > 1 and cols > 1:
+                table.cell(0, 0).merge(table.cell(0, 1))
+                table.cell(1, cols - 1).merge(table.cell(rows_per_table - 1, cols - 1))
+            table_count += 1
+    doc.save(file_path)
+
+def doc_converter():
+    """
+    返回可以把 .docx 转换为 .doc 的 LibreOffice 可执行文件路径，未安装时返回 None
+    """
+    for name in ("soffice", "libreoffice"):
+        path = tool_path(name)
+        if path:
+            return path
+    return None
+
+def convert_to_doc(docx_paths, output_dir, timeout=600):
+    """
+    用 LibreOffice 批量把 .docx 转换为 .doc，返回生成的 .doc 路径列表
+    没有 LibreOffice 时返回 None；单个文件转换失败时跳过
+    """
+    converter = doc_converter()
+    if converter is None:
+        return None
+    if not docx_paths:
+        return []
+    # 转换到临时目录，避免与同名的 .docx 混在一起之前就被索引
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            subprocess.run([converter, "--headless", "--convert-to", "doc", "--outdir", tmp_dir] + list(docx_paths),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout, check=False)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Warning: .doc conversion failed: {e}")
+            return []
+        doc_paths = []
+        for docx_path in docx_paths:
+            name = os.path.splitext(os.path.basename(docx_path))[0] + ".doc"
+            converted = os.path.join(tmp_dir, name)
+            if os.path.exists(converted):
+                target = os.path.join(output_dir, name)
+                shutil.move(converted, target)
+                doc_paths.append(target)
+    return doc_paths
+
+def generate_corpus(output_dir, laws=50, articles=100, tables=1, cjk_ratio=0.95, seed=1,
+                    doc_fraction=0.0, rows_per_table=12, sentences=3):
+    """
+    在 output_dir 中生成语料：raw_laws/ 下的法律文件和 titles.txt
+    每部法律的条数在 articles 的 50%-150% 之间随机；doc_fraction 比例的法律另存为 .doc
+    （替换 .docx，需要 LibreOffice）
+    返回 {'raw_laws_folder', 'titles_file', 'titles', 'docx', 'doc', 'bytes', 'doc_skipped'}
+    """
+    rng = random.Random(seed)
+    raw_dir = os.path.join(output_dir, "raw_laws")
+    os.makedirs(raw_dir, exist_ok=True)
+    titles = [f"中华人民共和国{LAW_NAMES[i % len(LAW_NAMES)]}（样本{i + 1}）" for i in range(laws)]
+    generator = LawTextGenerator(seed, cjk_ratio, titles)
+
+    docx_paths = []
+    for title in titles:
+        path = os.path.join(raw_dir, title + ".docx")
+        law_articles = max(1, int(articles * rng.uniform(0.5, 1.5)))
+        make_law_docx(path, title, generator, law_articles, tables, rows_per_table, sentences=sentences)
+        docx_paths.append(path)
+
+    doc_paths = []
+    doc_skipped = None
+    doc_count = int(round(laws * doc_fraction))
+    if doc_count:
+        chosen = sorted(rng.sample(range(laws), doc_count))
+        doc_paths = convert_to_doc([docx_paths[i] for i in chosen], raw_dir)
+        if doc_paths is None:
+            doc_paths = []
+            doc_skipped = "LibreOffice (soffice) not installed"
+        else:
+            # 转换成功的法律只保留 .doc，使转换流程走 .doc 读取器
+            converted = {os.path.splitext(os.path.basename(path))[0] for path in doc_paths}
+            for path in list(docx_paths):
+                if os.path.splitext(os.path.basename(path))[0] in converted:
+                    os.remove(path)
+                    docx_paths.remove(path)
+
+    titles_file = os.path.join(output_dir, "titles.txt")
+    with open(titles_file, 'w', encoding='utf-8') as f:
+        f.write("# Synthetic benchmark corpus\n")
+        f.write("\n".join(titles) + "\n")
+
+    return {
+        'raw_laws_folder': raw_dir,
+        'titles_file': titles_file,
+        'titles': titles,
+        'docx': docx_paths,
+        'doc': doc_paths,
+        'bytes': sum(os.path.getsize(path) for path in docx_paths + doc_paths),
+        'doc_skipped': doc_skipped,
+    }
+
+def generate_vote_files(output_dir, files=100, items=5000, items_per_file=1000, seed=1):
+    """
+    生成 files 个投票文件，每个文件列出 items_per_file 个条目（每行一个）
+    条目的受欢迎程度服从类 Zipf 分布，使票数分布接近真实的标注结果；返回文件路径列表
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    population = [f"法律条目{i:06d}" for i in range(items)]
+    popularity = [1.0 / (rank + 1) ** 0.8 for rank in range(items)]
+    paths = []
+    for n in range(files):
+        chosen = set()
+        target = min(items_per_file, items)
+        while len(chosen) < target:
+            chosen.update(rng.choices(range(items), weights=popularity, k=target - len(chosen)))
+        path = os.path.join(output_dir, f"votes_{n:05d}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(population[i] for i in sorted(chosen)) + "\n")
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic legal corpus for the benchmark suite")
+    parser.add_argument("--output", required=True, type=str,
+                       help="Folder to write raw_laws/, titles.txt and votes/ into")
+    parser.add_argument("--laws", type=int, default=50,
+                       help="Number of laws (default: 50)")
+    parser.add_argument("--articles", type=int, default=100,
+                       help="Average number of articles per law (default: 100)")
+    parser.add_argument("--tables", type=int, default=1,
+                       help="Annex tables per law (default: 1)")
+    parser.add_argument("--cjk_ratio", type=float, default=0.95,
+                       help="Share of CJK phrases in the article text, 0-1 (default: 0.95)")
+    parser.add_argument("--doc_fraction", type=float, default=0.0,
+                       help="Share of laws saved as .doc instead of .docx; needs LibreOffice (default: 0)")
+    parser.add_argument("--vote_files", type=int, default=0,
+                       help="Also generate this many vote files under votes/ (default: 0)")
+    parser.add_argument("--seed", type=int, default=1,
+                       help="Random seed (default: 1)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Generating Synthetic Legal Corpus")
+    print("=" * 60)
+    corpus = generate_corpus(args.output, args.laws, args.articles, args.tables, args.cjk_ratio, args.seed,
+                             args.doc_fraction)
+    print(f"Laws: {len(corpus['docx'])} .docx, {len(corpus['doc'])} .doc "
+          f"({corpus['bytes'] / 1e6:.2f} MB) in {corpus['raw_laws_folder']}")
+    if corpus['doc_skipped']:
+        print(f"Warning: No .doc fixtures: {corpus['doc_skipped']}")
+    print(f"Titles: {corpus['titles_file']}")
+    if args.vote_files:
+        paths = generate_vote_files(os.path.join(args.output, "votes"), args.vote_files, seed=args.seed)
+        print(f"Vote files: {len(paths)} in {os.path.dirname(paths[0])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Law Text Index Builder
+
+Builds (or incrementally updates) the article-level bigram index over the
+output folder of scripts/convert_raw_law_to_plaintext.py, using its
+conversion manifest to find laws whose text changed, and optionally runs
+queries against it.
+
+Usage:
+    python scripts/build_text_index.py --output_folder ./data/law_text
+    python scripts/build_text_index.py --output_folder ./data/law_text \\
+        --query '所有权 OR 债权' --query '"善意第三人" NOT 动产'
+"""
+
+import argparse
+import json
+import os
+import time
+
+from utils.corpus.text_index import TextIndex
+
+MANIFEST_FILENAME = "conversion_manifest.json"
+INDEX_FILENAME = "text_index.npz"
+
+def load_manifest(output_folder):
+    """
+    读取转换清单 {源文件路径: 条目}
+    """
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('entries', {})
+    except (OSError, ValueError) as e:
+        raise Exception(f"Cannot read conversion manifest {manifest_path} "
+                        f"(run convert_raw_law_to_plaintext.py first): {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the article-level law text index")
+    parser.add_argument("--output_folder", required=False, type=str, default="./data/law_text",
+                       help="Output folder of convert_raw_law_to_plaintext.py (default: ./data/law_text)")
+    parser.add_argument("--index", required=False, type=str, default=None,
+                       help=f"Index file (default: <output_folder>/{INDEX_FILENAME})")
+    parser.add_argument("--rebuild", action="store_true",
+                       help="Discard the existing index and index every law again")
+    parser.add_argument("--compact", action="store_true",
+                       help="Remove deleted articles from the postings before saving")
+    parser.add_argument("--query", required=False, type=str, action="append", default=[],
+                       help="Query to run after updating the index (can be repeated)")
+    parser.add_argument("--limit", required=False, type=int, default=20,
+                       help="Maximum number of hits printed per query (default: 20)")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Print every added, updated and removed law")
+
+    args = parser.parse_args()
+    index_path = args.index or os.path.join(args.output_folder, INDEX_FILENAME)
+
+    print("=" * 60)
+    print("Building Law Text Index")
+    print("=" * 60)
+
+    start = time.time()
+    index = TextIndex(index_path) if args.rebuild else TextIndex.load(index_path)
+
+    def on_law(title, status, doc_count):
+        if args.verbose:
+            print(f"  {status}: {title} ({doc_count} articles)")
+
+    changes = index.sync(load_manifest(args.output_folder), args.output_folder, on_law=on_law)
+    if args.compact:
+        index.compact()
+    if changes['added'] or changes['updated'] or changes['removed'] or args.compact or args.rebuild:
+        index.save()
+    print(f"Laws: {changes['kept']} unchanged, {changes['added']} added, "
+          f"{changes['updated']} updated, {changes['removed']} removed, {changes['missing']} missing")
+    print(f"Indexed {index.law_count} laws, {index.doc_count} articles, {len(index.postings)} terms "
+          f"in {index_path} ({time.time() - start:.2f}s)")
+
+    for query in args.query:
+        start = time.time()
+        try:
+            doc_ids = index.search(query)
+        except ValueError as e:
+            print(f"\nQuery {query}: {e}")
+            continue
+        hits = index.hits(doc_ids[:args.limit].tolist())
+        print(f"\nQuery {query}: {len(doc_ids)} articles in "
+              f"{len(set(index.doc_laws[doc_id] for doc_id in doc_ids.tolist()))} laws "
+              f"({(time.time() - start) * 1000:.1f}ms)")
+        for title, label in hits:
+            print(f"  {title} {label}")
+        if len(doc_ids) > args.limit:
+            print(f"  ... {len(doc_ids) - args.limit} more")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Category Law Checker
+
+Checks the Identity and Associativity axioms of
+formal_validation/legal_core.v on a finite composition table and reports
+every counterexample.
+
+The table is either a directory of .npy files (see
+utils/category/law_checker.py) or is built from the same transitions
+JSONL that scripts/check_coq_obligations.py reads (the transition graph
+must be acyclic, otherwise the category of paths is infinite).
+
+Usage:
+    python scripts/check_category_laws.py --table ./table_dir --workers 8 \\
+        --counterexamples counterexamples.jsonl
+    python scripts/check_category_laws.py --transitions transitions.jsonl --save_table ./table_dir
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from utils.category.coq_obligations import load_transition_system, read_jsonl
+from utils.category.law_checker import (check_associativity, check_identity, check_typing, load_table,
+                                        save_table, table_from_store)
+
+TYPING_KINDS = ['missing composite', 'composite of non-composable pair', 'composite has wrong endpoints',
+                'composite id out of range']
+IDENTITY_SIDES = ['identity has wrong endpoints', 'Compose (Identity A) f != f', 'Compose f (Identity B) != f']
+
+def main():
+    parser = argparse.ArgumentParser(description="Check identity and associativity of a composition table")
+    parser.add_argument("--table", required=False, type=str, default=None,
+                       help="Folder with sources.npy, targets.npy, identities.npy and compose.npy")
+    parser.add_argument("--transitions", required=False, type=str, default=None,
+                       help="Build the table from a JSONL file of transitions: {label, source, target}")
+    parser.add_argument("--save_table", required=False, type=str, default=None,
+                       help="Folder to write the table built from --transitions (default: a folder next to it)")
+    parser.add_argument("--workers", required=False, type=int, default=None,
+                       help="Number of worker processes for associativity (default: CPU count, 1 = no pool)")
+    parser.add_argument("--block_elements", required=False, type=int, default=1 << 22,
+                       help="Maximum number of triples compared in one block (default: 4194304)")
+    parser.add_argument("--counterexamples", required=False, type=str, default=None,
+                       help="Write every counterexample to this JSONL file")
+    parser.add_argument("--max_print", required=False, type=int, default=20,
+                       help="Maximum number of counterexamples printed (default: 20)")
+
+    args = parser.parse_args()
+    if (args.table is None) == (args.transitions is None):
+        parser.error("exactly one of --table and --transitions is required")
+
+    print("=" * 60)
+    print("Checking Category Laws")
+    print("=" * 60)
+
+    table_dir = args.table
+    if args.transitions is not None:
+        try:
+            facts, morphisms = load_transition_system(read_jsonl(args.transitions))
+            sources, targets, identities, compose, _ = table_from_store(morphisms, range(len(facts)))
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        table_dir = args.save_table or args.transitions + '.table'
+        save_table(table_dir, sources, targets, identities, compose)
+        print(f"Built table from {args.transitions}: saved to {table_dir}")
+
+    table = load_table(table_dir)
+    print(f"Objects: {len(table['identities'])}, morphisms: {len(table['sources'])}")
+
+    out = open(args.counterexamples, 'w', encoding='utf-8') if args.counterexamples else None
+    printed = 0
+
+    def report(record):
+        nonlocal printed
+        if out is not None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if printed < args.max_print:
+            print(f"  - {record}")
+            printed += 1
+
+    try:
+        start = time.time()
+        typing_count = 0
+        n = len(table['sources'])
+        # 按行分块，每块最多约 block_elements 个元素
+        rows_per_chunk = max(1, args.block_elements // max(1, n))
+        for row in range(0, n, rows_per_chunk):
+            for kind, f, g, actual in check_typing(table, np.arange(row, min(n, row + rows_per_chunk))).tolist():
+                typing_count += 1
+                report({'law': 'typing', 'problem': TYPING_KINDS[kind], 'f': f, 'g': g, 'compose': actual})
+        print(f"Typing: {typing_count} violations ({time.time() - start:.2f}s)")
+
+        start = time.time()
+        identity_count = 0
+        for side, f, identity, actual in check_identity(table).tolist():
+            identity_count += 1
+            report({'law': 'identity', 'problem': IDENTITY_SIDES[side], 'f': f, 'identity': identity,
+                    'compose': actual})
+        print(f"Identity: {identity_count} violations ({time.time() - start:.2f}s)")
+
+        def on_block(violations):
+            for f, g, h, left, right in violations.tolist():
+                report({'law': 'associativity', 'f': f, 'g': g, 'h': h,
+                        'compose_fg_h': left, 'compose_f_gh': right})
+
+        start = time.time()
+        associativity_count, triples = check_associativity(table_dir, workers=args.workers,
+                                                           block_elements=args.block_elements,
+                                                           on_block=on_block)
+        print(f"Associativity: {associativity_count} violations in {triples} composable triples "
+              f"({time.time() - start:.2f}s)")
+    finally:
+        if out is not None:
+            out.close()
+
+    total = typing_count + identity_count + associativity_count
+    if printed < total:
+        print(f"  ... {total - printed} more counterexamples not printed")
+    if args.counterexamples:
+        print(f"Counterexamples saved to {args.counterexamples}")
+    print("=" * 60)
+    print("All laws hold" if total == 0 else f"Found {total} counterexamples")
+    if total:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
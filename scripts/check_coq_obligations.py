@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Coq Obligation Checker
+
+Generates Coq reachability theorems (in the style of
+formal_validation/example.v) from extracted legal transitions and checks
+them with coqc in parallel.
+
+Input files are JSONL:
+    --transitions  {"label": "Law_Purchase", "source": "Unowned", "target": "Owned"}
+    --claims       {"name": "validation_reachability", "source": "Unowned", "target": "Disputed"}
+
+Usage:
+    python scripts/check_coq_obligations.py --transitions transitions.jsonl \\
+        --claims claims.jsonl --output_dir ./formal_validation/generated --workers 8
+"""
+
+import argparse
+import json
+import os
+
+from utils.category.coq_obligations import (DEFAULT_TIMEOUT, check_obligations, generate_obligations,
+                                            load_transition_system, read_jsonl)
+from utils.readers.external_tools import tool_available
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and check Coq reachability obligations")
+    parser.add_argument("--transitions", required=True, type=str,
+                       help="JSONL file of transitions: {label, source, target}")
+    parser.add_argument("--claims", required=True, type=str,
+                       help="JSONL file of reachability claims: {name, source, target}")
+    parser.add_argument("--output_dir", required=False, type=str, default="./formal_validation/generated",
+                       help="Folder for the generated .v files, cache and report")
+    parser.add_argument("--shards", required=False, type=int, default=16,
+                       help="Number of generated obligation files (default: 16)")
+    parser.add_argument("--workers", required=False, type=int, default=4,
+                       help="Number of coqc processes run in parallel (default: 4)")
+    parser.add_argument("--timeout", required=False, type=float, default=DEFAULT_TIMEOUT,
+                       help=f"Per-file coqc timeout in seconds (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-check every shard, ignoring cached results")
+    parser.add_argument("--generate_only", action="store_true",
+                       help="Only write the .v files, do not run coqc")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Print coqc output of failed shards")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Generating Coq Proof Obligations")
+    print("=" * 60)
+
+    facts, morphisms = load_transition_system(read_jsonl(args.transitions))
+    claims = list(read_jsonl(args.claims))
+    shards, unprovable = generate_obligations(facts, morphisms, claims, args.output_dir, max(1, args.shards))
+    theorem_count = sum(len(shard['theorems']) for shard in shards)
+    print(f"States: {len(facts)}, transitions: {morphisms.base_count}")
+    print(f"Generated {theorem_count} theorems in {len(shards)} files under {args.output_dir}")
+    if unprovable:
+        print(f"Unprovable claims (no transition path): {len(unprovable)}")
+        for claim in unprovable:
+            print(f"  - {claim['name']}: {claim['source']} -> {claim['target']}")
+
+    if args.generate_only:
+        return
+    if not tool_available('coqc'):
+        print("ERROR: coqc not installed. Please install Coq (e.g. opam install coq), "
+              "or use --generate_only to only write the .v files")
+        exit(1)
+
+    def on_result(shard, result):
+        cached = " (cached)" if result.get('cached') else ""
+        print(f"  {os.path.basename(shard['file'])}: {result['status']}{cached}, "
+              f"{len(shard['theorems'])} theorems, {result['seconds']:.2f}s")
+        if args.verbose and result['status'] != 'ok':
+            print(result['output'])
+
+    report = check_obligations(shards, args.output_dir, args.workers, args.timeout,
+                               use_cache=not args.force, on_result=on_result)
+    report['unprovable'] = unprovable
+
+    report_file = os.path.join(args.output_dir, "coq_report.json")
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n" + "=" * 60)
+    print("COQ CHECK COMPLETE")
+    print("=" * 60)
+    if report['model']['status'] != 'ok':
+        print(f"ERROR: Model failed to compile ({report['model']['status']})")
+        print(report['model']['output'])
+        exit(1)
+
+    statuses = {}
+    for result in report['theorems'].values():
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    print(f"Theorems: {len(report['theorems'])}")
+    for status, count in sorted(statuses.items()):
+        print(f"  - {status}: {count}")
+    print(f"Shards: {len(report['shards'])}, cached: {sum(1 for shard in report['shards'] if shard.get('cached'))}")
+
+    timed = sorted(((result['seconds'], name) for name, result in report['theorems'].items()
+                    if result['seconds'] is not None), reverse=True)
+    if timed:
+        print(f"Total Qed time: {sum(seconds for seconds, _ in timed):.3f}s")
+        print("Slowest theorems:")
+        for seconds, name in timed[:10]:
+            print(f"  {seconds:.3f}s  {name}")
+    print(f"Report: {report_file}")
+
+    if statuses.get('failed') or statuses.get('timeout'):
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Convert Fact Store
+
+Builds a FactStore/MorphismStore from JSONL records and writes it in the
+memory-mappable binary format of utils/category/store_format.py, and/or
+emits a store as Coq Definitions (checked with coqc on request) to
+validate it against the Fact and Morphism signature of legal_core.v.
+
+Input files are JSONL:
+    --facts        {"name": "Ownership_Event", "term": "Evolve (Atom Entity_Obj) (Atom Property_Obj)"}
+                   (terms use the syntax of FactStore.to_coq; "name" is optional)
+    --transitions  {"label": "Law_Purchase", "source": "Unowned", "target": "Owned"}
+                   (source/target are fact names or terms; unknown names become Parameters)
+
+Usage:
+    python scripts/convert_fact_store.py --facts facts.jsonl --transitions transitions.jsonl \\
+        --output ./data/facts.lgf --coq_output ./formal_validation/generated/FactStore.v --check
+    python scripts/convert_fact_store.py --store ./data/facts.lgf --coq_output FactStore.v
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from utils.category.coq_obligations import DEFAULT_TIMEOUT, read_jsonl, run_coqc, write_if_changed
+from utils.category.facts import FactStore
+from utils.category.morphisms import MorphismStore
+from utils.category.store_format import MappedStore, coq_source, store_sections, write_store
+from utils.readers.external_tools import tool_path
+
+def load_records(facts_file=None, transitions_file=None):
+    """
+    由事实和迁移的 JSONL 记录构建 (FactStore, MorphismStore)
+    """
+    facts = FactStore()
+    morphisms = MorphismStore(facts)
+    if facts_file:
+        for record in read_jsonl(facts_file):
+            try:
+                fact_id = facts.from_coq(record['term'], declare=True)
+                if record.get('name'):
+                    facts.name(fact_id, record['name'])
+            except ValueError as e:
+                raise Exception(f"Invalid fact record in {facts_file}: {e}")
+    if transitions_file:
+        for record in read_jsonl(transitions_file):
+            try:
+                source = facts.from_coq(record['source'], declare=True)
+                target = facts.from_coq(record['target'], declare=True)
+            except ValueError as e:
+                raise Exception(f"Invalid transition record in {transitions_file}: {e}")
+            morphisms.add_morphism(source, target, record.get('label'))
+    return facts, morphisms
+
+def verify_store(file_path, facts, morphisms):
+    """
+    重新映射写出的文件，逐段与内存中的存储比较，返回 (是否一致, 映射耗时秒数)
+    """
+    started = time.perf_counter()
+    with MappedStore(file_path) as store:
+        seconds = time.perf_counter() - started
+        same = all(name in store.arrays and np.array_equal(store.arrays[name], values)
+                   for name, values in store_sections(facts, morphisms).items())
+    return same, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a fact/morphism store as a binary file and as Coq Definitions")
+    parser.add_argument("--facts", required=False, type=str, default=None,
+                       help="JSONL file of facts: {name, term}")
+    parser.add_argument("--transitions", required=False, type=str, default=None,
+                       help="JSONL file of base morphisms: {label, source, target}")
+    parser.add_argument("--store", required=False, type=str, default=None,
+                       help="Read an existing binary store file instead of JSONL records")
+    parser.add_argument("--output", required=False, type=str, default=None,
+                       help="Binary store file to write")
+    parser.add_argument("--coq_output", required=False, type=str, default=None,
+                       help="Coq file with one Definition per fact and morphism")
+    parser.add_argument("--check", action="store_true",
+                       help="Check the Coq file with coqc")
+    parser.add_argument("--timeout", required=False, type=float, default=DEFAULT_TIMEOUT,
+                       help=f"coqc timeout in seconds (default: {DEFAULT_TIMEOUT})")
+
+    args = parser.parse_args()
+    if bool(args.store) == bool(args.facts or args.transitions):
+        parser.error("give either --store or --facts/--transitions")
+    if not args.output and not args.coq_output:
+        parser.error("nothing to do: give --output and/or --coq_output")
+    if args.check and not args.coq_output:
+        parser.error("--check requires --coq_output")
+
+    print("=" * 60)
+    print("Converting Fact Store")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    mapped = None
+    if args.store:
+        mapped = MappedStore(args.store)
+        facts, morphisms = mapped.facts, mapped.morphisms
+        print(f"Mapped {args.store} in {(time.perf_counter() - started) * 1000:.2f}ms")
+    else:
+        facts, morphisms = load_records(args.facts, args.transitions)
+        print(f"Loaded records in {time.perf_counter() - started:.2f}s")
+    print(f"Facts: {len(facts)}, morphisms: {len(morphisms) if morphisms is not None else 0} "
+          f"({morphisms.base_count if morphisms is not None else 0} base)")
+
+    try:
+        if args.output:
+            if mapped is not None:
+                facts, morphisms = mapped.to_stores()
+            output_dir = os.path.dirname(args.output)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            size = write_store(args.output, facts, morphisms)
+            same, seconds = verify_store(args.output, facts, morphisms)
+            if not same:
+                raise Exception(f"Store file {args.output} does not match the store it was written from")
+            print(f"Store saved to {args.output} ({size / 1e6:.2f} MB, mapped back in {seconds * 1000:.2f}ms)")
+
+        if args.coq_output:
+            output_dir = os.path.dirname(args.coq_output)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            title = f"Fact store {os.path.basename(args.store)}" if args.store else None
+            write_if_changed(args.coq_output, coq_source(facts, morphisms, title))
+            print(f"Coq definitions saved to {args.coq_output}")
+    finally:
+        if mapped is not None:
+            facts = morphisms = None
+            mapped.close()
+
+    if args.check:
+        if tool_path('coqc') is None:
+            raise Exception("coqc not installed. Please install Coq (e.g. opam install coq)")
+        result = run_coqc(args.coq_output, os.path.dirname(os.path.abspath(args.coq_output)), args.timeout)
+        print(f"coqc: {result['status']} in {result['seconds']:.2f}s")
+        if result['status'] != 'ok':
+            print(result['output'])
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
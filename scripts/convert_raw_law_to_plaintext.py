@@ -9,13 +9,30 @@ law texts from the raw laws folder (title.docx or title.doc), saving them as pla
 """
 
 import argparse
+import json
 import os
 import re
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
-# 导入文档读取器
-from utils.readers.docx_reader import read_docx_plaintext
-from utils.readers.doc_reader import read_doc_plaintext
+# 导入文档读取器注册表（按扩展名选择最快的可用后端）
+from utils.readers.registry import backends_for, get_backend, read_plaintext, supported_extensions
+from utils.readers.doc_batch import BATCH_BACKENDS, DEFAULT_TIMEOUT, DocBatchReader
+from utils.corpus.citations import CitationGraphBuilder
+from utils.corpus.merged_writer import MERGED_FORMATS, MergedFileWriter, merged_file_name
+from utils.corpus.near_duplicates import load_canonical_map
+from utils.corpus.segmenter import ColumnarCorpusWriter
+from utils.filesystem.journal import Journal
+from utils.filesystem.snapshot import file_sha256, read_snapshot
+from utils.profiling.stage_profiler import StageProfiler, peak_rss_kb, stage_timer
+
+MANIFEST_FILENAME = "conversion_manifest.json"
+JOURNAL_FILENAME = "conversion_journal.jsonl"
+PROFILE_TRACE_FILENAME = "conversion_trace.jsonl"
+PROFILE_SUMMARY_FILENAME = "conversion_profile.json"
 
 def read_titles_from_file(titles_file):
     """
@@ -35,15 +52,127 @@ def read_titles_from_file(titles_file):
         print(f"Error reading titles file {titles_file}: {e}")
         return []
 
-def find_law_file(title, raw_laws_folder):
+# 默认查找的扩展名，按优先级排列（同一目录下 .docx 优先于 .doc）
+# --all_formats 时改用读取器注册表中的所有格式（.txt、.html、.pdf 等）
+LAW_FILE_EXTENSIONS = ['.docx', '.doc']
+
+def _scan_law_files(raw_laws_folder, extensions=LAW_FILE_EXTENSIONS):
+    """
+    遍历一次原始法律文件夹，返回 (索引, 目录修改时间)
+    索引为 {标题: (文件路径, 扩展名)}，查找顺序与逐个标题递归搜索时一致：
+    先遍历到的目录优先，同一目录内按 extensions 的顺序优先
+    """
+    dir_mtimes = {}
+
+    def walk():
+        for root, dirs, files in os.walk(raw_laws_folder):
+            try:
+                dir_mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                pass
+            yield root, files
+
+    return _index_law_files(walk(), extensions), dir_mtimes
+
+def _index_law_files(directories, extensions=LAW_FILE_EXTENSIONS):
+    """
+    根据 (目录, 文件名列表) 序列建立索引 {标题: (文件路径, 扩展名)}
+    先出现的目录优先，同一目录内按 extensions 的顺序优先
+    """
+    index = {}
+    for root, files in directories:
+        names = set(files)
+        for filename in files:
+            stem, ext = os.path.splitext(filename)
+            if ext not in extensions or stem in index:
+                continue
+            # 同一目录下存在更高优先级的扩展名时使用它
+            for preferred in extensions:
+                if stem + preferred in names:
+                    ext = preferred
+                    break
+            index[stem] = (os.path.join(root, stem + ext), ext[1:])
+    return index
+
+def build_law_file_index_from_snapshot(snapshot_file, extensions=LAW_FILE_EXTENSIONS):
+    """
+    用 scripts/list_files.py --recursive --snapshot 生成的快照构建文件索引，不再遍历原始文件夹
+    快照按 os.walk 的顺序列出文件，因此查找优先级与直接遍历时相同
+    """
+    directories = {}
+    for record in read_snapshot(snapshot_file):
+        root, filename = os.path.split(record['path'])
+        directories.setdefault(root, []).append(filename)
+    index = _index_law_files(directories.items(), extensions)
+    print(f"Indexed {len(index)} law files from snapshot {snapshot_file}")
+    return index
+
+def _load_law_file_index_cache(cache_file, raw_laws_folder, extensions=LAW_FILE_EXTENSIONS):
+    """
+    读取持久化的文件索引；若任一目录的修改时间发生变化则返回 None
+    目录的修改时间会在其中的文件被增删或重命名时改变，因此无需重新遍历
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (cache.get('raw_laws_folder') != os.path.abspath(raw_laws_folder)
+            or cache.get('extensions') != list(extensions)):
+        return None
+
+    for directory, mtime in cache.get('dir_mtimes', {}).items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+
+    return {stem: tuple(entry) for stem, entry in cache.get('index', {}).items()}
+
+def build_law_file_index(raw_laws_folder, cache_file=None, extensions=LAW_FILE_EXTENSIONS):
+    """
+    构建标题到文件的索引 {标题: (文件路径, 扩展名)}
+    整个文件夹只遍历一次，供主循环查找和摘要统计共用；
+    如果指定了 cache_file，目录未变化时直接复用上次的索引
+    """
+    if cache_file:
+        index = _load_law_file_index_cache(cache_file, raw_laws_folder, extensions)
+        if index is not None:
+            print(f"Loaded file index ({len(index)} files) from {cache_file}")
+            return index
+
+    index, dir_mtimes = _scan_law_files(raw_laws_folder, extensions)
+    print(f"Indexed {len(index)} law files under {raw_laws_folder}")
+
+    if cache_file:
+        try:
+            cache_dir = os.path.dirname(cache_file)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'raw_laws_folder': os.path.abspath(raw_laws_folder),
+                    'extensions': list(extensions),
+                    'dir_mtimes': dir_mtimes,
+                    'index': index,
+                }, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Warning: Failed to save file index cache {cache_file}: {e}")
+
+    return index
+
+def find_law_file(title, raw_laws_folder, file_index=None, extensions=LAW_FILE_EXTENSIONS):
     """
     根据标题在原始法律文件夹中查找对应的文件
-    支持 .docx 和 .doc 格式
+    默认支持 .docx 和 .doc 格式，extensions 可指定其他格式（按优先级排列）
     文件名格式为: title.docx 或 title.doc
+    如果提供了 file_index（见 build_law_file_index），直接查索引，不再访问文件系统
     """
-    # 尝试不同的扩展名
-    extensions = ['.docx', '.doc']
-    
+    if file_index is not None:
+        return file_index.get(title, (None, None))
+
     # 首先在当前目录查找
     for ext in extensions:
         filename = title + ext
@@ -61,6 +190,45 @@ def find_law_file(title, raw_laws_folder):
     
     return None, None
 
+def apply_canonical_map(titles, located, canonical_map):
+    """
+    把近似重复的文件替换为其规范版本（见 scripts/find_near_duplicates.py）
+    多个标题指向同一个规范文件时只保留一个：规范文件自己的标题在列表中时保留它，否则保留第一个
+    返回 (标题列表, 文件列表, [(被跳过的标题, 保留的标题, 文件路径)])
+    """
+    files = {os.path.normpath(path): canonical for path, canonical in canonical_map.get('files', {}).items()}
+    resolved = []
+    keeper = {}
+    redirected = 0
+    for index, (title, (file_path, file_ext)) in enumerate(zip(titles, located)):
+        if file_path:
+            canonical = files.get(os.path.normpath(file_path))
+            if canonical is not None:
+                file_path, file_ext = canonical, os.path.splitext(canonical)[1][1:]
+                redirected += 1
+            key = os.path.normpath(file_path)
+            canonical_title = os.path.splitext(os.path.basename(key))[0]
+            kept = keeper.get(key)
+            if kept is None or (title == canonical_title and titles[kept] != canonical_title):
+                keeper[key] = index
+        resolved.append((file_path, file_ext))
+
+    kept_titles = []
+    kept_located = []
+    skipped = []
+    for index, (title, (file_path, file_ext)) in enumerate(zip(titles, resolved)):
+        if file_path:
+            kept = keeper[os.path.normpath(file_path)]
+            if kept != index:
+                print(f"  Skipping {title}: near-duplicate of {titles[kept]} ({file_path})")
+                skipped.append((title, titles[kept], file_path))
+                continue
+        kept_titles.append(title)
+        kept_located.append((file_path, file_ext))
+    print(f"Canonical map: {redirected} titles redirected to canonical versions, "
+          f"{len(skipped)} near-duplicate titles skipped")
+    return kept_titles, kept_located, skipped
+
 def clean_filename(title):
     """
     从标题生成安全的文件名（保留原格式，只移除不允许的字符）
@@ -81,35 +249,260 @@ def clean_filename(title):
 def save_plaintext(content, output_path):
     """
     保存纯文本内容到文件
+    先写临时文件再重命名，中途崩溃不会留下写了一半的输出文件
     """
+    tmp_path = output_path + '.tmp'
     try:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write(content)
+        os.replace(tmp_path, output_path)
         return True
     except Exception as e:
         print(f"  Error saving to {output_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         return False
 
-def append_to_merged_file(content, title, merged_file_path):
+def load_conversion_manifest(manifest_path):
     """
-    将内容追加到合并文件中，并添加标题分隔符
+    读取转换缓存清单 {源文件路径: 条目}，不存在或损坏时返回空字典
     """
     try:
-        with open(merged_file_path, 'a', encoding='utf-8') as f:
-            # 添加分隔符和标题
-            f.write("\n" + "=" * 80 + "\n")
-            f.write(f"# {title}\n")
-            f.write("=" * 80 + "\n\n")
-            f.write(content)
-            f.write("\n\n")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('entries', {})
+    except (OSError, ValueError):
+        return {}
+
+def save_conversion_manifest(entries, manifest_path):
+    """
+    原子地写入转换缓存清单（先写临时文件再重命名）
+    """
+    tmp_path = manifest_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, manifest_path)
         return True
     except Exception as e:
-        print(f"  Error appending to merged file: {e}")
+        print(f"Warning: Failed to save conversion manifest {manifest_path}: {e}")
         return False
 
+def lookup_conversion_cache(entry, file_path, output_path, valid_readers):
+    """
+    检查缓存条目是否仍然有效，返回 (是否命中, 源文件的最新缓存条目)
+    valid_readers 为当前可用的读取后端 {名称: 版本}，生成缓存的后端必须仍在其中；
+    源文件大小和修改时间未变时直接命中；否则比较内容摘要，
+    这样仅被 touch 过或复制过的文件也不会被重新提取
+    """
+    st = os.stat(file_path)
+    new_entry = {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': None,
+        'reader': None,
+        'reader_version': None,
+        'output_path': output_path,
+        'output_size': None,
+    }
+
+    if (not entry
+            or valid_readers.get(entry.get('reader')) != entry.get('reader_version')
+            or entry.get('output_path') != output_path):
+        return False, new_entry
+
+    try:
+        if os.path.getsize(output_path) != entry.get('output_size'):
+            return False, new_entry
+    except OSError:
+        return False, new_entry
+
+    if entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+        new_entry['sha256'] = entry.get('sha256')
+    else:
+        new_entry['sha256'] = file_sha256(file_path)
+        if new_entry['sha256'] != entry.get('sha256'):
+            return False, new_entry
+
+    new_entry['reader'] = entry['reader']
+    new_entry['reader_version'] = entry['reader_version']
+    new_entry['output_size'] = entry.get('output_size')
+    return True, new_entry
+
+def convert_title(title, file_path, file_ext, output_folder,
+                  cache_entry=None, use_cache=False, forced_backends=None, prefetched=None, profile=False):
+    """
+    转换单个已找到的法律文件，保存纯文本文件，返回结果字典
+    该函数不写日志也不修改计数器，可以在子进程中执行；
+    结果由主进程按标题顺序统一汇总
+    use_cache 为 True 时，若 cache_entry 表明源文件未变化，则复用已有的输出文件
+    forced_backends 为 {扩展名: 后端名称}，指定某种格式只使用该后端
+    prefetched 为 (Future, 后端名称)，表示该文件已提交给批量读取器（只能在主进程中使用）
+    profile 为 True 时在 result['stages'] 中记录 cache/extract/hash/write 各阶段的耗时和字节数，
+    在 result['peak_rss_kb'] 和 result['pid'] 中记录执行进程的峰值内存和进程号（批量读取时 extract 为等待结果的时间）
+    """
+    result = {
+        'title': title,
+        'file_path': file_path,
+        'file_ext': file_ext,
+        'status': 'not_found',
+        'output_path': None,
+        'error': None,
+        'backend': None,
+        'cache_entry': None,
+        'stages': {} if profile else None,
+        'peak_rss_kb': None,
+        'pid': None,
+    }
+    if not file_path:
+        return result
+
+    stages = result['stages']
+    try:
+        return _convert_found_title(result, title, file_path, file_ext, output_folder, cache_entry,
+                                    use_cache, forced_backends, prefetched, stages)
+    finally:
+        if profile:
+            result['peak_rss_kb'] = peak_rss_kb()
+            result['pid'] = os.getpid()
+
+def _convert_found_title(result, title, file_path, file_ext, output_folder, cache_entry,
+                         use_cache, forced_backends, prefetched, stages):
+    """
+    convert_title 的主体（文件已找到）：查缓存、提取、保存，阶段耗时记入 stages
+    """
+    output_path = os.path.join(output_folder, clean_filename(title))
+
+    try:
+        # 根据文件扩展名由注册表选择读取后端
+        forced = (forced_backends or {}).get(file_ext)
+
+        if use_cache:
+            valid_readers = {backend.name: backend.version for backend in backends_for(file_ext)
+                             if forced is None or backend.name == forced}
+            with stage_timer(stages, 'cache'):
+                hit, new_entry = lookup_conversion_cache(cache_entry, file_path, output_path, valid_readers)
+            result['cache_entry'] = new_entry
+            if hit:
+                result['status'] = 'cached'
+                result['output_path'] = output_path
+                result['backend'] = new_entry['reader']
+                return result
+
+        with stage_timer(stages, 'extract', bytes_in=os.path.getsize(file_path) if stages is not None else 0):
+            if prefetched is not None:
+                future, backend_name = prefetched
+                try:
+                    content = future.result()
+                except Exception:
+                    if forced is not None:
+                        raise
+                    # auto 模式下批量读取失败时按优先级依次尝试其他后端
+                    content, backend_name = read_plaintext(file_path)
+            else:
+                content, backend_name = read_plaintext(file_path, forced)
+        result['backend'] = backend_name
+    except Exception as e:
+        result['status'] = 'read_error'
+        result['error'] = str(e)
+        result['cache_entry'] = None
+        return result
+
+    if not (content and content.strip()):
+        result['status'] = 'empty'
+        result['cache_entry'] = None
+        return result
+
+    # 保存单个文件
+    result['output_path'] = output_path
+    with stage_timer(stages, 'write') as record:
+        saved = save_plaintext(content, output_path)
+        if saved and stages is not None:
+            record['bytes_out'] += os.path.getsize(output_path)
+    if saved:
+        result['status'] = 'converted'
+        new_entry = result['cache_entry']
+        if new_entry is not None:
+            new_entry['reader'] = result['backend']
+            new_entry['reader_version'] = get_backend(result['backend']).version
+            if new_entry['sha256'] is None:
+                with stage_timer(stages, 'hash', bytes_in=new_entry['size']):
+                    new_entry['sha256'] = file_sha256(file_path)
+            new_entry['output_size'] = os.path.getsize(output_path)
+    else:
+        result['status'] = 'save_error'
+        result['cache_entry'] = None
+    return result
+
+def journal_record(result):
+    """
+    一个标题处理完成后写入预写日志的记录
+    记录源文件的大小和修改时间，--resume 时据此判断源文件是否在中断后被修改
+    """
+    record = {key: result[key] for key in ('title', 'file_path', 'file_ext', 'status', 'output_path',
+                                           'error', 'backend', 'cache_entry')}
+    record['size'] = record['mtime_ns'] = None
+    if result['cache_entry'] is not None:
+        record['size'] = result['cache_entry']['size']
+        record['mtime_ns'] = result['cache_entry']['mtime_ns']
+    elif result['file_path']:
+        try:
+            st = os.stat(result['file_path'])
+            record['size'], record['mtime_ns'] = st.st_size, st.st_mtime_ns
+        except OSError:
+            pass
+    return record
+
+def resumed_result(record, file_path, file_ext, profile=False):
+    """
+    --resume：日志记录仍然有效时（同一个源文件、大小和修改时间未变、输出文件完整）
+    返回由记录重建的结果（result['resumed'] 为 True），否则返回 None
+    失败的标题（读取错误、超时、内容为空）同样跳过，不带 --resume 重新运行即可重试
+    """
+    if record['file_path'] != file_path or record['file_ext'] != file_ext:
+        return None
+    if file_path:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (record['size'], record['mtime_ns']):
+            return None
+    if record['status'] in ('converted', 'cached'):
+        output_size = (record['cache_entry'] or {}).get('output_size')
+        try:
+            if output_size is None or os.path.getsize(record['output_path']) != output_size:
+                return None
+        except OSError:
+            return None
+    result = {key: record[key] for key in ('title', 'file_path', 'file_ext', 'status', 'output_path',
+                                           'error', 'backend', 'cache_entry')}
+    result.update({'stages': {} if profile else None, 'peak_rss_kb': None, 'pid': None, 'resumed': True})
+    return result
+
+def format_alternatives(items, conjunction):
+    """
+    将 ['a', 'b', 'c'] 格式化为 'a, b and c'
+    """
+    if len(items) <= 1:
+        return ''.join(items)
+    return ', '.join(items[:-1]) + f" {conjunction} " + items[-1]
+
+def format_stats(format_counts):
+    """
+    返回 [(扩展名, 数量)]：.docx 和 .doc 总是列出，其他格式只在有文件时列出
+    """
+    stats = [('docx', format_counts.get('docx', 0)), ('doc', format_counts.get('doc', 0))]
+    for ext in supported_extensions():
+        ext = ext[1:]
+        if ext not in ('docx', 'doc') and format_counts.get(ext):
+            stats.append((ext, format_counts[ext]))
+    return stats
+
 def main():
     parser = argparse.ArgumentParser(description='Convert selected raw laws (doc/docx) to plaintext files')
     parser.add_argument("--file_titles_selected_laws", required=True, type=str,
@@ -120,8 +513,62 @@ def main():
                        help="Folder containing raw law .doc/.docx files")
     parser.add_argument("--output_merged_file", action="store_true",
                        help="If set, concatenate all files into a merged.txt file")
+    parser.add_argument("--merged_format", "--merged-format", required=False, type=str, default="txt",
+                       choices=list(MERGED_FORMATS),
+                       help="Format of the merged file: txt, gzip or zstd (default: txt); "
+                            "a byte-offset index is written next to it")
     parser.add_argument("--verbose", action="store_true",
                        help="Print verbose information")
+    parser.add_argument("--workers", required=False, type=int, default=1,
+                       help="Number of worker processes for extraction (default: 1, serial)")
+    parser.add_argument("--file_index_cache", required=False, type=str, default=None,
+                       help="Optional JSON file to persist the raw laws file index between runs")
+    parser.add_argument("--file_snapshot", required=False, type=str, default=None,
+                       help="Use a file snapshot from scripts/list_files.py --recursive --snapshot "
+                            "as the law file index instead of walking raw_laws_folder")
+    parser.add_argument("--all_formats", action="store_true",
+                       help="Also look for the other formats of the reader registry (.txt, .html, .pdf, ...), "
+                            "not only .docx and .doc")
+    parser.add_argument("--doc_backend", required=False, type=str, default="auto",
+                       choices=['auto'] + [backend.name for backend in backends_for('.doc', include_unavailable=True)],
+                       help="Reader backend for .doc files (default: auto, fastest available backend first)")
+    parser.add_argument("--doc_batch_threshold", required=False, type=int, default=16,
+                       help="Use the batch subprocess pool when at least this many .doc titles "
+                            "are read with antiword/catdoc, i.e. when that backend is forced or is the "
+                            "fastest available one with --doc_backend auto (default: 16)")
+    parser.add_argument("--doc_batch_workers", required=False, type=int, default=None,
+                       help="Concurrent antiword/catdoc processes in batch mode (default: CPU count)")
+    parser.add_argument("--doc_timeout", required=False, type=float, default=DEFAULT_TIMEOUT,
+                       help=f"Per-file timeout in seconds for antiword/catdoc in batch mode (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-extract every document, ignoring the conversion cache")
+    parser.add_argument("--segment_output", required=False, type=str, default=None,
+                       help="Directory for the columnar store of 编/章/节/条/款/项 units (disabled by default)")
+    parser.add_argument("--canonical_map", required=False, type=str, default=None,
+                       help="Canonical map from scripts/find_near_duplicates.py; near-duplicate files are "
+                            "replaced by their canonical version and converted once")
+    parser.add_argument("--citation_output", required=False, type=str, default=None,
+                       help="Write the law->law and article->article citation graph (CSR arrays) "
+                            "to this .npz file (disabled by default)")
+    parser.add_argument("--profile", action="store_true",
+                       help="Record per-title, per-stage wall/CPU time, bytes and peak RSS "
+                            f"(trace: <output_folder>/{PROFILE_TRACE_FILENAME}, "
+                            f"percentiles: <output_folder>/{PROFILE_SUMMARY_FILENAME} and the summary)")
+    parser.add_argument("--profile_trace", required=False, type=str, default=None,
+                       help=f"JSONL trace file for --profile (default: <output_folder>/{PROFILE_TRACE_FILENAME})")
+    parser.add_argument("--profile_cprofile", required=False, type=str, default=None,
+                       help="Also run cProfile on the main process and save the stats to this file "
+                            "(implies --profile; worker processes are not profiled)")
+    parser.add_argument("--profile_tracemalloc", action="store_true",
+                       help="Also trace Python allocations of the main process with tracemalloc "
+                            "(implies --profile; slow)")
+    parser.add_argument("--resume", action="store_true",
+                       help=f"Resume an interrupted run: titles recorded in <output_folder>/{JOURNAL_FILENAME} "
+                            "are skipped (unless their source changed) and the merged file is rebuilt "
+                            "from the per-title outputs without re-extracting")
+    parser.add_argument("--journal_fsync_interval", required=False, type=float, default=1.0,
+                       help="Seconds between fsyncs of the conversion journal; 0 syncs after every title "
+                            "(default: 1.0)")
     
     args = parser.parse_args()
     
@@ -138,24 +585,97 @@ def main():
     # 确保输出文件夹存在
     os.makedirs(args.output_folder, exist_ok=True)
     
-    # 如果需要合并文件，初始化合并文件
+    # 性能剖析：每个标题的各阶段耗时写入 JSONL 追踪，结束时汇总
+    profiler = None
+    if args.profile or args.profile_cprofile or args.profile_tracemalloc:
+        trace_path = args.profile_trace or os.path.join(args.output_folder, PROFILE_TRACE_FILENAME)
+        profiler = StageProfiler(trace_path, args.profile_cprofile, args.profile_tracemalloc)
+        profiler.start()
+        print(f"Profiling enabled, trace will be saved to: {trace_path}")
+    
+    def run_stage(name):
+        return profiler.run_stage(name) if profiler is not None else nullcontext()
+    
+    # 查找的扩展名（按优先级排列）
+    extensions = supported_extensions() if args.all_formats else LAW_FILE_EXTENSIONS
+    
+    # 一次性构建文件索引，避免对每个标题重复遍历原始文件夹
+    with run_stage('index'):
+        if args.file_snapshot:
+            file_index = build_law_file_index_from_snapshot(args.file_snapshot, extensions)
+        else:
+            file_index = build_law_file_index(args.raw_laws_folder, args.file_index_cache, extensions)
+    # 剖析时按标题记录查找耗时 {标题: 阶段}
+    title_stages = {} if profiler is not None else None
+    located = []
+    for title in titles:
+        with stage_timer(None if title_stages is None else title_stages.setdefault(title, {}), 'locate'):
+            located.append(find_law_file(title, args.raw_laws_folder, file_index, extensions))
+    # 被跳过的近似重复标题 [(标题, 保留的标题, 文件路径)]
+    skipped = []
+    if args.canonical_map:
+        with run_stage('canonical_map'):
+            titles, located, skipped = apply_canonical_map(titles, located, load_canonical_map(args.canonical_map))
+    
+    # 读取转换缓存清单；--force 时忽略已有条目，全部重新提取
+    manifest_path = os.path.join(args.output_folder, MANIFEST_FILENAME)
+    with run_stage('manifest_load'):
+        manifest = load_conversion_manifest(manifest_path)
+    cache_entries = [None if args.force or not file_path else manifest.get(file_path)
+                     for file_path, _ in located]
+    
+    # 预写日志：每个标题处理完成后追加一条记录，运行正常结束后删除；
+    # --resume 时日志中已完成的标题直接复用记录，不再查找缓存或提取
+    journal_path = os.path.join(args.output_folder, JOURNAL_FILENAME)
+    if not args.resume and os.path.exists(journal_path):
+        print(f"Warning: Discarding the journal of an interrupted run (use --resume to continue it): {journal_path}")
+    journal, journal_records = Journal.open(journal_path, args.resume, args.journal_fsync_interval)
+    resumed = {}
+    if args.resume:
+        finished = {record['title']: record for record in journal_records}
+        for index, (title, (file_path, file_ext)) in enumerate(zip(titles, located)):
+            if title in finished:
+                result = resumed_result(finished[title], file_path, file_ext, profiler is not None)
+                if result is not None:
+                    resumed[index] = result
+        print(f"Resuming: {len(resumed)} of {len(titles)} titles already finished in {journal_path}")
+    
+    # 如果需要合并文件，初始化合并文件（整个运行期间保持同一个打开的句柄）
     merged_file_path = None
+    merged_writer = None
     if args.output_merged_file:
-        merged_file_path = os.path.join(args.output_folder, "merged.txt")
+        merged_file_path = os.path.join(args.output_folder, merged_file_name(args.merged_format))
         # 清空或创建合并文件
-        with open(merged_file_path, 'w', encoding='utf-8') as f:
-            f.write("# Merged Law Texts\n")
-            f.write(f"# Generated on: {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# Total laws: {len(titles)}\n")
-            f.write("# " + "=" * 70 + "\n\n")
+        merged_writer = MergedFileWriter(
+            merged_file_path,
+            "# Merged Law Texts\n"
+            f"# Generated on: {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"# Total laws: {len(titles)}\n"
+            "# " + "=" * 70 + "\n\n",
+            merged_format=args.merged_format)
         print(f"Merged file will be saved to: {merged_file_path}")
     
+    # 如果需要分段，初始化列式存储写入器
+    segment_writer = None
+    if args.segment_output:
+        segment_writer = ColumnarCorpusWriter(args.segment_output)
+        print(f"Segmented units will be saved to: {args.segment_output}")
+    
+    # 如果需要引用图，用所有标题构建一个 Aho-Corasick 自动机；
+    # 被跳过的近似重复标题作为别名，对它们的引用计入保留的法律
+    citation_builder = None
+    if args.citation_output:
+        citation_builder = CitationGraphBuilder(titles, {title: kept for title, kept, _ in skipped})
+        print(f"Citation graph will be saved to: {args.citation_output}")
+    
     # 统计信息
     found_count = 0
     not_found_count = 0
+    not_found_titles = []
     error_count = 0
-    docx_count = 0
-    doc_count = 0
+    format_counts = {}
+    cache_hit_count = 0
+    cache_miss_count = 0
     
     # 创建日志文件
     log_file = os.path.join(args.output_folder, "conversion_log.txt")
@@ -164,85 +684,232 @@ def main():
         log.write("Law Title Conversion Log\n")
         log.write("=" * 50 + "\n\n")
         log.write(f"Raw laws folder: {args.raw_laws_folder}\n")
-        log.write(f"Supported formats: .docx, .doc\n")
-        log.write(f"Merge to single file: {args.output_merged_file}\n\n")
+        log.write(f"Supported formats: {', '.join(extensions)}\n")
+        log.write(f"Merge to single file: {args.output_merged_file}\n")
+        log.write(f"Conversion cache: {'disabled (--force)' if args.force else manifest_path}\n\n")
+        if skipped:
+            log.write(f"Canonical map: {args.canonical_map}\n")
+            for title, kept, file_path in skipped:
+                log.write(f"  Skipping {title}: near-duplicate of {kept} ({file_path})\n")
+            log.write("\n")
         
-        # 处理每个标题
-        for i, title in enumerate(titles, 1):
-            print(f"\n[{i}/{len(titles)}] Processing: {title}")
-            log.write(f"\n--- Processing: {title} ---\n")
-            
-            # 查找对应的原始法律文件 (title.docx 或 title.doc)
-            file_path, file_ext = find_law_file(title, args.raw_laws_folder)
-            
-            if file_path:
-                print(f"  Found: {file_path} (format: {file_ext})")
-                log.write(f"  Found: {file_path} (format: {file_ext})\n")
-                
+        forced_backends = {} if args.doc_backend == 'auto' else {'doc': args.doc_backend}
+        
+        # 批量模式：.doc 使用外部工具且数量较多时，交给有界的子进程池并发读取，
+        # 每个文件有独立的超时；主进程按标题顺序取回结果
+        # auto 时只有优先级最高的可用后端是外部工具（例如 ole 不可用）才使用批量模式，
+        # 读取失败的文件再按优先级尝试其他后端
+        batch_reader = None
+        batch_indices = [i for i, (_, file_ext) in enumerate(located) if file_ext == 'doc' and i not in resumed]
+        prefetched = {}
+        doc_backend = forced_backends.get('doc')
+        if doc_backend is None:
+            doc_backend = next((backend.name for backend in backends_for('.doc')), None)
+        if doc_backend in BATCH_BACKENDS:
+            if len(batch_indices) >= args.doc_batch_threshold:
+                batch_reader = DocBatchReader(doc_backend, args.doc_batch_workers, args.doc_timeout)
+                print(f"Batch mode: {len(batch_indices)} .doc files via {doc_backend} "
+                      f"({batch_reader.max_workers} processes, timeout {args.doc_timeout}s)")
+                log.write(f"Batch mode for .doc files: {doc_backend}\n")
+            else:
+                batch_indices = []
+        else:
+            batch_indices = []
+        batch_queue = deque(batch_indices)
+        # 与 convert_title 判断缓存时使用的后端集合一致
+        valid_batch_readers = {}
+        if batch_reader is not None:
+            valid_batch_readers = {backend.name: backend.version for backend in backends_for('.doc')
+                                   if 'doc' not in forced_backends or backend.name == doc_backend}
+        
+        def fill_prefetch():
+            """
+            保持最多 4 * 并发数 个 .doc 文件在批量读取器中，缓存命中的文件不提交
+            """
+            while batch_queue and len(prefetched) < 4 * batch_reader.max_workers:
+                index = batch_queue.popleft()
+                file_path = located[index][0]
+                output_path = os.path.join(args.output_folder, clean_filename(titles[index]))
                 try:
-                    # 根据文件扩展名选择合适的读取器
-                    if file_ext == 'docx':
-                        content = read_docx_plaintext(file_path)
-                        docx_count += 1
-                    elif file_ext == 'doc':
-                        content = read_doc_plaintext(file_path)
-                        doc_count += 1
-                    else:
-                        raise Exception(f"Unsupported file format: {file_ext}")
-                    
-                    if content and content.strip():
-                        # 生成输出文件名
-                        output_filename = clean_filename(title)
-                        output_path = os.path.join(args.output_folder, output_filename)
-                        
-                        # 保存单个文件
-                        if save_plaintext(content, output_path):
+                    hit, _ = lookup_conversion_cache(cache_entries[index], file_path,
+                                                     output_path, valid_batch_readers)
+                except OSError:
+                    hit = False
+                if not hit:
+                    prefetched[index] = (batch_reader.submit(file_path), doc_backend)
+        
+        # 并行模式：在进程池中按标题顺序提交，结果按原顺序返回
+        executor = None
+        results = None
+        batch_set = set(batch_indices)
+        if args.workers > 1:
+            pool_indices = [i for i in range(len(titles)) if i not in batch_set and i not in resumed]
+            executor = ProcessPoolExecutor(max_workers=args.workers)
+            results = executor.map(convert_title,
+                                   [titles[i] for i in pool_indices],
+                                   [located[i][0] for i in pool_indices],
+                                   [located[i][1] for i in pool_indices],
+                                   repeat(args.output_folder),
+                                   [cache_entries[i] for i in pool_indices],
+                                   repeat(True),
+                                   repeat(forced_backends),
+                                   repeat(None),
+                                   repeat(profiler is not None))
+
+        completed = False
+        try:
+            # 处理每个标题
+            for i, title in enumerate(titles, 1):
+                print(f"\n[{i}/{len(titles)}] Processing: {title}")
+                log.write(f"\n--- Processing: {title} ---\n")
+
+                if batch_reader is not None:
+                    fill_prefetch()
+
+                if (i - 1) in resumed:
+                    result = resumed[i - 1]
+                elif results is not None and (i - 1) not in batch_set:
+                    result = next(results)
+                else:
+                    file_path, file_ext = located[i - 1]
+                    result = convert_title(title, file_path, file_ext, args.output_folder,
+                                           cache_entries[i - 1], True, forced_backends,
+                                           prefetched.pop(i - 1, None), profiler is not None)
+
+                file_path = result['file_path']
+                file_ext = result['file_ext']
+                status = result['status']
+                stages = None
+                if profiler is not None:
+                    stages = {**title_stages.get(title, {}), **result['stages']}
+                output_size = (result['cache_entry'] or {}).get('output_size') or 0
+
+                if file_path:
+                    print(f"  Found: {file_path} (format: {file_ext})")
+                    log.write(f"  Found: {file_path} (format: {file_ext})\n")
+
+                    # 读取成功（无论内容是否为空）即计入格式统计
+                    if status in ('converted', 'cached', 'empty', 'save_error'):
+                        format_counts[file_ext] = format_counts.get(file_ext, 0) + 1
+
+                    # 更新缓存清单
+                    if result['cache_entry'] is not None:
+                        manifest[file_path] = result['cache_entry']
+                    if not result.get('resumed'):
+                        if status == 'cached':
+                            cache_hit_count += 1
+                        else:
+                            cache_miss_count += 1
+
+                    if status in ('converted', 'cached'):
+                        output_path = result['output_path']
+                        if result.get('resumed'):
+                            print(f"  Resumed: reused {output_path}")
+                            log.write(f"  Resumed: reused {output_path}\n")
+                        elif status == 'cached':
+                            print(f"  Cache hit: reused {output_path}")
+                            log.write(f"  Cache hit: reused {output_path}\n")
+                        else:
                             print(f"  Saved to: {output_path}")
                             log.write(f"  Saved to: {output_path}\n")
-                            found_count += 1
-                            
-                            # 如果需要合并，追加到合并文件
-                            if merged_file_path:
-                                if append_to_merged_file(content, title, merged_file_path):
-                                    print(f"  Appended to merged file")
-                                else:
-                                    print(f"  Warning: Failed to append to merged file")
-                        else:
-                            print(f"  ERROR: Failed to save file")
-                            log.write(f"  ERROR: Failed to save file\n")
-                            error_count += 1
-                    else:
+                        print(f"  Backend: {result['backend']}")
+                        log.write(f"  Backend: {result['backend']}\n")
+                        found_count += 1
+
+                        # 如果需要合并，追加到合并文件
+                        if merged_writer is not None:
+                            try:
+                                with stage_timer(stages, 'merge', bytes_in=output_size):
+                                    merged_writer.copy_law_from_file(title, output_path)
+                                print(f"  Appended to merged file")
+                            except Exception as e:
+                                print(f"  Error appending to merged file: {e}")
+                                print(f"  Warning: Failed to append to merged file")
+
+                        # 如果需要分段，把法律切分为编/章/节/条/款/项写入列式存储
+                        if segment_writer is not None:
+                            try:
+                                with stage_timer(stages, 'segment', bytes_in=output_size):
+                                    unit_count = segment_writer.add_law_file(title, output_path)
+                                if args.verbose:
+                                    print(f"  Segmented into {unit_count} units")
+                            except Exception as e:
+                                print(f"  Warning: Failed to segment {output_path}: {e}")
+
+                        # 如果需要引用图，一次扫描找出该法律中对所有已知标题的引用
+                        if citation_builder is not None:
+                            try:
+                                with stage_timer(stages, 'citations', bytes_in=output_size):
+                                    citation_count = citation_builder.add_law_file(title, output_path)
+                                if args.verbose:
+                                    print(f"  Found {citation_count} citations")
+                            except Exception as e:
+                                print(f"  Warning: Failed to extract citations from {output_path}: {e}")
+                    elif status == 'save_error':
+                        print(f"  ERROR: Failed to save file")
+                        log.write(f"  ERROR: Failed to save file\n")
+                        error_count += 1
+                    elif status == 'empty':
                         print(f"  ERROR: Extracted content is empty")
                         log.write(f"  ERROR: Extracted content is empty\n")
                         error_count += 1
-                        
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f"  ERROR: Failed to read {file_ext} file: {error_msg}")
-                    
-                    # 提供更友好的错误提示
-                    if "antiword" in error_msg or "catdoc" in error_msg:
-                        print("  " + "-" * 50)
-                        print("  Please install required tools:")
-                        print("  Ubuntu/Debian: sudo apt-get install antiword catdoc")
-                        print("  CentOS/RHEL:   sudo yum install epel-release && sudo yum install antiword catdoc")
-                        print("  macOS:         brew install antiword catdoc")
-                        print("  " + "-" * 50)
-                    
-                    log.write(f"  ERROR: Failed to read {file_ext} file: {error_msg}\n")
-                    error_count += 1
-            else:
-                expected_paths = [
-                    os.path.join(args.raw_laws_folder, title + ".docx"),
-                    os.path.join(args.raw_laws_folder, title + ".doc")
-                ]
-                print(f"  NOT FOUND: tried {expected_paths[0]} and {expected_paths[1]}")
-                log.write(f"  NOT FOUND: tried {expected_paths[0]} and {expected_paths[1]}\n")
-                not_found_count += 1
-            
-            if args.verbose:
-                print(f"  Progress: Found: {found_count}, Not found: {not_found_count}, Errors: {error_count}")
-                print(f"  Format stats: .docx: {docx_count}, .doc: {doc_count}")
+                    else:
+                        error_msg = result['error']
+                        print(f"  ERROR: Failed to read {file_ext} file: {error_msg}")
+
+                        # 提供更友好的错误提示
+                        if "not installed" in error_msg and ("antiword" in error_msg or "catdoc" in error_msg):
+                            print("  " + "-" * 50)
+                            print("  Please install required tools:")
+                            print("  Ubuntu/Debian: sudo apt-get install antiword catdoc")
+                            print("  CentOS/RHEL:   sudo yum install epel-release && sudo yum install antiword catdoc")
+                            print("  macOS:         brew install antiword catdoc")
+                            print("  " + "-" * 50)
+
+                        log.write(f"  ERROR: Failed to read {file_ext} file: {error_msg}\n")
+                        error_count += 1
+                else:
+                    expected_paths = format_alternatives(
+                        [os.path.join(args.raw_laws_folder, title + ext) for ext in extensions], 'and')
+                    print(f"  NOT FOUND: tried {expected_paths}")
+                    log.write(f"  NOT FOUND: tried {expected_paths}\n")
+                    not_found_count += 1
+                    not_found_titles.append(title)
+
+                if not result.get('resumed'):
+                    journal.append(journal_record(result))
+                if profiler is not None:
+                    profiler.add_file(title, result, stages)
+
+                if args.verbose:
+                    print(f"  Progress: Found: {found_count}, Not found: {not_found_count}, Errors: {error_count}")
+                    print("  Format stats: " + ", ".join(f".{ext}: {count}" for ext, count in format_stats(format_counts)))
+            completed = True
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if batch_reader is not None:
+                batch_reader.shutdown()
+            if merged_writer is not None:
+                # 中途出错时删除不完整的临时文件，保留之前的合并文件
+                with run_stage('merge_close'):
+                    if completed:
+                        merged_writer.close()
+                    else:
+                        merged_writer.abort()
+            if segment_writer is not None:
+                with run_stage('segment_close'):
+                    segment_writer.close()
+            if citation_builder is not None:
+                with run_stage('citations_build'):
+                    citation_graph = citation_builder.build()
+                    citation_graph.save(args.citation_output)
+            with run_stage('manifest_save'):
+                save_conversion_manifest(manifest, manifest_path)
+            journal.close()
+    
+    # 运行正常结束，缓存清单已包含所有结果，不再需要日志
+    journal.remove()
     
     # 打印总结
     print("\n" + "=" * 60)
@@ -250,10 +917,13 @@ def main():
     print("=" * 60)
     print(f"Total titles processed: {len(titles)}")
     print(f"Successfully converted: {found_count}")
-    print(f"  - .docx files: {docx_count}")
-    print(f"  - .doc files: {doc_count}")
+    for ext, count in format_stats(format_counts):
+        print(f"  - .{ext} files: {count}")
     print(f"Not found: {not_found_count}")
     print(f"Errors: {error_count}")
+    print(f"Cache hits: {cache_hit_count}, misses: {cache_miss_count}")
+    if args.resume:
+        print(f"Resumed from journal: {len(resumed)}")
     print(f"\nOutput folder: {args.output_folder}")
     
     if merged_file_path and found_count > 0:
@@ -261,8 +931,27 @@ def main():
         file_size = os.path.getsize(merged_file_path)
         print(f"Merged file: {merged_file_path} (size: {file_size} bytes)")
     
+    if segment_writer is not None:
+        print(f"Segmented units: {segment_writer.row_count} from {len(segment_writer.titles)} laws in {args.segment_output}")
+    
+    if citation_builder is not None:
+        print(f"Citations: {citation_builder.citation_count} in {citation_builder.scanned_laws} laws, "
+              f"{citation_graph.law_edge_count} law->law and {citation_graph.article_edge_count} "
+              f"article->article edges in {args.citation_output}")
+    
     print(f"Log file: {log_file}")
     
+    profile_lines = []
+    if profiler is not None:
+        profiler.stop()
+        profile_summary = profiler.summary()
+        profile_lines = profiler.format_summary(profile_summary)
+        profile_summary_path = os.path.join(args.output_folder, PROFILE_SUMMARY_FILENAME)
+        profiler.close(profile_summary_path, profile_summary)
+        print("\n" + "\n".join(profile_lines))
+        print(f"Profile trace: {profiler.trace_path}")
+        print(f"Profile summary: {profile_summary_path}")
+    
     # 创建摘要文件
     summary_file = os.path.join(args.output_folder, "conversion_summary.txt")
     with open(summary_file, 'w', encoding='utf-8') as f:
@@ -271,15 +960,21 @@ def main():
         f.write(f"Date: {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"Titles file: {args.file_titles_selected_laws}\n")
         f.write(f"Raw laws folder: {args.raw_laws_folder}\n")
-        f.write(f"Supported formats: .docx, .doc\n")
+        f.write(f"Supported formats: {', '.join(extensions)}\n")
         f.write(f"Output folder: {args.output_folder}\n")
         f.write(f"Merge to single file: {args.output_merged_file}\n\n")
         f.write(f"Total titles: {len(titles)}\n")
         f.write(f"Successfully converted: {found_count}\n")
-        f.write(f"  - .docx files: {docx_count}\n")
-        f.write(f"  - .doc files: {doc_count}\n")
+        for ext, count in format_stats(format_counts):
+            f.write(f"  - .{ext} files: {count}\n")
         f.write(f"Not found: {not_found_count}\n")
         f.write(f"Errors: {error_count}\n")
+        f.write(f"Cache hits: {cache_hit_count}\n")
+        f.write(f"Cache misses: {cache_miss_count}\n")
+        if args.resume:
+            f.write(f"Resumed from journal: {len(resumed)}\n")
+        if args.force:
+            f.write("Cache: ignored (--force)\n")
         
         if merged_file_path and found_count > 0:
             f.write(f"\nMerged file: {merged_file_path}\n")
@@ -289,10 +984,13 @@ def main():
         if not_found_count > 0:
             f.write("\n\nFiles not found:\n")
             f.write("-" * 20 + "\n")
-            for title in titles:
-                file_path, _ = find_law_file(title, args.raw_laws_folder)
-                if not file_path:
-                    f.write(f"{title}.docx or {title}.doc\n")
+            for title in not_found_titles:
+                f.write(format_alternatives([title + ext for ext in extensions], 'or') + "\n")
+        
+        if profile_lines:
+            f.write("\n\nProfile:\n")
+            f.write("-" * 20 + "\n")
+            f.write("\n".join(profile_lines) + "\n")
     
     print(f"Summary saved to: {summary_file}")
 
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Find Near-Duplicate Laws
+
+Clusters near-identical documents in the raw laws folder (amended
+versions, re-promulgations, the same law as .doc and .docx) with
+shingling + MinHash + LSH, chooses a canonical version per cluster and
+writes a canonical map. Pass the map to convert_raw_law_to_plaintext.py
+and vote_items.py with --canonical_map.
+
+Texts already extracted by convert_raw_law_to_plaintext.py are reused
+(--converted_folder) and signatures are cached between runs
+(--signature_cache), so only new or changed documents are read.
+
+Usage:
+    python scripts/find_near_duplicates.py --raw_laws_folder ./data/raw_laws \\
+        --converted_folder ./data/law_text --output ./data/canonical_map.json
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.corpus.near_duplicates import (DEFAULT_BANDS, DEFAULT_PERMUTATIONS, DEFAULT_SHINGLE_SIZE,
+                                          DEFAULT_THRESHOLD, MinHasher, SignatureCache, build_canonical_map,
+                                          cluster_signatures, text_signature, write_canonical_map)
+from utils.filesystem.snapshot import read_snapshot
+from utils.readers.registry import read_plaintext, supported_extensions
+
+MANIFEST_FILENAME = "conversion_manifest.json"
+
+def list_law_files(raw_laws_folder=None, snapshot_file=None):
+    """
+    返回原始文件夹中所有可读取的法律文件 [{'path', 'size', 'mtime_ns'}]（os.walk 顺序）
+    """
+    extensions = set(supported_extensions())
+    if snapshot_file:
+        return [{'path': record['path'], 'size': record['size'], 'mtime_ns': record['mtime_ns']}
+                for record in read_snapshot(snapshot_file)
+                if os.path.splitext(record['path'])[1].lower() in extensions]
+    records = []
+    for root, dirs, files in os.walk(raw_laws_folder):
+        for filename in files:
+            if os.path.splitext(filename)[1].lower() not in extensions:
+                continue
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                print(f"Warning: Cannot stat {path}: {e}")
+                continue
+            records.append({'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return records
+
+def converted_texts(converted_folder):
+    """
+    从转换清单中找出仍然有效的纯文本输出 {源文件路径: (大小, 修改时间, 输出文件路径)}
+    """
+    if not converted_folder:
+        return {}
+    try:
+        with open(os.path.join(converted_folder, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            entries = json.load(f).get('entries', {})
+    except (OSError, ValueError) as e:
+        print(f"Warning: Cannot read conversion manifest in {converted_folder}: {e}")
+        return {}
+    texts = {}
+    for source, entry in entries.items():
+        output_path = entry.get('output_path')
+        try:
+            if output_path and os.path.getsize(output_path) == entry.get('output_size'):
+                texts[source] = (entry.get('size'), entry.get('mtime_ns'), output_path)
+        except OSError:
+            pass
+    return texts
+
+def signature_of_file(path, text_path, shingle_size, permutations):
+    """
+    读取一个文件（已转换时读取其纯文本输出）并计算签名，返回 (签名, 来源, 错误信息)
+    该函数在子进程中执行
+    """
+    try:
+        if text_path:
+            with open(text_path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+            source = 'converted'
+        else:
+            content, source = read_plaintext(path)
+        return text_signature(content, MinHasher(permutations), shingle_size), source, None
+    except Exception as e:
+        return None, None, str(e)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate raw laws and write a canonical map")
+    parser.add_argument("--raw_laws_folder", required=False, type=str, default=None,
+                       help="Folder containing raw law files")
+    parser.add_argument("--file_snapshot", required=False, type=str, default=None,
+                       help="Use a file snapshot from scripts/list_files.py --recursive --snapshot instead")
+    parser.add_argument("--converted_folder", required=False, type=str, default=None,
+                       help="Output folder of convert_raw_law_to_plaintext.py; its unchanged texts are reused")
+    parser.add_argument("--output", required=False, type=str, default="./data/canonical_map.json",
+                       help="Canonical map JSON file (default: ./data/canonical_map.json)")
+    parser.add_argument("--signature_cache", required=False, type=str, default=None,
+                       help="Optional .npz file caching MinHash signatures between runs")
+    parser.add_argument("--threshold", required=False, type=float, default=DEFAULT_THRESHOLD,
+                       help=f"Minimum estimated Jaccard similarity of near-duplicates (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--shingle_size", required=False, type=int, default=DEFAULT_SHINGLE_SIZE,
+                       help=f"Characters per shingle (default: {DEFAULT_SHINGLE_SIZE})")
+    parser.add_argument("--permutations", required=False, type=int, default=DEFAULT_PERMUTATIONS,
+                       help=f"MinHash signature length (default: {DEFAULT_PERMUTATIONS})")
+    parser.add_argument("--bands", required=False, type=int, default=DEFAULT_BANDS,
+                       help=f"LSH bands; must divide --permutations (default: {DEFAULT_BANDS})")
+    parser.add_argument("--workers", required=False, type=int, default=1,
+                       help="Number of worker processes reading documents (default: 1, serial)")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Print every cluster")
+
+    args = parser.parse_args()
+    if not args.raw_laws_folder and not args.file_snapshot:
+        parser.error("one of --raw_laws_folder or --file_snapshot is required")
+    if args.bands < 1 or args.permutations % args.bands:
+        parser.error("--bands must divide --permutations")
+
+    print("=" * 60)
+    print("Finding Near-Duplicate Laws")
+    print("=" * 60)
+
+    start = time.time()
+    records = list_law_files(args.raw_laws_folder, args.file_snapshot)
+    print(f"Found {len(records)} law files")
+
+    parameters = {'shingle_size': args.shingle_size, 'permutations': args.permutations}
+    cache = SignatureCache.load(args.signature_cache, parameters)
+    texts = converted_texts(args.converted_folder)
+    signatures = [cache.get(record) for record in records]
+    missing = [i for i, signature in enumerate(signatures) if signature is None]
+    sources = {'cached': len(records) - len(missing)}
+
+    def text_path_of(record):
+        entry = texts.get(record['path'])
+        if entry is not None and entry[0] == record['size'] and entry[1] == record['mtime_ns']:
+            return entry[2]
+        return None
+
+    def collect(i, result):
+        signature, source, error = result
+        if error:
+            print(f"Warning: Skipping {records[i]['path']}: {error}")
+            return
+        signatures[i] = signature
+        cache.put(records[i], signature)
+        sources[source] = sources.get(source, 0) + 1
+
+    tasks = [(records[i]['path'], text_path_of(records[i]), args.shingle_size, args.permutations) for i in missing]
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for i, result in zip(missing, executor.map(signature_of_file, *zip(*tasks), chunksize=8)):
+                collect(i, result)
+    else:
+        for i, task in zip(missing, tasks):
+            collect(i, signature_of_file(*task))
+    print("Signatures: " + ", ".join(f"{source}: {count}" for source, count in sources.items()))
+
+    readable = [i for i, signature in enumerate(signatures) if signature is not None]
+    cache.save(keep={records[i]['path'] for i in readable})
+    records = [records[i] for i in readable]
+    matrix = (np.stack([signatures[i] for i in readable]) if readable
+              else np.zeros((0, args.permutations), dtype=np.uint32))
+
+    clusters, pairs, _ = cluster_signatures(matrix, args.bands, args.threshold)
+    parameters.update({'bands': args.bands, 'threshold': args.threshold})
+    canonical_map = build_canonical_map(records, clusters, matrix, supported_extensions(), parameters)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_canonical_map(canonical_map, args.output)
+
+    duplicates = len(canonical_map['files'])
+    print(f"Clusters: {len(clusters)} ({duplicates} near-duplicate files, {len(pairs)} similar pairs) "
+          f"in {time.time() - start:.2f}s")
+    if args.verbose:
+        for cluster in canonical_map['clusters']:
+            print(f"  {cluster['canonical']}")
+            for member in cluster['members']:
+                print(f"    ~ {member['path']} ({member['similarity']:.2f})")
+    print(f"Canonical map saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
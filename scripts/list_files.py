@@ -1,24 +1,31 @@
 import argparse
 import os
 
+from utils.filesystem.snapshot import SNAPSHOT_FORMATS, iter_directory, snapshot_records, write_snapshot
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--dir", required=True, type=str)
 parser.add_argument("--output", required=False, type=str, default=None)
+parser.add_argument("--recursive", action="store_true",
+                    help="Also list files in subdirectories (os.walk order)")
+parser.add_argument("--snapshot", required=False, type=str, default=None,
+                    help="Write a snapshot (path, size, mtime_ns) of the listed files to this file")
+parser.add_argument("--snapshot_format", required=False, type=str, default=None, choices=SNAPSHOT_FORMATS,
+                    help="Snapshot format (default: csv for *.csv, otherwise jsonl)")
+parser.add_argument("--hash", action="store_true",
+                    help="Include the SHA-256 of each file's content in the snapshot")
 
 if __name__ == "__main__":
     args = parser.parse_args()
 
-    # List all files in directory
-    files = os.listdir(args.dir)
-
-    # Remove extensions safely
+    # List all files in directory (scandir already knows which entries are files,
+    # so directories are skipped without an extra stat per entry)
+    entries = list(iter_directory(args.dir, recursive=args.recursive))
     filenames_without_ext = []
-    for f in files:
-        # Skip directories
-        full_path = os.path.join(args.dir, f)
-        if os.path.isfile(full_path):
-            name, _ = os.path.splitext(f)
-            filenames_without_ext.append(name)
+    for entry in entries:
+        # Remove extensions safely
+        name, _ = os.path.splitext(entry.name)
+        filenames_without_ext.append(name)
 
     if args.output is not None:
         # Save to output file
@@ -26,4 +33,9 @@ if __name__ == "__main__":
             for name in filenames_without_ext:
                 out.write(name + "\n")
 
-        print(f"Saved {len(filenames_without_ext)} filenames to {args.output}")
\ No newline at end of file
+        print(f"Saved {len(filenames_without_ext)} filenames to {args.output}")
+
+    if args.snapshot is not None:
+        # Save path, size, mtime (and optionally content hash) for later runs
+        count = write_snapshot(snapshot_records(entries, with_hash=args.hash), args.snapshot, args.snapshot_format)
+        print(f"Saved snapshot of {count} files to {args.snapshot}")
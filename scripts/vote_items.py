@@ -1,6 +1,12 @@
 import argparse
+import csv
 import os
-from collections import defaultdict
+
+from utils.corpus.near_duplicates import load_canonical_map
+from utils.filesystem.snapshot import read_snapshot
+from utils.voting.ingest import ingest_files, iter_files
+from utils.voting.tally_store import TallyStore
+from utils.voting.vote_engine import VoteEngine
 
 def read_items_from_file(file_path):
     """
@@ -20,64 +26,110 @@ def read_items_from_file(file_path):
 def parse_list(file_list_arg):
     """
     解析文件列表参数，支持文件和目录
-    返回所有要处理的文件路径列表
+    返回所有要处理的文件路径列表（需要流式处理时请直接使用 iter_files）
     """
-    files_to_process = []
-    for item in file_list_arg:
-        if os.path.isfile(item):
-            files_to_process.append(item)
-        elif os.path.isdir(item):
-            # 如果是目录，获取目录下所有文件
-            for root, dirs, filenames in os.walk(item):
-                for filename in filenames:
-                    files_to_process.append(os.path.join(root, filename))
-        else:
-            print(f"Warning: {item} is not a valid file or directory")
-    return files_to_process
+    return list(iter_files(file_list_arg))
 
-def vote_selection(file_list, ratio=2/3, output_file=None, verbose=False):
+def read_weights_from_file(file_path):
     """
-    从多个文件中读取条目，选择出现次数超过比例阈值的条目
-    
-    Args:
-        file_list: 要处理的文件列表
-        ratio: 阈值比例 (默认 2/3)
-        output_file: 输出文件路径 (可选)
-        verbose: 是否打印详细信息
+    读取文件权重，每行 "文件路径 权重"（空白或逗号分隔），# 开头为注释
+    返回 weight_of(file_path) 函数：先按路径匹配，再按文件名匹配，未列出的文件权重为 1
     """
-    # 读取所有文件中的条目
-    all_items = []
-    file_item_counts = []
-    
-    for file_path in file_list:
-        items = read_items_from_file(file_path)
-        all_items.extend(items)
-        file_item_counts.append((file_path, items))
+    weights = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path, _, weight = line.replace(',', ' ').rpartition(' ')
+            try:
+                weights[os.path.normpath(path.strip())] = float(weight)
+            except ValueError:
+                raise Exception(f"Invalid weight on line {line_number} of {file_path}: {line}")
+
+    basenames = {os.path.basename(path): weight for path, weight in weights.items()}
+
+    def weight_of(path):
+        path = os.path.normpath(path)
+        if path in weights:
+            return weights[path]
+        return basenames.get(os.path.basename(path), 1.0)
+
+    return weight_of
+
+def save_agreement(engine, output_file):
+    """
+    保存文件两两之间的一致度（交集条目数和 Jaccard 系数）为 CSV
+    """
+    intersection, jaccard = engine.agreement()
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file_a', 'file_b', 'items_a', 'items_b', 'shared', 'jaccard'])
+        for i in range(engine.file_count):
+            for j in range(i + 1, engine.file_count):
+                writer.writerow([engine.files[i], engine.files[j], intersection[i, i], intersection[j, j],
+                                 intersection[i, j], f"{jaccard[i, j]:.4f}"])
+    print(f"Pairwise agreement for {engine.file_count} files saved to {output_file}")
+
+def collect_votes(file_list, verbose=False, workers=8, weight_of=None, tally_store=None, aliases=None):
+    """
+    并发读取所有文件并统计投票，返回 VoteEngine
+    file_list 可以是任意可迭代对象（例如 iter_files 生成器），文件按输入顺序合并
+    weight_of(file_path) 返回文件权重；指定 tally_store 路径时增量更新并保存持久化的计票
+    aliases 为 {条目: 规范条目}（近似重复法律的标题），统计后把别名的票并入规范条目
+    """
+    def on_file(file_path, line_count, error, fingerprint=None):
+        if error:
+            print(f"Error reading {file_path}: {error}")
         if verbose:
-            print(f"Read {len(items)} items from {file_path}")
-    
-    # 统计每个条目出现的次数
-    item_vote_count = defaultdict(int)
-    for file_path, items in file_item_counts:
-        # 使用set去除单个文件内的重复条目
-        unique_items = set(items)
-        for item in unique_items:
-            item_vote_count[item] += 1
+            print(f"Read {line_count} items from {file_path}")
+
+    def on_reuse(file_path, line_count):
+        if verbose:
+            print(f"Reused {line_count} items from {file_path} (unchanged)")
+
+    progress_interval = 5.0 if verbose else None
+    if tally_store:
+        store = TallyStore.load(tally_store)
+        stats, changes = store.sync(file_list, weight_of=weight_of, max_workers=workers, on_file=on_file,
+                                    on_reuse=on_reuse, progress_interval=progress_interval)
+        store.save()
+        engine = store.engine
+        print(f"Tally store {tally_store}: {changes['reused']} reused, {changes['added']} added, "
+              f"{changes['replaced']} replaced, {changes['removed']} removed, {changes['unreadable']} unreadable")
+    else:
+        engine = VoteEngine()
+        stats = ingest_files(engine, file_list, max_workers=workers, on_file=on_file,
+                             progress_interval=progress_interval, weight_of=weight_of)
+    if verbose:
+        print(f"Ingested {stats.report(len(engine))}")
+    if aliases:
+        # 持久化的计票保存的是原始条目，合并只作用于本次的结果
+        merged = engine.merge_items(aliases)
+        print(f"Merged {merged} near-duplicate titles into their canonical versions")
+    return engine
+
+def report_selection(engine, ratio=2/3, output_file=None, verbose=False, agreement_output=None, min_votes=1):
+    """
+    根据投票引擎中的（加权）票数选择条目，并输出结果和统计信息
+    选择规则：加权票数 >= 总权重 * ratio，且至少 min_votes 个文件投票；权重均为 1 时即 票数 >= 文件数 * ratio
+    """
+    file_count = engine.file_count
+    total_weight = engine.total_weight()
+    weighted = any(weight != 1.0 for weight in engine.weights)
     
     # 计算阈值
-    threshold = len(file_list) * ratio
+    threshold = total_weight * ratio
     if verbose:
-        print(f"\nTotal files: {len(file_list)}")
+        print(f"\nTotal files: {file_count}")
+        if weighted:
+            print(f"Total weight: {total_weight:.2f}")
         print(f"Threshold: {threshold:.2f} ({ratio:.1%})")
+        if min_votes > 1:
+            print(f"Minimum votes: {min_votes}")
     
-    # 筛选达到阈值的条目
-    selected_items = []
-    for item, count in item_vote_count.items():
-        if count >= threshold:
-            selected_items.append(item)
-    
-    # 按字母顺序排序，使输出更整齐
-    selected_items.sort()
+    # 筛选达到阈值的条目（按字母顺序排序，使输出更整齐）
+    selected_items = engine.select_quorum(ratio, min_votes)
     
     # 输出结果
     if output_file:
@@ -93,43 +145,90 @@ def vote_selection(file_list, ratio=2/3, output_file=None, verbose=False):
     # 打印统计信息
     if verbose:
         print(f"\nVote statistics:")
-        print(f"Total unique items: {len(item_vote_count)}")
+        print(f"Total unique items: {len(engine)}")
         print(f"Items meeting threshold: {len(selected_items)}")
         
         # 显示投票分布
-        vote_distribution = defaultdict(int)
-        for count in item_vote_count.values():
-            vote_distribution[count] += 1
+        vote_distribution = engine.vote_distribution()
         
         print("\nVote distribution:")
         for votes in sorted(vote_distribution.keys()):
             count = vote_distribution[votes]
-            percentage = count / len(item_vote_count) * 100
-            print(f"  {votes}/{len(file_list)} votes: {count} items ({percentage:.1f}%)")
+            percentage = count / len(engine) * 100
+            print(f"  {votes}/{file_count} votes: {count} items ({percentage:.1f}%)")
+    
+    if agreement_output:
+        save_agreement(engine, agreement_output)
     
     return selected_items
 
+def vote_selection(file_list, ratio=2/3, output_file=None, verbose=False, agreement_output=None, workers=8,
+                   weight_of=None, min_votes=1, tally_store=None, aliases=None):
+    """
+    从多个文件中读取条目，选择出现次数超过比例阈值的条目
+    
+    Args:
+        file_list: 要处理的文件列表（或文件路径的可迭代对象）
+        ratio: 阈值比例 (默认 2/3)
+        output_file: 输出文件路径 (可选)
+        verbose: 是否打印详细信息
+        agreement_output: 文件两两一致度的 CSV 输出路径 (可选)
+        workers: 并发读取文件的线程数 (默认 8)
+        weight_of: 返回文件权重的函数 (可选，默认权重均为 1)
+        min_votes: 至少需要的投票文件数 (默认 1)
+        tally_store: 持久化计票文件路径 (可选，指定时只读取新增或修改的文件)
+        aliases: {条目: 规范条目}，别名的票并入规范条目 (可选)
+    """
+    engine = collect_votes(file_list, verbose, workers, weight_of, tally_store, aliases)
+    return report_selection(engine, ratio, output_file, verbose, agreement_output, min_votes)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Vote selection from multiple files - select items appearing in > threshold% of files')
-    parser.add_argument("--file_list", nargs='+', required=True, 
+    parser.add_argument("--file_list", nargs='+', required=False, default=[],
                        help="List of files or directories containing items to vote on")
+    parser.add_argument("--file_snapshot", required=False, type=str, default=None,
+                       help="Vote on the files listed in a snapshot from scripts/list_files.py --snapshot")
     parser.add_argument("--ratio", default=2/3, type=float, 
                        help="Vote threshold ratio (default: 2/3)")
     parser.add_argument("--output", required=False, type=str, default=None,
                        help="Output file path (optional)")
     parser.add_argument("--verbose", action="store_true",
                        help="Print verbose information")
+    parser.add_argument("--agreement_output", required=False, type=str, default=None,
+                       help="Save pairwise file agreement (shared items, Jaccard) as CSV (optional)")
+    parser.add_argument("--workers", required=False, type=int, default=8,
+                       help="Number of threads reading files concurrently (default: 8)")
+    parser.add_argument("--weights", required=False, type=str, default=None,
+                       help="File of per-file weights, one '<path> <weight>' per line (default weight: 1)")
+    parser.add_argument("--min_votes", required=False, type=int, default=1,
+                       help="Minimum number of files that must list an item (default: 1)")
+    parser.add_argument("--tally_store", required=False, type=str, default=None,
+                       help="Persisted tally file (.npz); only new or modified files are re-read")
+    parser.add_argument("--canonical_map", required=False, type=str, default=None,
+                       help="Canonical map from scripts/find_near_duplicates.py; votes for near-duplicate "
+                            "titles count for their canonical title")
     
     args = parser.parse_args()
+    if not args.file_list and not args.file_snapshot:
+        parser.error("one of --file_list or --file_snapshot is required")
     
-    # 解析文件列表，获取所有要处理的文件
-    files_to_process = parse_list(args.file_list)
+    # 先展开文件列表（只保存路径），以便在读取之前报告文件数；文件内容仍然流式并发读取
+    weight_of = read_weights_from_file(args.weights) if args.weights else None
+    if args.file_snapshot:
+        # 快照中已经列出了所有文件，无需再遍历目录
+        file_paths = [record['path'] for record in read_snapshot(args.file_snapshot)]
+    else:
+        file_paths = parse_list(args.file_list)
     
-    if not files_to_process:
+    if not file_paths:
         print("No files found to process!")
         exit(1)
     
-    print(f"Found {len(files_to_process)} files to process")
+    print(f"Found {len(file_paths)} files to process")
+    
+    aliases = load_canonical_map(args.canonical_map)['titles'] if args.canonical_map else None
+    engine = collect_votes(file_paths, args.verbose, args.workers, weight_of, args.tally_store, aliases)
     
     # 执行投票选择
-    selected = vote_selection(files_to_process, args.ratio, args.output, args.verbose)
\ No newline at end of file
+    selected = report_selection(engine, args.ratio, args.output, args.verbose, args.agreement_output,
+                                args.min_votes)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Coq Proof Obligations
+
+Turns an extracted transition system and a list of reachability claims
+into generated Coq files in the style of formal_validation/example.v,
+and checks them with coqc in parallel.
+
+    LegalModel.v       Inductive LegalStatus / LegalTransition (with
+                       Law_Id and Law_Compose) built from the transitions
+    Obligations_NNN.v  one shard of theorems, e.g.
+                         Theorem validation_reachability :
+                           LegalTransition Unowned Disputed.
+                         Proof.
+                           idtac "---_Obligation:_validation_reachability_---".
+                           exact (Law_Compose Unowned Owned Disputed
+                                  Law_Purchase Law_Contest).
+                         Time Qed.
+
+Proof terms come from the ReachabilityIndex witness paths; claims without
+a path are reported as unprovable instead of being generated. A claim is
+assigned to a shard by a hash of its name, so adding one claim changes
+only one shard. Every coqc run is cached by the SHA-256 of the model, the
+shard and the coqc version, so only changed shards are re-checked.
+Per-theorem times are read from the idtac markers and the "Finished
+transaction in ... secs" lines printed by Time Qed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.category.facts import FactStore
+from utils.category.morphisms import MorphismStore
+from utils.category.reachability import ReachabilityIndex
+from utils.readers.external_tools import tool_path
+
+MODEL_NAME = 'LegalModel'
+# 生成的模型中已占用的名称
+RESERVED_NAMES = {'LegalStatus', 'LegalTransition', 'Law_Id', 'Law_Compose'}
+LOGICAL_PREFIX = 'LegalGen'
+CACHE_FILENAME = 'coq_cache.json'
+DEFAULT_TIMEOUT = 300
+
+# Coq 标识符（允许 Unicode 字母）
+IDENTIFIER_PATTERN = re.compile(r"^[^\W\d][\w']*$")
+MARKER_PATTERN = re.compile(r'---_Obligation:_(.+?)_---')
+TIMING_PATTERN = re.compile(r'Finished transaction in ([0-9.]+) secs')
+ERROR_LINE_PATTERN = re.compile(r'File "[^"]*", line (\d+)')
+
+def check_identifier(name):
+    """
+    检查名称是否是合法的 Coq 标识符，不合法时抛出异常
+    """
+    if not IDENTIFIER_PATTERN.match(name):
+        raise Exception(f"Not a valid Coq identifier: {name!r}")
+    return name
+
+def read_jsonl(file_path):
+    """
+    逐行读取 JSONL 文件（跳过空行）
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise Exception(f"Invalid JSON on line {line_number} of {file_path}: {e}")
+
+def load_transition_system(transitions):
+    """
+    由迁移记录 [{'label', 'source', 'target'}] 构建 (FactStore, MorphismStore)
+    状态为命名的不透明事实（Parameter），迁移为带标签的基本态射
+    """
+    facts = FactStore()
+    morphisms = MorphismStore(facts)
+    labels = set()
+    for record in transitions:
+        label = check_identifier(record['label'])
+        if label in labels or label in RESERVED_NAMES:
+            raise Exception(f"Duplicate or reserved transition label: {label}")
+        labels.add(label)
+        source = facts.parameter(check_identifier(record['source']))
+        target = facts.parameter(check_identifier(record['target']))
+        morphisms.add_morphism(source, target, label)
+
+    if not labels:
+        raise Exception("No transitions found")
+    # 状态和迁移都是构造子，在 Coq 中共享同一个命名空间
+    clashes = (labels | RESERVED_NAMES) & set(facts.name_ids)
+    if clashes:
+        raise Exception(f"Names used both as states and transitions: {', '.join(sorted(clashes))}")
+    return facts, morphisms
+
+def model_source(facts, morphisms):
+    """
+    生成 LegalModel.v：状态的归纳类型和迁移关系（含 Law_Id 与 Law_Compose）
+    """
+    states = [facts.names[fact] for fact in range(len(facts)) if fact in facts.names]
+    lines = [
+        "(** Generated by utils/category/coq_obligations.py - do not edit **)",
+        "",
+        "Inductive LegalStatus : Set :=",
+    ]
+    lines += [f"  | {state} : LegalStatus" for state in states]
+    lines[-1] += "."
+    lines += [
+        "",
+        "Inductive LegalTransition : LegalStatus -> LegalStatus -> Prop :=",
+        "  | Law_Id      : forall s, LegalTransition s s",
+    ]
+    for morphism in range(morphisms.base_count):
+        lines.append(f"  | {morphisms.label(morphism)} : LegalTransition "
+                     f"{facts.names[morphisms.source(morphism)]} {facts.names[morphisms.target(morphism)]}")
+    lines += [
+        "  | Law_Compose : forall a b c,",
+        "      LegalTransition a b -> LegalTransition b c -> LegalTransition a c.",
+        "",
+    ]
+    return "\n".join(lines)
+
+def obligation_source(name, source, target, proof_term):
+    """
+    生成一个可达性定理（带 idtac 标记和 Time Qed 计时）
+    """
+    return (f"Theorem {name} : LegalTransition {source} {target}.\n"
+            f"Proof.\n"
+            f"  idtac \"---_Obligation:_{name}_---\".\n"
+            f"  exact ({proof_term}).\n"
+            f"Time Qed.\n")
+
+def shard_of(name, shard_count):
+    """
+    按名称的哈希分片，新增定理只会改变它所在的分片
+    """
+    return zlib.crc32(name.encode('utf-8')) % shard_count
+
+def generate_obligations(facts, morphisms, claims, output_dir, shard_count=16):
+    """
+    为可达性断言 [{'name', 'source', 'target'}] 生成 Coq 文件
+    返回 (分片列表 [{'file', 'theorems': [(名称, 起始行, 结束行)]}], 无法证明的断言列表)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    index = ReachabilityIndex(morphisms)
+    shards = [[] for _ in range(shard_count)]
+    unprovable = []
+    names = set()
+    # 定理与 LegalModel.v 中的状态、迁移共享命名空间，同名会在 coqc 中重复定义
+    model_names = RESERVED_NAMES | set(facts.name_ids) | {morphisms.label(morphism)
+                                                         for morphism in range(morphisms.base_count)}
+
+    for claim in claims:
+        name = check_identifier(claim['name'])
+        if name in names:
+            raise Exception(f"Duplicate theorem name: {name}")
+        if name in model_names:
+            raise Exception(f"Theorem name is already used by a state, transition or the model: {name}")
+        names.add(name)
+        source = facts.name_ids.get(claim['source'])
+        target = facts.name_ids.get(claim['target'])
+        term = index.witness_proof_term(source, target) if source is not None and target is not None else None
+        if term is None:
+            unprovable.append(claim)
+            continue
+        shards[shard_of(name, shard_count)].append((name, obligation_source(name, claim['source'], claim['target'], term)))
+
+    write_if_changed(os.path.join(output_dir, MODEL_NAME + '.v'), model_source(facts, morphisms))
+
+    generated = []
+    for shard_number, theorems in enumerate(shards):
+        file_path = os.path.join(output_dir, f"Obligations_{shard_number:03d}.v")
+        if not theorems:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            continue
+        lines = [f"From {LOGICAL_PREFIX} Require Import {MODEL_NAME}.", ""]
+        ranges = []
+        # 分片内按名称排序，保证内容稳定（缓存才能命中）
+        for name, source in sorted(theorems):
+            start = len(lines) + 1
+            lines.extend(source.rstrip("\n").split("\n"))
+            ranges.append((name, start, len(lines)))
+            lines.append("")
+        write_if_changed(file_path, "\n".join(lines))
+        generated.append({'file': file_path, 'theorems': ranges})
+    return generated, unprovable
+
+def write_if_changed(file_path, content):
+    """
+    内容变化时才写文件（保持 coqc 产物的时间戳），通过临时文件原子替换
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+    return True
+
+def coqc_version():
+    """
+    返回 coqc --version 的输出，未安装时抛出异常
+    """
+    coqc = tool_path('coqc')
+    if coqc is None:
+        raise Exception("coqc not installed. Please install Coq (e.g. opam install coq)")
+    result = subprocess.run([coqc, '--version'], capture_output=True, text=True)
+    return result.stdout.strip()
+
+def run_coqc(file_path, output_dir, timeout=DEFAULT_TIMEOUT):
+    """
+    用 coqc 检查一个文件，返回 {'status': ok/failed/timeout, 'output', 'seconds'}
+    """
+    command = [tool_path('coqc'), '-Q', output_dir, LOGICAL_PREFIX, file_path]
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        status = 'ok' if result.returncode == 0 else 'failed'
+        output = result.stdout + result.stderr
+    except subprocess.TimeoutExpired as e:
+        status = 'timeout'
+        output = (e.stdout or b'').decode('utf-8', 'replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+        output += f"\ncoqc timed out after {timeout}s and was killed"
+    return {'status': status, 'output': output, 'seconds': time.perf_counter() - started}
+
+def parse_theorem_timings(output):
+    """
+    从 coqc 输出中提取每个定理的 Qed 时间 {定理名: 秒}
+    idtac 标记之后的第一条 "Finished transaction" 属于该定理
+    """
+    timings = {}
+    current = None
+    for line in output.splitlines():
+        marker = MARKER_PATTERN.search(line)
+        if marker:
+            current = marker.group(1)
+            continue
+        timing = TIMING_PATTERN.search(line)
+        if timing and current is not None:
+            timings[current] = float(timing.group(1))
+            current = None
+    return timings
+
+def failed_theorem(output, theorems):
+    """
+    根据 coqc 错误信息中的行号找到出错的定理，找不到时返回 None
+    """
+    match = ERROR_LINE_PATTERN.search(output)
+    if match:
+        line = int(match.group(1))
+        for name, start, end in theorems:
+            if start <= line <= end:
+                return name
+    return None
+
+def file_digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def check_obligations(shards, output_dir, workers=4, timeout=DEFAULT_TIMEOUT, use_cache=True, on_result=None):
+    """
+    先编译 LegalModel.v（.vo 比 .v 新时跳过），再用线程池并行运行 coqc 检查各分片（每个 coqc 是独立进程）
+    分片结果按 (模型, 分片内容, coqc 版本) 的哈希缓存，未变化的分片不会重新检查
+    on_result(shard, result) 在每个分片完成后调用
+    返回 {'model': 结果, 'shards': [结果], 'theorems': {定理名: {'status', 'seconds', 'file'}}}
+    """
+    version = coqc_version()
+    cache_path = os.path.join(output_dir, CACHE_FILENAME)
+    cache = {}
+    if use_cache:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+    model_path = os.path.join(output_dir, MODEL_NAME + '.v')
+    with open(model_path, 'r', encoding='utf-8') as f:
+        model = f.read()
+    # 模型的 .vo 是所有分片的依赖，必须存在才能复用缓存；比 .v 新时不重新编译
+    vo_path = os.path.join(output_dir, MODEL_NAME + '.vo')
+    if use_cache and os.path.exists(vo_path) and os.path.getmtime(vo_path) > os.path.getmtime(model_path):
+        model_result = {'status': 'ok', 'output': '', 'seconds': 0.0, 'cached': True}
+    else:
+        model_result = run_coqc(model_path, output_dir, timeout)
+    report = {'coqc_version': version, 'model': model_result, 'shards': [], 'theorems': {}}
+    if model_result['status'] != 'ok':
+        return report
+
+    def check(shard):
+        with open(shard['file'], 'r', encoding='utf-8') as f:
+            digest = file_digest(version, model, f.read())
+        cached = cache.get(os.path.basename(shard['file']))
+        if cached is not None and cached.get('digest') == digest and cached['result']['status'] == 'ok':
+            return dict(cached['result'], cached=True), digest
+        return dict(run_coqc(shard['file'], output_dir, timeout), cached=False), digest
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for shard, (result, digest) in zip(shards, executor.map(check, shards)):
+            timings = parse_theorem_timings(result['output'])
+            failed = failed_theorem(result['output'], shard['theorems']) if result['status'] != 'ok' else None
+            for name, _, _ in shard['theorems']:
+                if name in timings:
+                    status = 'ok'
+                elif name == failed:
+                    status = result['status']
+                else:
+                    # 出错或超时之后的定理没有被检查
+                    status = 'ok' if result['status'] == 'ok' else 'not_checked'
+                report['theorems'][name] = {'status': status, 'seconds': timings.get(name), 'file': shard['file']}
+            report['shards'].append(dict(result, file=shard['file'], theorem_count=len(shard['theorems'])))
+            cache[os.path.basename(shard['file'])] = {'digest': digest, 'result': {
+                key: value for key, value in result.items() if key != 'cached'}}
+            if on_result is not None:
+                on_result(shard, result)
+
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    return report
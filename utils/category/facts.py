@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fact Store
+
+Python counterpart of the Fact type in formal_validation/legal_core.v:
+
+    Inductive AtomType := Entity_Obj | Process_Obj | Event_Obj
+                        | State_Obj | Property_Obj | Relation_Obj.
+    Inductive Fact := Atom : AtomType -> Fact
+                    | Evolve : Fact -> Fact -> Fact
+                    | Aggregate : list Fact -> Fact.
+
+Facts are hash-consed: every structurally distinct fact is stored once and
+identified by an integer id, so a fact is a node of a DAG and equal facts
+always have equal ids. Nodes live in flat typed arrays (kind, atom type,
+child offsets into one child array) rather than one Python object each;
+Fact is only a lightweight __slots__ handle (store, id) for convenience.
+
+Named opaque facts (e.g. the states Unowned/Owned/Disputed of example.v)
+are Param nodes, i.e. "Parameter Unowned : Fact." on the Coq side.
+to_coq() renders a fact as a Coq term and from_coq() parses one back.
+"""
+
+import re
+from array import array
+from enum import IntEnum
+
+# Coq 事实项的词法单元：括号、列表分隔符和标识符
+TERM_TOKEN_PATTERN = re.compile(r"\s*(?:([()\[\];])|([^\W\d][\w']*))")
+
+class AtomType(IntEnum):
+    """
+    原子类型，与 legal_core.v 中的 AtomType 构造子一一对应
+    """
+    Entity_Obj = 0      # 实体：实在客体或抽象权利
+    Process_Obj = 1     # (1) 过程：作为客体存在的程序
+    Event_Obj = 2       # (2) 事件：作为客体存在的发生
+    State_Obj = 3       # (3) 状态：法律存续的样态
+    Property_Obj = 4    # (4) 属性：客体的法律特征
+    Relation_Obj = 5    # (5) 关系：主体间的法律纽带
+
+class NodeKind(IntEnum):
+    """
+    事实节点的种类，与 Fact 的构造子对应
+    """
+    Atom = 0
+    Evolve = 1
+    Aggregate = 2
+    # 不透明的命名事实，对应 Coq 中的 "Parameter 名称 : Fact."（如 Unowned、Owned 等状态）
+    Param = 3
+
+class FactStore:
+    """
+    哈希共享（hash-consing）的事实存储：结构相同的事实只存储一次，用整数 id 表示
+    """
+
+    def __init__(self):
+        # 每个节点一项：种类、原子类型（非原子为 -1）、子节点在 children 中的起止位置
+        self.kinds = array('b')
+        self.atom_types = array('b')
+        self.child_offsets = array('q', [0])
+        self.children = array('q')
+        # 结构 -> id，用于哈希共享
+        self._interned = {}
+        # 可选的事实名称（如 Coq 中的 Definition 名）
+        self.names = {}
+        self.name_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _intern(self, key, kind, atom_type, child_ids):
+        fact_id = self._interned.get(key)
+        if fact_id is None:
+            fact_id = len(self.kinds)
+            self.kinds.append(kind)
+            self.atom_types.append(atom_type)
+            self.children.extend(child_ids)
+            self.child_offsets.append(len(self.children))
+            self._interned[key] = fact_id
+        return fact_id
+
+    def _check(self, fact_id):
+        if not 0 <= fact_id < len(self.kinds):
+            raise ValueError(f"Unknown fact id: {fact_id}")
+        return fact_id
+
+    def atom(self, atom_type):
+        """
+        Atom t，返回事实 id
+        """
+        atom_type = AtomType(atom_type)
+        return self._intern((NodeKind.Atom, int(atom_type)), NodeKind.Atom, atom_type, ())
+
+    def evolve(self, source, target):
+        """
+        Evolve a b：事实间的演变，返回事实 id
+        """
+        source, target = self._check(int(source)), self._check(int(target))
+        return self._intern((NodeKind.Evolve, source, target), NodeKind.Evolve, -1, (source, target))
+
+    def aggregate(self, facts):
+        """
+        Aggregate [f1; ...; fn]：事实的集合/过程流（保持顺序），返回事实 id
+        """
+        child_ids = tuple(self._check(int(fact)) for fact in facts)
+        return self._intern((NodeKind.Aggregate,) + child_ids, NodeKind.Aggregate, -1, child_ids)
+
+    def parameter(self, name):
+        """
+        命名的不透明事实（Coq 中的 Parameter），同名即为同一事实，返回事实 id
+        """
+        existing = self.name_ids.get(name)
+        if existing is not None and self.kinds[existing] != NodeKind.Param:
+            raise ValueError(f"Name already used by fact {existing}: {name}")
+        fact_id = self._intern((NodeKind.Param, name), NodeKind.Param, -1, ())
+        self.names[fact_id] = name
+        self.name_ids[name] = fact_id
+        return fact_id
+
+    def lookup(self, kind, *args):
+        """
+        查找已存在的事实，不存在时返回 None（不会创建新节点）
+        例如 lookup(NodeKind.Evolve, a, b)、lookup(NodeKind.Aggregate, *facts)、
+        lookup(NodeKind.Atom, AtomType.Entity_Obj)
+        """
+        kind = NodeKind(kind)
+        if kind == NodeKind.Atom:
+            return self._interned.get((kind, int(AtomType(args[0]))))
+        if kind == NodeKind.Param:
+            return self._interned.get((kind, args[0]))
+        return self._interned.get((kind,) + tuple(int(arg) for arg in args))
+
+    def kind(self, fact_id):
+        return NodeKind(self.kinds[fact_id])
+
+    def atom_type(self, fact_id):
+        """
+        原子事实的 AtomType，非原子事实返回 None
+        """
+        value = self.atom_types[fact_id]
+        return AtomType(value) if value >= 0 else None
+
+    def child_ids(self, fact_id):
+        """
+        子事实 id（Evolve 为 (a, b)，Aggregate 为列表中的事实，Atom 为空）
+        """
+        return tuple(self.children[self.child_offsets[fact_id]:self.child_offsets[fact_id + 1]])
+
+    def name(self, fact_id, name):
+        """
+        给事实命名（一个事实可以只有一个名称，名称不能重复）
+        """
+        existing = self.name_ids.get(name)
+        if existing is not None and existing != fact_id:
+            raise ValueError(f"Name already used by fact {existing}: {name}")
+        if self.kinds[self._check(fact_id)] == NodeKind.Param and self.names[fact_id] != name:
+            raise ValueError(f"Cannot rename parameter {self.names[fact_id]}")
+        self.names[fact_id] = name
+        self.name_ids[name] = fact_id
+        return fact_id
+
+    def by_name(self, name):
+        return self.name_ids[name]
+
+    def handle(self, fact_id):
+        """
+        返回事实的 Fact 句柄
+        """
+        return Fact(self, self._check(int(fact_id)))
+
+    def to_coq(self, fact_id, use_names=True, parens=False):
+        """
+        把事实转换为 Coq 项，如 "Evolve (Atom Entity_Obj) (Atom Property_Obj)"
+        use_names=True 时已命名的子事实用名称表示；parens=True 时给整个项加括号（作为参数时使用）
+        """
+        def term(node, parens, root=False):
+            if use_names and not root and node in self.names:
+                return self.names[node]
+            kind = self.kinds[node]
+            if kind == NodeKind.Param:
+                return self.names[node]
+            if kind == NodeKind.Atom:
+                text = f"Atom {AtomType(self.atom_types[node]).name}"
+            elif kind == NodeKind.Evolve:
+                source, target = self.child_ids(node)
+                text = f"Evolve {term(source, True)} {term(target, True)}"
+            else:
+                text = "Aggregate [" + "; ".join(term(child, False) for child in self.child_ids(node)) + "]"
+            return f"({text})" if parens else text
+        return term(self._check(fact_id), parens, root=True)
+
+    def from_coq(self, text, declare=False):
+        """
+        把 Coq 项（to_coq 的输出格式）解析为事实，返回事实 id，如 "Evolve (Atom Entity_Obj) Unowned"
+        标识符为已有事实的名称；declare=True 时未知的标识符作为新的 Parameter
+        """
+        tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TERM_TOKEN_PATTERN.match(text, position)
+            if match is None:
+                raise ValueError(f"Cannot parse fact term at position {position}: {text!r}")
+            tokens.append(match.group(1) or match.group(2))
+            position = match.end()
+        tokens.append(None)
+        position = 0
+
+        def take(expected=None):
+            nonlocal position
+            token = tokens[position]
+            if token is None or (expected is not None and token != expected):
+                raise ValueError(f"Expected {expected or 'a term'} but found {token or 'end of input'} in {text!r}")
+            position += 1
+            return token
+
+        def named(token):
+            if token in ('(', ')', '[', ']', ';', 'Atom', 'Evolve', 'Aggregate'):
+                raise ValueError(f"Unexpected {token} in {text!r}")
+            fact_id = self.name_ids.get(token)
+            if fact_id is None:
+                if not declare:
+                    raise ValueError(f"Unknown fact name {token} in {text!r}")
+                fact_id = self.parameter(token)
+            return fact_id
+
+        def argument():
+            token = take()
+            if token == '(':
+                fact_id = term()
+                take(')')
+                return fact_id
+            return named(token)
+
+        def term():
+            token = take()
+            if token == '(':
+                fact_id = term()
+                take(')')
+                return fact_id
+            if token == 'Atom':
+                name = take()
+                if name not in AtomType.__members__:
+                    raise ValueError(f"Unknown atom type {name} in {text!r}")
+                return self.atom(AtomType[name])
+            if token == 'Evolve':
+                source = argument()
+                return self.evolve(source, argument())
+            if token == 'Aggregate':
+                take('[')
+                child_ids = []
+                if tokens[position] != ']':
+                    child_ids.append(term())
+                    while tokens[position] == ';':
+                        take(';')
+                        child_ids.append(term())
+                take(']')
+                return self.aggregate(child_ids)
+            return named(token)
+
+        fact_id = term()
+        if tokens[position] is not None:
+            raise ValueError(f"Unexpected {tokens[position]} after the end of {text!r}")
+        return fact_id
+
+class Fact:
+    """
+    事实句柄：只保存存储和 id，比较和哈希都基于 id（哈希共享保证结构相同即 id 相同）
+    """
+
+    __slots__ = ('store', 'id')
+
+    def __init__(self, store, fact_id):
+        self.store = store
+        self.id = fact_id
+
+    def __eq__(self, other):
+        return isinstance(other, Fact) and self.store is other.store and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __int__(self):
+        return self.id
+
+    def __index__(self):
+        return self.id
+
+    @property
+    def kind(self):
+        return self.store.kind(self.id)
+
+    @property
+    def atom_type(self):
+        return self.store.atom_type(self.id)
+
+    @property
+    def children(self):
+        return tuple(Fact(self.store, child) for child in self.store.child_ids(self.id))
+
+    def __repr__(self):
+        return f"Fact({self.id}: {self.store.to_coq(self.id)})"
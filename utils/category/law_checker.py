@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Category Law Checker
+
+Checks that a finite composition table extracted from the corpus is a
+category, i.e. satisfies the Identity and Associativity axioms of
+formal_validation/legal_core.v.
+
+A table is a directory of .npy files (memory-mapped, never loaded whole):
+
+    sources.npy     int64[n]    source object of each morphism
+    targets.npy     int64[n]    target object of each morphism
+    identities.npy  int64[m]    identity morphism of each object
+    compose.npy     int32/64[n, n]  compose[f, g] = id of "Compose f g"
+                                    (f then g), -1 where undefined
+
+Three checks are run, all as NumPy array operations:
+    typing         compose[f, g] is defined exactly when target(f) ==
+                   source(g), and then is a morphism id in [0, n) going
+                   from source(f) to target(g)
+    identity       Compose (Identity A) f = f = Compose f (Identity B)
+    associativity  Compose f (Compose g h) = Compose (Compose f g) h for
+                   every composable triple
+
+Associativity is checked per hom-set G = Hom(B, C): with F the morphisms
+into B and H the morphisms out of C, the whole |F| x |G| x |H| block of
+triples is compared at once, so only composable triples are visited.
+Blocks (split further along H, G and F so that none holds more than
+block_elements triples) are spread over a ProcessPoolExecutor; each
+worker memory-maps the table itself. Every counterexample is reported.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.category.morphisms import MorphismKind
+from utils.category.reachability import ReachabilityIndex
+
+TABLE_FILES = ('sources', 'targets', 'identities', 'compose')
+UNDEFINED = -1
+
+def save_table(table_dir, sources, targets, identities, compose):
+    """
+    把组合表保存为 .npy 文件目录
+    """
+    os.makedirs(table_dir, exist_ok=True)
+    arrays = {'sources': sources, 'targets': targets, 'identities': identities, 'compose': compose}
+    for name in TABLE_FILES:
+        np.save(os.path.join(table_dir, name + '.npy'), np.asarray(arrays[name]))
+    return table_dir
+
+def load_table(table_dir):
+    """
+    以内存映射方式加载组合表，返回 {名称: 数组}
+    """
+    return {name: np.load(os.path.join(table_dir, name + '.npy'), mmap_mode='r') for name in TABLE_FILES}
+
+def table_from_store(store, objects):
+    """
+    从 MorphismStore 构建有限范畴的组合表：对象为给定的事实，态射为这些对象之间的
+    恒等态射、基本态射以及它们的所有复合（按路径哈希共享）；图中有环时抛出异常
+    返回 (sources, targets, identities, compose, 态射 id 列表)
+    """
+    objects = [int(fact) for fact in objects]
+    object_index = {fact: i for i, fact in enumerate(objects)}
+    morphisms = [store.identity(fact) for fact in objects]
+    morphisms += [m for m in range(len(store)) if store.kinds[m] == MorphismKind.Base
+                  and store.source(m) in object_index and store.target(m) in object_index]
+
+    # 有环时路径无限多，组合表不是有限的
+    reachability = ReachabilityIndex(store)
+    for m in morphisms[len(objects):]:
+        if reachability.reachable(store.target(m), store.source(m)):
+            raise Exception(f"Transition graph has a cycle through morphism {store.label(m) or m}; "
+                            f"its composition table is infinite")
+
+    # 计算复合闭包
+    known = set(morphisms)
+    frontier = list(morphisms)
+    while frontier:
+        new = []
+        for f in frontier:
+            for g in list(known):
+                for first, second in ((f, g), (g, f)):
+                    if store.target(first) == store.source(second):
+                        composite = store.compose(first, second)
+                        if composite not in known:
+                            known.add(composite)
+                            new.append(composite)
+        morphisms.extend(new)
+        frontier = new
+
+    position = {m: i for i, m in enumerate(morphisms)}
+    sources = np.array([object_index[store.source(m)] for m in morphisms], dtype=np.int64)
+    targets = np.array([object_index[store.target(m)] for m in morphisms], dtype=np.int64)
+    identities = np.arange(len(objects), dtype=np.int64)
+    compose = np.full((len(morphisms), len(morphisms)), UNDEFINED, dtype=np.int32)
+    for i, f in enumerate(morphisms):
+        for j in np.flatnonzero(sources == targets[i]):
+            compose[i, j] = position[store.compose(f, morphisms[j])]
+    return sources, targets, identities, compose, morphisms
+
+def check_typing(table, rows=None):
+    """
+    检查组合表的定义域和端点，返回违例数组 (kind, f, g, actual)
+    kind: 0 = 可复合但未定义，1 = 不可复合却有定义，2 = 结果的端点错误，3 = 结果的 id 越界
+    """
+    sources, targets, compose = table['sources'], table['targets'], table['compose']
+    rows = np.arange(len(sources)) if rows is None else rows
+    block = np.asarray(compose[rows])
+    out_of_range = (block < UNDEFINED) | (block >= len(sources))
+    composable = targets[rows][:, None] == sources[None, :]
+    defined = (block != UNDEFINED) & ~out_of_range
+    safe = np.where(defined, block, 0)
+    wrong_ends = composable & defined & ((sources[safe] != sources[rows][:, None])
+                                         | (targets[safe] != targets[None, :]))
+    found = []
+    for kind, mask in enumerate((composable & ~defined & ~out_of_range, ~composable & defined, wrong_ends,
+                                 out_of_range)):
+        f, g = np.nonzero(mask)
+        found.append(np.stack([np.full(len(f), kind), rows[f], g, block[f, g]], axis=1))
+    return np.concatenate(found)
+
+def check_identity(table):
+    """
+    检查恒等律，返回违例数组 (side, f, identity, actual)
+    side: 0 = 恒等态射本身的端点错误，1 = Compose (Identity A) f != f，2 = Compose f (Identity B) != f
+    """
+    sources, targets, identities, compose = (table['sources'], table['targets'],
+                                             table['identities'], table['compose'])
+    objects = np.arange(len(identities))
+    morphisms = np.arange(len(sources))
+    found = []
+    bad = (sources[identities] != objects) | (targets[identities] != objects)
+    found.append(np.stack([np.zeros(bad.sum(), dtype=np.int64), identities[bad], identities[bad],
+                           identities[bad]], axis=1))
+    left = np.asarray(compose[identities[sources], morphisms])
+    bad = left != morphisms
+    found.append(np.stack([np.full(bad.sum(), 1), morphisms[bad], identities[sources][bad], left[bad]], axis=1))
+    right = np.asarray(compose[morphisms, identities[targets]])
+    bad = right != morphisms
+    found.append(np.stack([np.full(bad.sum(), 2), morphisms[bad], identities[targets][bad], right[bad]], axis=1))
+    return np.concatenate(found)
+
+_WORKER_TABLES = {}
+
+def _worker_table(table_dir):
+    """
+    每个工作进程只映射一次组合表
+    """
+    if table_dir not in _WORKER_TABLES:
+        _WORKER_TABLES[table_dir] = load_table(table_dir)
+    return _WORKER_TABLES[table_dir]
+
+def check_associativity_block(table, f, g, h):
+    """
+    检查 f x g x h 中所有三元组的结合律（调用者保证 target(f) = source(g)，target(g) = source(h)）
+    返回违例数组 (f, g, h, Compose (Compose f g) h, Compose f (Compose g h))
+    未定义或越界的中间结果由类型检查报告，这里跳过
+    """
+    compose = table['compose']
+    n = len(compose)
+    fg = np.asarray(compose[np.ix_(f, g)])              # |F| x |G|
+    gh = np.asarray(compose[np.ix_(g, h)])              # |G| x |H|
+    fg_valid = (fg >= 0) & (fg < n)
+    gh_valid = (gh >= 0) & (gh < n)
+    valid = fg_valid[:, :, None] & gh_valid[None, :, :]
+    fg_safe = np.where(fg_valid, fg, 0)
+    gh_safe = np.where(gh_valid, gh, 0)
+    # 只取出需要的组合表行和列，再在内存中索引，避免对内存映射做三维随机访问
+    fg_rows, fg_inverse = np.unique(fg_safe, return_inverse=True)
+    left = np.asarray(compose[np.ix_(fg_rows, h)])[fg_inverse.reshape(fg.shape)]       # |F| x |G| x |H|
+    gh_columns, gh_inverse = np.unique(gh_safe, return_inverse=True)
+    right = np.asarray(compose[np.ix_(f, gh_columns)])[:, gh_inverse.reshape(gh.shape)]  # |F| x |G| x |H|
+    bad = valid & (left != right)
+    i, j, k = np.nonzero(bad)
+    return np.stack([f[i], g[j], h[k], left[i, j, k], right[i, j, k]], axis=1)
+
+def _check_associativity_task(task):
+    table_dir, f, g, h = task
+    return check_associativity_block(_worker_table(table_dir), f, g, h)
+
+def associativity_tasks(table, block_elements=1 << 22):
+    """
+    按 hom 集合 Hom(B, C) 切分三元组空间，生成 (f, g, h) 任务；
+    |F| x |G| x |H| 超过 block_elements 时依次沿 H、G、F 继续切分
+    """
+    sources = np.asarray(table['sources'])
+    targets = np.asarray(table['targets'])
+    object_count = len(table['identities'])
+    by_target = np.argsort(targets, kind='stable')
+    by_source = np.argsort(sources, kind='stable')
+    target_offsets = np.searchsorted(targets[by_target], np.arange(object_count + 1))
+    source_offsets = np.searchsorted(sources[by_source], np.arange(object_count + 1))
+
+    order = np.lexsort((targets, sources))
+    pairs = np.stack([sources[order], targets[order]], axis=1)
+    boundaries = np.flatnonzero(np.any(np.diff(pairs, axis=0) != 0, axis=1)) + 1
+    for group in np.split(order, boundaries) if len(order) else []:
+        b, c = sources[group[0]], targets[group[0]]
+        f = by_target[target_offsets[b]:target_offsets[b + 1]]
+        h = by_source[source_offsets[c]:source_offsets[c + 1]]
+        if not len(f) or not len(h):
+            continue
+        h_step = max(1, min(len(h), block_elements))
+        for h_start in range(0, len(h), h_step):
+            h_block = h[h_start:h_start + h_step]
+            g_step = max(1, block_elements // len(h_block))
+            for g_start in range(0, len(group), g_step):
+                g_block = group[g_start:g_start + g_step]
+                f_step = max(1, block_elements // (len(g_block) * len(h_block)))
+                for f_start in range(0, len(f), f_step):
+                    yield f[f_start:f_start + f_step], g_block, h_block
+
+def check_associativity(table_dir, workers=None, block_elements=1 << 22, on_block=None):
+    """
+    检查所有可复合三元组的结合律，workers > 1 时用进程池并行
+    on_block(violations) 在每个块完成后调用（可用于流式写出反例）；返回违例总数和三元组总数
+    """
+    table = load_table(table_dir)
+    tasks = ((table_dir, f, g, h) for f, g, h in associativity_tasks(table, block_elements))
+    total = 0
+    triples = 0
+
+    def consume(results, sizes):
+        nonlocal total, triples
+        for violations, size in zip(results, sizes):
+            total += len(violations)
+            triples += size
+            if on_block is not None and len(violations):
+                on_block(violations)
+
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            task_list = list(tasks)
+            sizes = [len(f) * len(g) * len(h) for _, f, g, h in task_list]
+            consume(executor.map(_check_associativity_task, task_list, chunksize=16), sizes)
+    else:
+        for task in tasks:
+            _, f, g, h = task
+            consume([check_associativity_block(table, f, g, h)], [len(f) * len(g) * len(h)])
+    return total, triples
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Morphism Store
+
+Python counterpart of the category axioms in formal_validation/legal_core.v
+(Morphism, Identity, Compose). Morphisms are integer ids over a FactStore:
+
+    base       - an extracted morphism A -> B with an optional label
+                 (e.g. a statute article or a LegalTransition constructor)
+    identity   - Identity A, one per fact
+    composite  - Compose f g, stored as its normalised path of base morphisms
+
+Sources, targets, kinds and labels are flat typed arrays; the outgoing and
+incoming adjacency of base morphisms is exposed as NumPy CSR arrays that
+are rebuilt lazily after edges are added. Composition is memoised, and a
+composite is hash-consed by its path with identities removed, so
+Compose f (Compose g h) and Compose (Compose f g) h are the same id and
+Compose (Identity A) f is f itself: Associativity and Identity hold by
+construction.
+"""
+
+from array import array
+from enum import IntEnum
+
+import numpy as np
+
+class MorphismKind(IntEnum):
+    """
+    态射的种类
+    """
+    Base = 0
+    Identity = 1
+    Composite = 2
+
+class MorphismStore:
+    """
+    态射存储：基本态射、恒等态射和（按路径哈希共享的）复合态射
+    """
+
+    def __init__(self, facts):
+        self.facts = facts
+        self.sources = array('q')
+        self.targets = array('q')
+        self.kinds = array('b')
+        self.labels = array('q')
+        # 复合态射的基本态射路径（非复合态射的路径为空）
+        self.path_offsets = array('q', [0])
+        self.path_items = array('q')
+        # 标签表
+        self.label_names = []
+        self.label_ids = {}
+        # 恒等态射 {事实 id: 态射 id}、复合态射 {路径: 态射 id} 和复合的记忆化结果
+        self._identities = {}
+        self._composites = {}
+        self._compose_cache = {}
+        self._base_count = 0
+        self._adjacency = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def base_count(self):
+        return self._base_count
+
+    def _label_id(self, label):
+        if label is None:
+            return -1
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            label_id = len(self.label_names)
+            self.label_names.append(label)
+            self.label_ids[label] = label_id
+        return label_id
+
+    def _append(self, source, target, kind, label_id, path=()):
+        morphism_id = len(self.kinds)
+        self.sources.append(source)
+        self.targets.append(target)
+        self.kinds.append(kind)
+        self.labels.append(label_id)
+        self.path_items.extend(path)
+        self.path_offsets.append(len(self.path_items))
+        return morphism_id
+
+    def _check_fact(self, fact_id):
+        fact_id = int(fact_id)
+        if not 0 <= fact_id < len(self.facts):
+            raise ValueError(f"Unknown fact id: {fact_id}")
+        return fact_id
+
+    def add_morphism(self, source, target, label=None):
+        """
+        加入一个基本态射 source -> target，返回态射 id（同名的平行态射也是不同的态射）
+        """
+        source, target = self._check_fact(source), self._check_fact(target)
+        self._base_count += 1
+        self._adjacency = None
+        return self._append(source, target, MorphismKind.Base, self._label_id(label))
+
+    def add_morphisms(self, sources, targets, labels=None):
+        """
+        批量加入基本态射（sources/targets 为事实 id 数组），返回新态射的 id 数组
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if sources.shape != targets.shape or sources.ndim != 1:
+            raise ValueError("sources and targets must be 1-D arrays of the same length")
+        if len(sources) and (min(sources.min(), targets.min()) < 0
+                             or max(sources.max(), targets.max()) >= len(self.facts)):
+            raise ValueError("Unknown fact id in sources or targets")
+        if labels is None:
+            label_ids = np.full(len(sources), -1, dtype=np.int64)
+        else:
+            label_ids = np.fromiter((self._label_id(label) for label in labels), dtype=np.int64,
+                                    count=len(sources))
+
+        first = len(self.kinds)
+        self.sources.frombytes(sources.tobytes())
+        self.targets.frombytes(targets.tobytes())
+        self.kinds.frombytes(np.full(len(sources), MorphismKind.Base, dtype=np.int8).tobytes())
+        self.labels.frombytes(label_ids.tobytes())
+        self.path_offsets.frombytes(np.full(len(sources), len(self.path_items), dtype=np.int64).tobytes())
+        self._base_count += len(sources)
+        self._adjacency = None
+        return np.arange(first, first + len(sources))
+
+    def identity(self, fact):
+        """
+        Identity A：每个事实只有一个恒等态射
+        """
+        fact = self._check_fact(fact)
+        morphism_id = self._identities.get(fact)
+        if morphism_id is None:
+            morphism_id = self._append(fact, fact, MorphismKind.Identity, -1)
+            self._identities[fact] = morphism_id
+        return morphism_id
+
+    def path(self, morphism):
+        """
+        态射的规范化路径：基本态射 id 的元组（恒等态射为空元组）
+        """
+        kind = self.kinds[morphism]
+        if kind == MorphismKind.Base:
+            return (morphism,)
+        return tuple(self.path_items[self.path_offsets[morphism]:self.path_offsets[morphism + 1]])
+
+    def compose(self, f, g):
+        """
+        Compose f g：f : A -> B，g : B -> C，得到 A -> C（结果会被记忆化）
+        """
+        key = (f, g)
+        result = self._compose_cache.get(key)
+        if result is not None:
+            return result
+        if self.targets[f] != self.sources[g]:
+            raise ValueError(f"Cannot compose morphism {f} ({self.sources[f]} -> {self.targets[f]}) "
+                             f"with {g} ({self.sources[g]} -> {self.targets[g]})")
+
+        if self.kinds[f] == MorphismKind.Identity:
+            result = g
+        elif self.kinds[g] == MorphismKind.Identity:
+            result = f
+        else:
+            path = self.path(f) + self.path(g)
+            result = self._composites.get(path)
+            if result is None:
+                result = self._append(self.sources[f], self.targets[g], MorphismKind.Composite, -1, path)
+                self._composites[path] = result
+        self._compose_cache[key] = result
+        return result
+
+    def compose_path(self, morphisms):
+        """
+        依次复合一串态射 f1; f2; ...; fn
+        """
+        morphisms = list(morphisms)
+        if not morphisms:
+            raise ValueError("Cannot compose an empty path without a source fact")
+        result = morphisms[0]
+        for morphism in morphisms[1:]:
+            result = self.compose(result, morphism)
+        return result
+
+    def source(self, morphism):
+        return self.sources[morphism]
+
+    def target(self, morphism):
+        return self.targets[morphism]
+
+    def kind(self, morphism):
+        return MorphismKind(self.kinds[morphism])
+
+    def label(self, morphism):
+        label_id = self.labels[morphism]
+        return self.label_names[label_id] if label_id >= 0 else None
+
+    def adjacency(self):
+        """
+        基本态射的邻接表（CSR）：返回 (出边偏移, 出边态射 id, 入边偏移, 入边态射 id)
+        事实 a 的出边为 out_ids[out_offsets[a]:out_offsets[a + 1]]；加入新态射后重新构建
+        """
+        if self._adjacency is None:
+            fact_count = len(self.facts)
+            kinds = np.frombuffer(self.kinds, dtype=np.int8) if len(self.kinds) else np.zeros(0, np.int8)
+            base_ids = np.flatnonzero(kinds == MorphismKind.Base)
+            sources = np.frombuffer(self.sources, dtype=np.int64)[base_ids] if len(base_ids) else base_ids
+            targets = np.frombuffer(self.targets, dtype=np.int64)[base_ids] if len(base_ids) else base_ids
+            csr = []
+            for endpoints in (sources, targets):
+                # 稳定排序保证同一事实的边按加入顺序排列
+                order = np.argsort(endpoints, kind='stable')
+                offsets = np.zeros(fact_count + 1, dtype=np.int64)
+                np.cumsum(np.bincount(endpoints, minlength=fact_count), out=offsets[1:])
+                csr.extend([offsets, base_ids[order]])
+            self._adjacency = tuple(csr)
+        return self._adjacency
+
+    def out_morphisms(self, fact):
+        """
+        从事实出发的基本态射 id 数组
+        """
+        out_offsets, out_ids, _, _ = self.adjacency()
+        return out_ids[out_offsets[fact]:out_offsets[fact + 1]]
+
+    def in_morphisms(self, fact):
+        """
+        到达事实的基本态射 id 数组
+        """
+        _, _, in_offsets, in_ids = self.adjacency()
+        return in_ids[in_offsets[fact]:in_offsets[fact + 1]]
+
+    def hom(self, source, target):
+        """
+        Morphism A B 中的基本态射 id 数组
+        """
+        candidates = self.out_morphisms(source)
+        return candidates[np.frombuffer(self.targets, dtype=np.int64)[candidates] == target]
+
+    def handle(self, morphism):
+        return Morphism(self, int(morphism))
+
+    def to_coq(self, morphism):
+        """
+        把态射转换为 Coq 项：基本态射用标签（无标签时为 m<id>），复合态射为左结合的 Compose
+        """
+        kind = self.kinds[morphism]
+        if kind == MorphismKind.Identity:
+            return f"(Identity {self.facts.to_coq(self.sources[morphism], parens=True)})"
+        names = [self.label(base) or f"m{base}" for base in self.path(morphism)]
+        term = names[0]
+        for name in names[1:]:
+            term = f"(Compose {term} {name})"
+        return term
+
+class Morphism:
+    """
+    态射句柄：只保存存储和 id
+    """
+
+    __slots__ = ('store', 'id')
+
+    def __init__(self, store, morphism_id):
+        self.store = store
+        self.id = morphism_id
+
+    def __eq__(self, other):
+        return isinstance(other, Morphism) and self.store is other.store and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __int__(self):
+        return self.id
+
+    def __index__(self):
+        return self.id
+
+    @property
+    def source(self):
+        return self.store.facts.handle(self.store.source(self.id))
+
+    @property
+    def target(self):
+        return self.store.facts.handle(self.store.target(self.id))
+
+    def __matmul__(self, other):
+        """
+        g @ f 表示先 f 后 g（数学记号 g ∘ f），即 Compose f g
+        """
+        return Morphism(self.store, self.store.compose(other.id, self.id))
+
+    def __repr__(self):
+        return (f"Morphism({self.id}: {self.store.source(self.id)} -> {self.store.target(self.id)}, "
+                f"{self.store.to_coq(self.id)})")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reachability Index
+
+Answers "is fact B reachable from fact A under the base morphisms of a
+MorphismStore?" -- the question formal_validation/example.v settles by
+hand for validation_reachability (Unowned -> Disputed via Law_Purchase
+and Law_Contest).
+
+The index condenses the transition graph into strongly connected
+components (iterative Tarjan) and stores the transitive closure of the
+condensation as one packed bit row (a bytes object) per component, so a
+query reads one byte and tests one bit. Components are numbered in reverse
+topological order, so the row of component c only needs its first c + 1
+bits; a longer row is only created when a later edge reaches a component
+with a higher number. Reachability is reflexive, like Law_Id. Adding an edge
+u -> v afterwards ORs the closure of v into every component that already
+reaches u, without rebuilding. witness() returns the chain of morphisms
+(a shortest path, found by a BFS restricted to vertices that can still
+reach the target), which can be composed in the store or rendered as a
+Law_Compose proof term for Coq to replay.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from utils.category.morphisms import MorphismKind
+
+class ReachabilityIndex:
+    """
+    基于强连通分量缩点和位集传递闭包的可达性索引
+    """
+
+    def __init__(self, store):
+        self.store = store
+        # 每个事实所属的分量，以及每个分量可达的分量集合（按位打包的 bytes，低位在前）
+        self.component = []
+        self.closure = []
+        # 构建索引之后加入的边 {事实 id: [(目标事实, 态射 id)]}，供 witness 使用
+        self._extra_edges = {}
+        self._indexed_morphisms = 0
+        self.build()
+
+    def build(self):
+        """
+        从态射存储中的所有基本态射重新构建索引
+        """
+        fact_count = len(self.store.facts)
+        out_offsets, out_ids, _, _ = self.store.adjacency()
+        targets = np.frombuffer(self.store.targets, dtype=np.int64)[out_ids].tolist() if len(out_ids) else []
+        offsets = out_offsets.tolist()
+
+        component, members = _tarjan(fact_count, offsets, targets)
+        # Tarjan 按逆拓扑序给出分量（先得到的分量没有指向之后分量的边），依次计算闭包
+        # 先用整数位集合并，再转换为字节行；后继分量的编号都更小，分量 c 的行只需 c + 1 位
+        bitsets = [0] * len(members)
+        for comp in range(len(members)):
+            reach = 1 << comp
+            for fact in members[comp]:
+                for i in range(offsets[fact], offsets[fact + 1]):
+                    successor = component[targets[i]]
+                    if successor != comp:
+                        reach |= bitsets[successor]
+            bitsets[comp] = reach
+
+        self.component = component
+        self.closure = [reach.to_bytes((comp >> 3) + 1, 'little') for comp, reach in enumerate(bitsets)]
+        self._extra_edges = {}
+        self._indexed_morphisms = len(self.store)
+        return self
+
+    def _component_of(self, fact):
+        """
+        返回事实的分量；索引构建之后新增的事实各自成为一个新分量
+        """
+        self._check_fact(fact)
+        while fact >= len(self.component):
+            self.component.append(len(self.closure))
+            self.closure.append(_bit_row(len(self.closure)))
+        return self.component[fact]
+
+    def _check_fact(self, fact):
+        """
+        事实 id 必须在 [0, 事实数) 内（负数不能当作从末尾计数的下标）
+        """
+        if not 0 <= fact < len(self.store.facts):
+            raise ValueError(f"Unknown fact id: {fact}")
+
+    def _reaches(self, source_comp, target_comp):
+        """
+        分量 source_comp 是否可达 target_comp：只读取一个字节
+        """
+        row = self.closure[source_comp]
+        byte = target_comp >> 3
+        return byte < len(row) and (row[byte] >> (target_comp & 7)) & 1 == 1
+
+    def reachable(self, source, target):
+        """
+        target 是否可以从 source 经过零个或多个基本态射到达
+        """
+        component = self.component
+        if not (0 <= source < len(component) and 0 <= target < len(component)):
+            self._check_fact(source)
+            self._check_fact(target)
+            # 构建之后新增、且没有任何边的事实只能到达自身
+            return source == target
+        target_comp = component[target]
+        row = self.closure[component[source]]
+        byte = target_comp >> 3
+        return byte < len(row) and (row[byte] >> (target_comp & 7)) & 1 == 1
+
+    def reachable_set(self, source):
+        """
+        返回从 source 可达的所有事实 id（NumPy 数组）
+        """
+        reach = self.closure[self._component_of(source)]
+        component = np.asarray(self.component, dtype=np.int64)
+        mask = np.zeros(len(self.closure), dtype=bool)
+        bits = np.unpackbits(np.frombuffer(reach, dtype=np.uint8), bitorder='little')[:len(self.closure)].astype(bool)
+        mask[:len(bits)] = bits
+        return np.flatnonzero(mask[component])
+
+    def add_edge(self, source, target, morphism=None):
+        """
+        增量加入一条边 source -> target：已可达时闭包不变，
+        否则把 target 的闭包并入所有能到达 source 的分量
+        """
+        source_comp = self._component_of(source)
+        target_comp = self._component_of(target)
+        self._extra_edges.setdefault(source, []).append((target, morphism))
+        if self._reaches(source_comp, target_comp):
+            return False
+        added = self.closure[target_comp]
+        added_bits = int.from_bytes(added, 'little')
+        closure = self.closure
+        for comp in range(len(closure)):
+            if self._reaches(comp, source_comp):
+                row = closure[comp]
+                closure[comp] = (int.from_bytes(row, 'little') | added_bits).to_bytes(max(len(row), len(added)),
+                                                                                    'little')
+        return True
+
+    def add_morphism(self, morphism):
+        """
+        把存储中的一个基本态射加入索引
+        """
+        return self.add_edge(self.store.source(morphism), self.store.target(morphism), morphism)
+
+    def sync(self):
+        """
+        把构建索引之后加入存储的基本态射增量加入索引，返回加入的数量
+        """
+        added = 0
+        for morphism in range(self._indexed_morphisms, len(self.store)):
+            if self.store.kinds[morphism] == MorphismKind.Base:
+                self.add_morphism(morphism)
+                added += 1
+        self._indexed_morphisms = len(self.store)
+        return added
+
+    def _successors(self, fact, out_offsets, out_ids):
+        if fact + 1 < len(out_offsets):
+            for morphism in out_ids[out_offsets[fact]:out_offsets[fact + 1]].tolist():
+                yield self.store.target(morphism), morphism
+        yield from self._extra_edges.get(fact, ())
+
+    def witness(self, source, target):
+        """
+        返回一条从 source 到 target 的最短基本态射链 [m1, ..., mn]（source == target 时为空列表）
+        不可达时返回 None；只搜索仍能到达 target 的事实
+        """
+        if not self.reachable(source, target):
+            return None
+        if source == target:
+            return []
+        out_offsets, out_ids, _, _ = self.store.adjacency()
+        target_comp = self.component[target]
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            fact = queue.popleft()
+            for successor, morphism in self._successors(fact, out_offsets, out_ids):
+                if successor in parent or not self._reaches(self._component_of(successor), target_comp):
+                    continue
+                parent[successor] = (fact, morphism)
+                if successor == target:
+                    chain = []
+                    while parent[successor] is not None:
+                        successor, morphism = parent[successor]
+                        chain.append(morphism)
+                    return chain[::-1]
+                queue.append(successor)
+        return None
+
+    def witness_morphism(self, source, target):
+        """
+        返回见证路径复合得到的态射 id（source == target 时为恒等态射），不可达时返回 None
+        """
+        chain = self.witness(source, target)
+        if chain is None:
+            return None
+        if not chain:
+            return self.store.identity(source)
+        return self.store.compose_path(chain)
+
+    def witness_proof_term(self, source, target, compose='Law_Compose', identity='Law_Id'):
+        """
+        把见证路径转换为 example.v 风格的证明项，例如
+        Law_Compose Unowned Owned Disputed Law_Purchase Law_Contest
+        状态用事实名称表示（没有名称时为其 Coq 项），态射用标签表示；不可达时返回 None
+        """
+        chain = self.witness(source, target)
+        if chain is None:
+            return None
+        facts = self.store.facts
+
+        def state(fact):
+            return facts.names.get(fact) or facts.to_coq(fact, parens=True)
+
+        if not chain:
+            return f"{identity} {state(source)}"
+        term = self.store.label(chain[-1]) or f"m{chain[-1]}"
+        # 从后向前右结合：Law_Compose a b c f (Law_Compose b ... c g ...)
+        for morphism in reversed(chain[:-1]):
+            label = self.store.label(morphism) or f"m{morphism}"
+            middle = self.store.target(morphism)
+            term = f"({compose} {state(self.store.source(morphism))} {state(middle)} {state(target)} {label} {term})"
+        return term[1:-1] if term.startswith('(') else term
+
+def _bit_row(bit):
+    """
+    返回只有第 bit 位为 1 的打包位行（长度刚好容纳该位）
+    """
+    return (1 << bit).to_bytes((bit >> 3) + 1, 'little')
+
+def _tarjan(vertex_count, offsets, targets):
+    """
+    迭代版 Tarjan 强连通分量算法，返回 (每个顶点的分量编号, 各分量的顶点列表)
+    分量编号按逆拓扑序分配：边只会从编号大的分量指向编号小的分量（或分量内部）
+    """
+    index = [-1] * vertex_count
+    lowlink = [0] * vertex_count
+    on_stack = [False] * vertex_count
+    component = [-1] * vertex_count
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(vertex_count):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, offsets[root])]
+        while work:
+            vertex, edge = work[-1]
+            if edge < offsets[vertex + 1]:
+                work[-1] = (vertex, edge + 1)
+                successor = targets[edge]
+                if index[successor] == -1:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, offsets[successor]))
+                elif on_stack[successor] and index[successor] < lowlink[vertex]:
+                    lowlink[vertex] = index[successor]
+                continue
+
+            work.pop()
+            if work and lowlink[vertex] < lowlink[work[-1][0]]:
+                lowlink[work[-1][0]] = lowlink[vertex]
+            if lowlink[vertex] == index[vertex]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = len(components)
+                    members.append(member)
+                    if member == vertex:
+                        break
+                components.append(members)
+    return component, components
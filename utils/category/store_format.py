@@ -0,0 +1,484 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fact Store File Format
+
+A compact binary file holding a FactStore and (optionally) its
+MorphismStore as the same flat arrays they use in memory, so loading is
+mmap + np.frombuffer per array: constant time in the size of the store,
+with no Python object built per fact or morphism.
+
+Layout (little-endian, every array aligned to 64 bytes):
+
+    header      magic b'LGFACTS\\0', format version, section count,
+                fact count, morphism count, base morphism count
+    sections    name, NumPy dtype, byte offset and length per array
+    arrays      facts:      fact_kinds (NodeKind, int8)
+                            fact_atom_types (AtomType or -1, int8)
+                            fact_child_offsets / fact_children (int64)
+                names:      name_ids (sorted fact ids), name_offsets,
+                            name_bytes (UTF-8)
+                morphisms:  morphism_sources / morphism_targets /
+                            morphism_labels (int64), morphism_kinds (int8),
+                            path_offsets / path_items (composite paths)
+                labels:     label_offsets, label_bytes (UTF-8)
+                adjacency:  out_offsets / out_ids / in_offsets / in_ids,
+                            the CSR of base morphisms from adjacency()
+
+MappedStore exposes the arrays read-only with the accessors of FactStore
+and MorphismStore (kind, child_ids, names, source, target, label, path,
+adjacency, ...), which is enough for ReachabilityIndex; names and labels
+are decoded on access. to_stores() rebuilds mutable stores when needed.
+
+coq_source() renders a store as a self-contained Coq file: the Fact and
+Morphism signature of formal_validation/legal_core.v followed by one
+Definition per fact and morphism, so coqc can check that every Evolve,
+Aggregate and Compose in the file is well-typed.
+"""
+
+import mmap
+import os
+import re
+import struct
+
+import numpy as np
+
+from utils.category.coq_obligations import IDENTIFIER_PATTERN
+from utils.category.facts import AtomType, FactStore, NodeKind
+from utils.category.morphisms import MorphismKind, MorphismStore
+
+MAGIC = b'LGFACTS\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# 魔数、版本、段数、事实数、态射数、基本态射数
+HEADER = struct.Struct('<8sIIqqq')
+# 段名、dtype、字节偏移、字节长度
+SECTION = struct.Struct('<24s8sqq')
+
+# 生成的 Coq 文件中已占用的名称（legal_core.v 的签名）
+COQ_RESERVED_NAMES = {'AtomType', 'Fact', 'Atom', 'Evolve', 'Aggregate', 'Morphism', 'Identity', 'Compose',
+                      'list', 'cons', 'nil'} | set(AtomType.__members__)
+# 生成的名称 f<id>（未命名事实）和 m<id>（无可用标签的态射）
+GENERATED_NAME_PATTERN = re.compile(r'^[fm]\d+$')
+
+def _as_array(values, dtype):
+    return np.frombuffer(values, dtype=dtype) if len(values) else np.zeros(0, dtype=dtype)
+
+def _string_table(strings):
+    """
+    字符串表：返回 (偏移数组, UTF-8 字节数组)
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+def store_sections(facts, morphisms=None):
+    """
+    把存储转换为要写入的数组 {段名: NumPy 数组}
+    """
+    name_ids = np.array(sorted(facts.names), dtype=np.int64)
+    name_offsets, name_bytes = _string_table([facts.names[fact] for fact in name_ids.tolist()])
+    sections = {
+        'fact_kinds': _as_array(facts.kinds, np.int8),
+        'fact_atom_types': _as_array(facts.atom_types, np.int8),
+        'fact_child_offsets': _as_array(facts.child_offsets, np.int64),
+        'fact_children': _as_array(facts.children, np.int64),
+        'name_ids': name_ids,
+        'name_offsets': name_offsets,
+        'name_bytes': name_bytes,
+    }
+    if morphisms is not None:
+        if morphisms.facts is not facts:
+            raise ValueError("The morphism store belongs to a different fact store")
+        label_offsets, label_bytes = _string_table(morphisms.label_names)
+        sections.update({
+            'morphism_sources': _as_array(morphisms.sources, np.int64),
+            'morphism_targets': _as_array(morphisms.targets, np.int64),
+            'morphism_kinds': _as_array(morphisms.kinds, np.int8),
+            'morphism_labels': _as_array(morphisms.labels, np.int64),
+            'path_offsets': _as_array(morphisms.path_offsets, np.int64),
+            'path_items': _as_array(morphisms.path_items, np.int64),
+            'label_offsets': label_offsets,
+            'label_bytes': label_bytes,
+        })
+        sections.update(zip(('out_offsets', 'out_ids', 'in_offsets', 'in_ids'),
+                            (np.asarray(array, dtype=np.int64) for array in morphisms.adjacency())))
+    return sections
+
+def _aligned(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_store(file_path, facts, morphisms=None):
+    """
+    把事实存储（和态射存储）写成二进制文件，通过临时文件原子替换，返回写入的字节数
+    """
+    # 文件中的数组一律为小端序
+    sections = {name: values.astype(values.dtype.newbyteorder('<'), copy=False)
+                for name, values in store_sections(facts, morphisms).items()}
+    table = []
+    position = _aligned(HEADER.size + SECTION.size * len(sections))
+    for name, values in sections.items():
+        table.append((name, values, position))
+        position = _aligned(position + values.nbytes)
+
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), len(facts),
+                            len(morphisms) if morphisms is not None else -1,
+                            morphisms.base_count if morphisms is not None else -1))
+        for name, values, offset in table:
+            f.write(SECTION.pack(name.encode('ascii'), values.dtype.str.encode('ascii'), offset, values.nbytes))
+        for name, values, offset in table:
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(np.ascontiguousarray(values).tobytes())
+        f.write(b'\0' * (position - f.tell()))
+    os.replace(tmp_path, file_path)
+    return position
+
+class MappedStore:
+    """
+    以 mmap 只读打开的存储文件；各数组为 np.frombuffer 视图，不为事实或态射创建 Python 对象
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise Exception(f"Not a fact store file (too short): {file_path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, section_count, fact_count, morphism_count, base_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise Exception(f"Not a fact store file: {file_path}")
+        if version != FORMAT_VERSION:
+            raise Exception(f"Unsupported fact store format version {version} in {file_path}")
+
+        self.arrays = {}
+        for i in range(section_count):
+            name, dtype, offset, length = SECTION.unpack_from(self._mmap, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            dtype = np.dtype(dtype.rstrip(b'\0').decode('ascii'))
+            if offset < 0 or length < 0 or offset + length > size or length % dtype.itemsize:
+                raise Exception(f"Corrupt section {name} in {file_path}")
+            self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+        if len(self.arrays['fact_kinds']) != fact_count:
+            raise Exception(f"Corrupt fact store file: {file_path}")
+
+        self.facts = MappedFacts(self.arrays)
+        self.morphisms = MappedMorphisms(self.facts, self.arrays, base_count) if morphism_count >= 0 else None
+
+    def close(self):
+        """
+        释放映射；仍被引用的数组视图会使 mmap 无法关闭，此时留给垃圾回收
+        """
+        self.facts = self.morphisms = None
+        self.arrays = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def to_stores(self):
+        """
+        重新构建可修改的 (FactStore, MorphismStore 或 None)
+        """
+        facts = self.facts.to_store()
+        return facts, self.morphisms.to_store(facts) if self.morphisms is not None else None
+
+def _decode(offsets, data, index):
+    return bytes(data[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+class MappedFacts:
+    """
+    只读的事实存储视图，接口与 FactStore 的查询方法相同
+    """
+
+    def __init__(self, arrays):
+        self.kinds = arrays['fact_kinds']
+        self.atom_types = arrays['fact_atom_types']
+        self.child_offsets = arrays['fact_child_offsets']
+        self.children = arrays['fact_children']
+        self.name_ids_array = arrays['name_ids']
+        self._name_offsets = arrays['name_offsets']
+        self._name_bytes = arrays['name_bytes']
+        self._names = None
+        self._name_ids = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, fact_id):
+        return NodeKind(self.kinds[fact_id])
+
+    def atom_type(self, fact_id):
+        value = self.atom_types[fact_id]
+        return AtomType(value) if value >= 0 else None
+
+    def child_ids(self, fact_id):
+        return tuple(self.children[self.child_offsets[fact_id]:self.child_offsets[fact_id + 1]].tolist())
+
+    def name_of(self, fact_id):
+        """
+        事实的名称（二分查找名称表），未命名时返回 None
+        """
+        i = int(np.searchsorted(self.name_ids_array, fact_id))
+        if i < len(self.name_ids_array) and self.name_ids_array[i] == fact_id:
+            return _decode(self._name_offsets, self._name_bytes, i)
+        return None
+
+    @property
+    def names(self):
+        """
+        {事实 id: 名称}，第一次访问时解码整个名称表
+        """
+        if self._names is None:
+            self._names = {fact: _decode(self._name_offsets, self._name_bytes, i)
+                           for i, fact in enumerate(self.name_ids_array.tolist())}
+        return self._names
+
+    @property
+    def name_ids(self):
+        if self._name_ids is None:
+            self._name_ids = {name: fact for fact, name in self.names.items()}
+        return self._name_ids
+
+    def by_name(self, name):
+        return self.name_ids[name]
+
+    def to_coq(self, fact_id, use_names=True, parens=False):
+        return FactStore.to_coq(self, fact_id, use_names, parens)
+
+    def _check(self, fact_id):
+        if not 0 <= fact_id < len(self.kinds):
+            raise ValueError(f"Unknown fact id: {fact_id}")
+        return fact_id
+
+    def to_store(self):
+        """
+        按 id 顺序重新构建 FactStore（子事实的 id 总是更小，依次加入即可得到相同的 id）
+        """
+        store = FactStore()
+        names = self.names
+        kinds = self.kinds.tolist()
+        for fact_id, kind in enumerate(kinds):
+            if kind == NodeKind.Param:
+                new_id = store.parameter(names[fact_id])
+            elif kind == NodeKind.Atom:
+                new_id = store.atom(int(self.atom_types[fact_id]))
+            elif kind == NodeKind.Evolve:
+                new_id = store.evolve(*self.child_ids(fact_id))
+            else:
+                new_id = store.aggregate(self.child_ids(fact_id))
+            if new_id != fact_id:
+                raise Exception(f"Fact {fact_id} is a duplicate of fact {new_id}; the file is corrupt")
+            if fact_id in names and kind != NodeKind.Param:
+                store.name(fact_id, names[fact_id])
+        return store
+
+class MappedMorphisms:
+    """
+    只读的态射存储视图，接口与 MorphismStore 的查询方法相同（可直接用于 ReachabilityIndex）
+    """
+
+    def __init__(self, facts, arrays, base_count):
+        self.facts = facts
+        self.sources = arrays['morphism_sources']
+        self.targets = arrays['morphism_targets']
+        self.kinds = arrays['morphism_kinds']
+        self.labels = arrays['morphism_labels']
+        self.path_offsets = arrays['path_offsets']
+        self.path_items = arrays['path_items']
+        self._label_offsets = arrays['label_offsets']
+        self._label_bytes = arrays['label_bytes']
+        self._adjacency = (arrays['out_offsets'], arrays['out_ids'], arrays['in_offsets'], arrays['in_ids'])
+        self._base_count = base_count
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def base_count(self):
+        return self._base_count
+
+    @property
+    def label_count(self):
+        return len(self._label_offsets) - 1
+
+    def source(self, morphism):
+        return int(self.sources[morphism])
+
+    def target(self, morphism):
+        return int(self.targets[morphism])
+
+    def kind(self, morphism):
+        return MorphismKind(self.kinds[morphism])
+
+    def label(self, morphism):
+        label_id = self.labels[morphism]
+        return _decode(self._label_offsets, self._label_bytes, label_id) if label_id >= 0 else None
+
+    def path(self, morphism):
+        if self.kinds[morphism] == MorphismKind.Base:
+            return (morphism,)
+        return tuple(self.path_items[self.path_offsets[morphism]:self.path_offsets[morphism + 1]].tolist())
+
+    def adjacency(self):
+        return self._adjacency
+
+    def out_morphisms(self, fact):
+        out_offsets, out_ids, _, _ = self._adjacency
+        return out_ids[out_offsets[fact]:out_offsets[fact + 1]]
+
+    def in_morphisms(self, fact):
+        _, _, in_offsets, in_ids = self._adjacency
+        return in_ids[in_offsets[fact]:in_offsets[fact + 1]]
+
+    def hom(self, source, target):
+        candidates = self.out_morphisms(source)
+        return candidates[self.targets[candidates] == target]
+
+    def to_coq(self, morphism):
+        return MorphismStore.to_coq(self, morphism)
+
+    def to_store(self, facts=None):
+        """
+        在 facts（默认为 self.facts.to_store()）上按 id 顺序重新构建 MorphismStore
+        """
+        store = MorphismStore(facts if facts is not None else self.facts.to_store())
+        labels = [_decode(self._label_offsets, self._label_bytes, i) for i in range(self.label_count)]
+        for label in labels:
+            store._label_id(label)
+        kinds = self.kinds.tolist()
+        for morphism, kind in enumerate(kinds):
+            if kind == MorphismKind.Base:
+                label_id = int(self.labels[morphism])
+                new_id = store.add_morphism(self.sources[morphism], self.targets[morphism],
+                                            labels[label_id] if label_id >= 0 else None)
+            elif kind == MorphismKind.Identity:
+                new_id = store.identity(self.sources[morphism])
+            else:
+                # 直接按路径加入复合态射：逐步 compose 会产生原存储中不存在的中间复合态射
+                path = self.path(morphism)
+                new_id = store._composites.get(path)
+                if new_id is None:
+                    new_id = store._append(self.sources[morphism], self.targets[morphism],
+                                           MorphismKind.Composite, -1, path)
+                    store._composites[path] = new_id
+            if new_id != morphism:
+                raise Exception(f"Morphism {morphism} is a duplicate of morphism {new_id}; the file is corrupt")
+        return store
+
+def _coq_names(facts, morphisms):
+    """
+    为每个事实和态射选择 Coq 中的名称：事实用其名称（否则 f<id>），基本态射用标签（否则 m<id>）
+    标签不是合法标识符或与其他名称重复时使用 m<id>
+    """
+    names = facts.names
+    fact_names = []
+    used = set(COQ_RESERVED_NAMES)
+    for fact in range(len(facts)):
+        name = names.get(fact)
+        if name is None:
+            name = f"f{fact}"
+        elif not IDENTIFIER_PATTERN.match(name) or name in used:
+            raise Exception(f"Fact name is not a valid or unique Coq identifier: {name!r}")
+        fact_names.append(name)
+        used.add(name)
+
+    morphism_names = []
+    if morphisms is not None:
+        for morphism in range(len(morphisms)):
+            if morphisms.kinds[morphism] == MorphismKind.Base:
+                label = morphisms.label(morphism)
+                if (label is not None and IDENTIFIER_PATTERN.match(label) and label not in used
+                        and not GENERATED_NAME_PATTERN.match(label)):
+                    morphism_names.append(label)
+                    used.add(label)
+                    continue
+            morphism_names.append(f"m{morphism}")
+    # 用户名称与生成的 f<id>/m<id> 冲突
+    clashes = {name for fact, name in names.items()
+               if GENERATED_NAME_PATTERN.match(name) and name != f"f{fact}"}
+    if clashes:
+        raise Exception(f"Names clash with generated identifiers: {', '.join(sorted(clashes))}")
+    return fact_names, morphism_names
+
+def coq_source(facts, morphisms=None, title=None):
+    """
+    生成自包含的 Coq 文件：legal_core.v 中的 Fact/Morphism 签名，以及每个事实和态射的 Definition
+    facts/morphisms 可以是 FactStore/MorphismStore，也可以是 MappedStore 中的视图
+    """
+    fact_names, morphism_names = _coq_names(facts, morphisms)
+    lines = [
+        "(** Generated by utils/category/store_format.py - do not edit **)",
+    ]
+    if title:
+        lines.append(f"(** {title} **)")
+    lines += [
+        "",
+        "Require Import Coq.Lists.List.",
+        "Import ListNotations.",
+        "",
+        "Inductive AtomType : Type :=",
+    ]
+    lines += [f"  | {atom_type.name}" for atom_type in AtomType]
+    lines[-1] += "."
+    lines += [
+        "",
+        "Inductive Fact : Type :=",
+        "  | Atom    : AtomType -> Fact",
+        "  | Evolve  : Fact -> Fact -> Fact",
+        "  | Aggregate : list Fact -> Fact.",
+        "",
+        "Parameter Morphism : Fact -> Fact -> Type.",
+        "Axiom Identity : forall (A : Fact), Morphism A A.",
+        "Axiom Compose : forall {A B C : Fact}, Morphism A B -> Morphism B C -> Morphism A C.",
+        "",
+        f"(* {len(facts)} facts *)",
+    ]
+
+    kinds = facts.kinds.tolist() if hasattr(facts.kinds, 'tolist') else facts.kinds
+    for fact, kind in enumerate(kinds):
+        name = fact_names[fact]
+        if kind == NodeKind.Param:
+            lines.append(f"Parameter {name} : Fact.")
+            continue
+        if kind == NodeKind.Atom:
+            term = f"Atom {AtomType(facts.atom_types[fact]).name}"
+        elif kind == NodeKind.Evolve:
+            source, target = facts.child_ids(fact)
+            term = f"Evolve {fact_names[source]} {fact_names[target]}"
+        else:
+            term = "Aggregate [" + "; ".join(fact_names[child] for child in facts.child_ids(fact)) + "]"
+        lines.append(f"Definition {name} : Fact := {term}.")
+
+    if morphisms is not None:
+        lines += ["", f"(* {len(morphisms)} morphisms, {morphisms.base_count} base *)"]
+        for morphism in range(len(morphisms)):
+            kind = morphisms.kinds[morphism]
+            name = morphism_names[morphism]
+            signature = (f"Morphism {fact_names[morphisms.source(morphism)]} "
+                         f"{fact_names[morphisms.target(morphism)]}")
+            if kind == MorphismKind.Base:
+                label = morphisms.label(morphism)
+                comment = f"  (* {label.replace('*)', '* )')} *)" if label is not None and label != name else ""
+                lines.append(f"Parameter {name} : {signature}.{comment}")
+            elif kind == MorphismKind.Identity:
+                lines.append(f"Definition {name} : {signature} := Identity {fact_names[morphisms.source(morphism)]}.")
+            else:
+                # 左结合：Compose (Compose f g) h
+                path = morphisms.path(morphism)
+                term = morphism_names[path[0]]
+                for base in path[1:-1]:
+                    term = f"(Compose {term} {morphism_names[base]})"
+                lines.append(f"Definition {name} : {signature} := Compose {term} {morphism_names[path[-1]]}.")
+    lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Chinese Numerals
+
+Helpers for the numbers used in statute structure labels such as
+第一百二十三条 or 第十二章: a regex fragment matching them (for str and
+UTF-8 bytes patterns) and a parser converting them to integers.
+"""
+
+import re
+
+DIGITS = {
+    '零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+    '五': 5, '六': 6, '七': 7, '八': 8, '九': 9,
+}
+UNITS = {'十': 10, '百': 100, '千': 1000}
+LARGE_UNITS = {'万': 10000, '亿': 100000000}
+
+FULLWIDTH_DIGITS = '０１２３４５６７８９'
+
+# 数字中可能出现的所有字符
+NUMERAL_CHARS = ''.join(DIGITS) + ''.join(UNITS) + ''.join(LARGE_UNITS) + FULLWIDTH_DIGITS + '0123456789'
+
+# 匹配一个数字（中文或阿拉伯数字）的正则片段
+NUMERAL_PATTERN = '(?:' + '|'.join(re.escape(ch) for ch in NUMERAL_CHARS) + ')+'
+
+def numeral_bytes_pattern():
+    """
+    返回可用于 UTF-8 字节串正则的数字片段（多字节字符不能放在字符类中）
+    """
+    return NUMERAL_PATTERN.encode('utf-8')
+
+def parse_chinese_numeral(text):
+    """
+    将中文数字或阿拉伯数字转换为整数，如 '一百二十三' -> 123, '十二' -> 12, '１２' -> 12
+    无法解析时返回 None
+    """
+    if not text:
+        return None
+    text = text.translate(str.maketrans(FULLWIDTH_DIGITS, '0123456789'))
+    if text.isdigit():
+        return int(text)
+
+    total = 0
+    section = 0
+    digit = None
+    for ch in text:
+        if ch in DIGITS:
+            digit = DIGITS[ch]
+        elif ch in UNITS:
+            # '十二' 中省略的 '一'
+            section += (1 if digit is None else digit) * UNITS[ch]
+            digit = None
+        elif ch in LARGE_UNITS:
+            section += digit or 0
+            total += (section or 1) * LARGE_UNITS[ch]
+            section = 0
+            digit = None
+        elif ch.isdigit():
+            digit = (digit or 0) * 10 + int(ch)
+        else:
+            return None
+    return total + section + (digit or 0)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Statute Citation Graph
+
+Chinese statutes cite each other by title, usually with article numbers:
+
+    依照《中华人民共和国民法典》第五百条、第五百零一条的规定……
+    本法第十条至第十二条……
+
+This module compiles every known title (and 本法, "this law") into one
+Aho-Corasick automaton, so each converted text is scanned once, character
+by character, no matter how many titles there are. Overlapping matches
+are resolved leftmost-longest (中华人民共和国民法典 wins over a shorter
+title inside it). The article numbers following a match are parsed,
+including 之一 articles, lists (、 和 及 或) and ranges (至 / 到). The
+citing article is the 第X条 line the match appears under; text before the
+first article is article 0. 本法 inside a longer word (根据基本法第三条,
+根本法, 日本法) is not a self-reference. Titles dropped as near-duplicates can be
+given as aliases; a citation of an alias counts for the law it maps to.
+
+The result is stored as two compressed sparse row (CSR) graphs in one
+.npz file:
+
+    law_offsets, law_targets, law_counts            law -> law
+    article_law, article_number, article_sub        article nodes
+    article_offsets, article_targets, article_counts  article -> article
+
+Edges are unique and counts give the number of citations. A law citing
+itself (by title or 本法) yields article edges only.
+
+Usage:
+    builder = CitationGraphBuilder(titles)
+    for title, path in converted:
+        builder.add_law_file(title, path)
+    graph = builder.build()
+    graph.save('data/law_text/citations.npz')
+"""
+
+import json
+import os
+import re
+from array import array
+
+import numpy as np
+
+from utils.corpus.chinese_numerals import NUMERAL_PATTERN, parse_chinese_numeral
+
+# 指代当前法律的用语
+SELF_REFERENCE = '本法'
+# 紧接在这些字之后的 "本法" 是另一个词的一部分（基本法、根本法、日本法），不指代当前法律
+SELF_REFERENCE_WORD_PREFIXES = frozenset('基根日')
+# 条文开头（行首的 "第X条" 或 "第X条之Y"）
+ARTICLE_HEADING_PATTERN = re.compile(r'^[ \t　]*第(' + NUMERAL_PATTERN + r')条(?:之(' + NUMERAL_PATTERN + r'))?')
+# 标题之后的条文引用："》第五百条、第五百零一条第二款" 等
+ARTICLE_REFERENCE_PATTERN = re.compile(
+    r'[》〉]?[ \t　]*((?:第' + NUMERAL_PATTERN + r'条(?:之' + NUMERAL_PATTERN + r')?'
+    r'(?:第' + NUMERAL_PATTERN + r'[款项])*(?:[、，,]|以及|和|及|或|与|至|到)?)+)')
+ARTICLE_NUMBER_PATTERN = re.compile(
+    r'(至|到)?第(' + NUMERAL_PATTERN + r')条(?:之(' + NUMERAL_PATTERN + r'))?')
+# 条文范围最多展开的条数
+MAX_RANGE = 1000
+
+class AhoCorasick:
+    """
+    多模式字符串匹配自动机：goto 表为每个状态一个字典，失败链接和输出在构建时预先计算
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + (index,)
+
+        # 按广度优先顺序计算失败链接，并把失败状态的输出并入当前状态
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[next_state] = fail
+                self._out[next_state] = self._out[next_state] + self._out[fail]
+                queue.append(next_state)
+
+    def __len__(self):
+        return len(self._goto)
+
+    def find_all(self, text):
+        """
+        返回文本中所有（可能重叠的）匹配 [(起始位置, 结束位置, 模式编号)]
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        patterns = self.patterns
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            transitions = goto[state]
+            while state and ch not in transitions:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(ch, 0)
+            if out[state]:
+                for index in out[state]:
+                    matches.append((i + 1 - len(patterns[index]), i + 1, index))
+        return matches
+
+    def find_longest(self, text):
+        """
+        返回从左到右、最长优先且互不重叠的匹配 [(起始位置, 结束位置, 模式编号)]
+        """
+        matches = sorted(self.find_all(text), key=lambda match: (match[0], -match[1]))
+        selected = []
+        end = 0
+        for match in matches:
+            if match[0] >= end:
+                selected.append(match)
+                end = match[1]
+        return selected
+
+def parse_article_references(text, position):
+    """
+    解析 text[position:] 开头的条文引用，返回 [(条号, 之X)]；没有条文引用时返回空列表
+    """
+    match = ARTICLE_REFERENCE_PATTERN.match(text, position)
+    if not match:
+        return []
+    articles = []
+    for reference in ARTICLE_NUMBER_PATTERN.finditer(match.group(1)):
+        number = parse_chinese_numeral(reference.group(2))
+        if number is None:
+            continue
+        sub = parse_chinese_numeral(reference.group(3)) or 0 if reference.group(3) else 0
+        if reference.group(1) and articles and articles[-1][0] < number <= articles[-1][0] + MAX_RANGE:
+            # "第十条至第十二条" 展开为第十一条、第十二条
+            articles.extend((n, 0) for n in range(articles[-1][0] + 1, number))
+        articles.append((number, sub))
+    return articles
+
+def _csr(sources, targets, node_count):
+    """
+    由边列表构建 CSR：返回 (offsets, 去重后的目标, 每条边的次数)
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    order = np.lexsort((targets, sources))
+    sources, targets = sources[order], targets[order]
+    first = np.ones(len(sources), dtype=bool)
+    first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    starts = np.flatnonzero(first)
+    counts = np.diff(np.append(starts, len(sources)))
+    offsets = np.zeros(node_count + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(sources[starts], minlength=node_count))
+    return offsets, targets[starts].astype(np.int32), counts.astype(np.int32)
+
+class CitationGraphBuilder:
+    """
+    用一个 Aho-Corasick 自动机扫描法律文本，收集法律之间和条文之间的引用
+    """
+
+    def __init__(self, titles, aliases=None):
+        # 去重并保持顺序，法律编号为其在标题列表中的位置
+        self.titles = list(dict.fromkeys(titles))
+        self.law_ids = {title: i for i, title in enumerate(self.titles)}
+        # aliases 为 {别名标题: 法律标题}（例如被跳过的近似重复标题），对别名的引用计入该法律
+        aliases = aliases or {}
+        alias_titles = [alias for alias in dict.fromkeys(aliases)
+                        if alias not in self.law_ids and aliases[alias] in self.law_ids]
+        # 自动机的模式编号 -> 法律编号
+        self._pattern_laws = list(range(len(self.titles))) + [self.law_ids[aliases[alias]] for alias in alias_titles]
+        self.automaton = AhoCorasick(self.titles + alias_titles + [SELF_REFERENCE])
+        self._self_pattern = len(self._pattern_laws)
+        self.law_sources = array('q')
+        self.law_targets = array('q')
+        # 条文节点 (法律, 条号, 之X) 及条文之间的边
+        self.article_ids = {}
+        self.article_sources = array('q')
+        self.article_targets = array('q')
+        self.citation_count = 0
+        self.scanned_laws = 0
+
+    def _article(self, law, number, sub=0):
+        key = (law, number, sub)
+        article = self.article_ids.get(key)
+        if article is None:
+            article = self.article_ids[key] = len(self.article_ids)
+        return article
+
+    def add_law(self, title, lines):
+        """
+        扫描一部法律的文本（逐行），返回找到的引用数
+        """
+        law = self.law_ids.get(title)
+        if law is None:
+            raise ValueError(f"Unknown law title: {title}")
+        current = (0, 0)
+        found = 0
+        for line in lines:
+            heading = ARTICLE_HEADING_PATTERN.match(line)
+            if heading:
+                number = parse_chinese_numeral(heading.group(1))
+                if number is not None:
+                    current = (number, parse_chinese_numeral(heading.group(2)) or 0 if heading.group(2) else 0)
+            for start, end, pattern in self.automaton.find_longest(line):
+                if pattern == self._self_pattern:
+                    if start > 0 and line[start - 1] in SELF_REFERENCE_WORD_PREFIXES:
+                        continue
+                    target = law
+                else:
+                    target = self._pattern_laws[pattern]
+                articles = parse_article_references(line, end)
+                if target == law and not articles:
+                    # 提到自身（标题行或 "本法规定"）但没有引用具体条文
+                    continue
+                found += 1
+                if target != law:
+                    self.law_sources.append(law)
+                    self.law_targets.append(target)
+                if articles:
+                    source = self._article(law, *current)
+                    for number, sub in articles:
+                        self.article_sources.append(source)
+                        self.article_targets.append(self._article(target, number, sub))
+        self.citation_count += found
+        self.scanned_laws += 1
+        return found
+
+    def add_law_file(self, title, file_path):
+        """
+        从纯文本文件流式读取并扫描一部法律
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return self.add_law(title, f)
+
+    def build(self):
+        """
+        生成 CitationGraph：条文节点按 (法律, 条号, 之X) 排序，边去重并计数
+        """
+        keys = np.array(list(self.article_ids), dtype=np.int64).reshape(-1, 3)
+        order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        keys = keys[order]
+
+        article_sources = np.frombuffer(self.article_sources, dtype=np.int64)
+        article_targets = np.frombuffer(self.article_targets, dtype=np.int64)
+        graph = CitationGraph(self.titles)
+        graph.law_offsets, graph.law_targets, graph.law_counts = _csr(
+            np.frombuffer(self.law_sources, dtype=np.int64), np.frombuffer(self.law_targets, dtype=np.int64),
+            len(self.titles))
+        graph.article_law = keys[:, 0].astype(np.int32)
+        graph.article_number = keys[:, 1].astype(np.int32)
+        graph.article_sub = keys[:, 2].astype(np.int32)
+        graph.article_offsets, graph.article_targets, graph.article_counts = _csr(
+            remap[article_sources], remap[article_targets], len(keys))
+        return graph
+
+class CitationGraph:
+    """
+    CSR 形式的引用图：法律 -> 法律，条文 -> 条文
+    """
+
+    ARRAYS = ('law_offsets', 'law_targets', 'law_counts', 'article_law', 'article_number', 'article_sub',
+              'article_offsets', 'article_targets', 'article_counts')
+
+    def __init__(self, titles):
+        self.titles = list(titles)
+        self.law_ids = {title: i for i, title in enumerate(self.titles)}
+        self._article_ids = None
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            graph = cls(meta['titles'])
+            for name in cls.ARRAYS:
+                setattr(graph, name, data[name])
+        return graph
+
+    def save(self, path):
+        """
+        原子地写出 .npz 文件
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.frombuffer(json.dumps({'titles': self.titles}, ensure_ascii=False).encode('utf-8'),
+                                           dtype=np.uint8),
+                     **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @property
+    def law_edge_count(self):
+        return len(self.law_targets)
+
+    @property
+    def article_edge_count(self):
+        return len(self.article_targets)
+
+    def article_id(self, title, number, sub=0):
+        """
+        返回条文节点编号；该条文没有出现在任何引用中时返回 None
+        """
+        if self._article_ids is None:
+            self._article_ids = {key: i for i, key in enumerate(zip(
+                self.article_law.tolist(), self.article_number.tolist(), self.article_sub.tolist()))}
+        return self._article_ids.get((self.law_ids[title], number, sub))
+
+    def article_label(self, article):
+        """
+        返回条文节点的 (法律标题, 条号, 之X)
+        """
+        return (self.titles[self.article_law[article]], int(self.article_number[article]),
+                int(self.article_sub[article]))
+
+    def cited_laws(self, title):
+        """
+        返回被指定法律引用的 [(法律标题, 引用次数)]
+        """
+        law = self.law_ids[title]
+        start, end = self.law_offsets[law], self.law_offsets[law + 1]
+        return [(self.titles[target], count) for target, count in
+                zip(self.law_targets[start:end].tolist(), self.law_counts[start:end].tolist())]
+
+    def citing_laws(self, title):
+        """
+        返回引用了指定法律的 [(法律标题, 引用次数)]
+        """
+        law = self.law_ids[title]
+        sources = np.repeat(np.arange(len(self.titles)), np.diff(self.law_offsets))
+        mask = self.law_targets == law
+        return [(self.titles[source], count) for source, count in
+                zip(sources[mask].tolist(), self.law_counts[mask].tolist())]
+
+    def cited_articles(self, title, number, sub=0):
+        """
+        返回指定条文引用的 [((法律标题, 条号, 之X), 引用次数)]
+        """
+        article = self.article_id(title, number, sub)
+        if article is None:
+            return []
+        start, end = self.article_offsets[article], self.article_offsets[article + 1]
+        return [(self.article_label(target), count) for target, count in
+                zip(self.article_targets[start:end].tolist(), self.article_counts[start:end].tolist())]
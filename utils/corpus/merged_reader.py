@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Merged Corpus Reader
+
+This module gives random access to the merged law corpus (merged.txt)
+produced by scripts/convert_raw_law_to_plaintext.py. The file is
+memory-mapped and a title index is built once by scanning for the
+`# {title}` banners (or loaded from the sidecar <merged.txt>.index.json
+written by MergedFileWriter). Laws and articles are returned as zero-copy
+memoryview slices of the mapping, so the corpus is never loaded into RAM.
+
+Usage:
+    with MergedCorpus('data/law_text/merged.txt') as corpus:
+        text = corpus.text('中华人民共和国民法典')
+        for label, article in corpus.articles('中华人民共和国民法典'):
+            ...
+
+close() releases the mapping when no memoryview slice is left; slices
+still held (loop variables, unfinished generators) keep it alive until
+they are garbage-collected.
+"""
+
+import json
+import mmap
+import os
+import re
+
+from utils.corpus.chinese_numerals import numeral_bytes_pattern
+from utils.corpus.merged_writer import INDEX_SUFFIX, SEPARATOR, law_banner
+
+# 标题分隔符：\n====\n# 标题\n====\n\n
+BANNER_PATTERN = re.compile(
+    rb'\n' + SEPARATOR.encode() + rb'\n# ([^\n]*)\n' + SEPARATOR.encode() + rb'\n\n')
+
+# 条文开头：行首（可有空白或全角空格）的 "第X条"
+ARTICLE_PATTERN = re.compile(
+    rb'(?m)^(?:[ \t]|\xe3\x80\x80)*(\xe7\xac\xac' + numeral_bytes_pattern() + rb'\xe6\x9d\xa1)')
+
+class MergedCorpus:
+    """
+    内存映射的合并语料库，按标题随机访问各部法律和条文
+    """
+
+    def __init__(self, file_path, index_path=None, save_index=True):
+        self.file_path = file_path
+        self.index_path = index_path or file_path + INDEX_SUFFIX
+        self._file = open(file_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件无法映射
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b'')
+        self._articles = {}
+
+        self.entries = self._load_index()
+        if self.entries is None:
+            self.entries = self._scan_index()
+            if save_index:
+                self._save_index()
+        self._by_title = {}
+        for i, entry in enumerate(self.entries):
+            # 重复标题时保留第一个
+            self._by_title.setdefault(entry['title'], i)
+
+    def _load_index(self):
+        """
+        读取旁路索引；格式不是 txt 或与文件内容不一致时返回 None
+        """
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('format', 'txt') != 'txt':
+            return None
+
+        entries = index.get('entries', [])
+        size = len(self._view)
+        for entry in entries:
+            # 校验每个条目的标题分隔符确实位于记录的位置
+            banner = law_banner(entry['title']).encode('utf-8')
+            start = entry['offset']
+            if start + len(banner) > size or self._view[start:start + len(banner)] != banner:
+                return None
+        return entries
+
+    def _scan_index(self):
+        """
+        扫描整个文件中的标题分隔符，建立索引（只在没有可用索引时执行一次）
+        """
+        if self._mmap is None:
+            return []
+        matches = list(BANNER_PATTERN.finditer(self._mmap))
+        entries = []
+        for i, match in enumerate(matches):
+            block_end = matches[i + 1].start() if i + 1 < len(matches) else len(self._mmap)
+            content_end = block_end
+            # 每部法律的内容后面跟着 "\n\n"
+            if self._mmap[content_end - 2:content_end] == b'\n\n':
+                content_end -= 2
+            entries.append({
+                'title': match.group(1).decode('utf-8'),
+                'offset': match.start(),
+                'length': block_end - match.start(),
+                'content_offset': match.end() - match.start(),
+                'content_length': content_end - match.end(),
+            })
+        return entries
+
+    def _save_index(self):
+        """
+        保存扫描得到的索引，下次直接加载
+        """
+        try:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'merged_file': os.path.basename(self.file_path),
+                    'format': 'txt',
+                    'entries': self.entries,
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: Failed to save merged index {self.index_path}: {e}")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, title):
+        return title in self._by_title
+
+    def titles(self):
+        """
+        按合并文件中的顺序返回所有标题
+        """
+        return [entry['title'] for entry in self.entries]
+
+    def _entry_view(self, entry):
+        start = entry['offset'] + entry['content_offset']
+        return self._view[start:start + entry['content_length']]
+
+    def law(self, title):
+        """
+        返回指定法律正文的 memoryview（UTF-8 字节，零拷贝），不存在时抛出 KeyError
+        """
+        return self._entry_view(self.entries[self._by_title[title]])
+
+    def text(self, title):
+        """
+        返回指定法律正文的字符串
+        """
+        return str(self.law(title), 'utf-8')
+
+    def iter_laws(self):
+        """
+        按顺序惰性生成 (标题, memoryview)
+        """
+        for entry in self.entries:
+            yield entry['title'], self._entry_view(entry)
+
+    def _article_spans(self, title):
+        """
+        返回指定法律中各条文的 [(条文标签, 起始偏移, 结束偏移)]（相对于法律正文），结果会被缓存
+        """
+        if title not in self._articles:
+            law = self.law(title)
+            starts = [(m.group(1).decode('utf-8'), m.start(1)) for m in ARTICLE_PATTERN.finditer(law)]
+            spans = []
+            for i, (label, start) in enumerate(starts):
+                end = starts[i + 1][1] if i + 1 < len(starts) else len(law)
+                spans.append((label, start, end))
+            self._articles[title] = spans
+            law.release()
+        return self._articles[title]
+
+    def articles(self, title):
+        """
+        惰性生成指定法律的各条文 (条文标签, memoryview)，如 ('第一条', ...)
+        """
+        law = self.law(title)
+        for label, start, end in self._article_spans(title):
+            yield label, law[start:end]
+
+    def article(self, title, label):
+        """
+        返回指定条文的 memoryview，如 corpus.article('中华人民共和国民法典', '第五百条')
+        不存在时抛出 KeyError
+        """
+        for article_label, start, end in self._article_spans(title):
+            if article_label == label:
+                return self.law(title)[start:end]
+        raise KeyError(f"{title} {label}")
+
+    def close(self):
+        """
+        关闭内存映射；仍有 memoryview 切片在使用时映射无法立即关闭，留给垃圾回收
+        """
+        self._articles.clear()
+        try:
+            self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Merged Corpus Writer
+
+This module writes the merged law corpus (merged.txt) through a single
+buffered file handle. Law texts can be streamed in chunks, e.g. copied
+straight from the per-title .txt files, instead of being held in memory.
+
+Supported formats:
+    txt   - plain UTF-8 text (merged.txt)
+    gzip  - one gzip member per law (merged.txt.gz)
+    zstd  - one zstd frame per law (merged.txt.zst, requires `pip install zstandard`)
+
+Because every law is compressed independently, a law can be decompressed
+on its own. A sidecar index (<merged file>.index.json) records, for each
+title, the byte offset and length of its block in the merged file and the
+position of the law text inside the (decompressed) block.
+
+The merged file is written to <merged file>.tmp and renamed into place by
+close(), so an interrupted run leaves the previous merged file intact;
+abort() removes the temporary file instead.
+"""
+
+import gzip
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 合并文件中每部法律的分隔行
+SEPARATOR = "=" * 80
+
+MERGED_FORMATS = {
+    'txt': 'merged.txt',
+    'gzip': 'merged.txt.gz',
+    'zstd': 'merged.txt.zst',
+}
+
+INDEX_SUFFIX = '.index.json'
+
+def merged_file_name(merged_format):
+    """
+    返回指定格式的合并文件名
+    """
+    if merged_format not in MERGED_FORMATS:
+        raise ValueError(f"Unknown merged format: {merged_format}")
+    return MERGED_FORMATS[merged_format]
+
+class _BlockSink:
+    """
+    压缩流写入底层文件时经过的转发对象；数据块中途失败时断开，
+    使被丢弃的压缩流在关闭或回收时不再写入文件
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def write(self, data):
+        if self.raw is None:
+            return len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        if self.raw is not None:
+            self.raw.flush()
+
+def law_banner(title):
+    """
+    每部法律前的标题分隔符
+    """
+    return f"\n{SEPARATOR}\n# {title}\n{SEPARATOR}\n\n"
+
+class MergedFileWriter:
+    """
+    合并文件写入器：整个运行期间只打开一次输出文件
+    """
+
+    def __init__(self, file_path, header, merged_format='txt', buffer_size=1 << 20, write_index=True):
+        if merged_format not in MERGED_FORMATS:
+            raise ValueError(f"Unknown merged format: {merged_format}")
+        if merged_format == 'zstd' and zstandard is None:
+            raise Exception("zstandard not installed. Please run: pip install zstandard")
+
+        self.file_path = file_path
+        self.merged_format = merged_format
+        self.index_path = file_path + INDEX_SUFFIX if write_index else None
+        self.entries = []
+        self._tmp_path = file_path + '.tmp'
+        self._raw = open(self._tmp_path, 'wb', buffering=buffer_size)
+        self._zstd = zstandard.ZstdCompressor() if merged_format == 'zstd' else None
+
+        self._begin_block()
+        self._write(header)
+        self._end_block()
+
+    def _begin_block(self):
+        """
+        开始一个独立的数据块（压缩格式下为一个 gzip 成员或 zstd 帧）
+        """
+        self._block_offset = self._raw.tell()
+        self._block_length = 0
+        self._sink = _BlockSink(self._raw)
+        if self.merged_format == 'gzip':
+            self._stream = gzip.GzipFile(fileobj=self._sink, mode='wb', mtime=0)
+        elif self.merged_format == 'zstd':
+            self._stream = self._zstd.stream_writer(self._sink, closefd=False)
+        else:
+            self._stream = self._raw
+
+    def _end_block(self):
+        """
+        结束当前数据块，返回它在文件中的 (偏移, 长度)
+        """
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._stream = None
+        return self._block_offset, self._raw.tell() - self._block_offset
+
+    def _abort_block(self):
+        """
+        丢弃写了一半的数据块：断开未结束的压缩流，把文件截回数据块的起始位置
+        """
+        self._sink.raw = None
+        if self._stream is not None and self._stream is not self._raw:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+        self._stream = None
+        self._raw.seek(self._block_offset)
+        self._raw.truncate()
+
+    def _write(self, data):
+        """
+        写入文本（UTF-8 编码），返回写入的字节数
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._stream.write(data)
+        self._block_length += len(data)
+        return len(data)
+
+    def write_law(self, title, chunks):
+        """
+        写入一部法律；chunks 可以是字符串或字符串/字节串的可迭代对象
+        chunks 中途抛出异常时，这部法律不会写入（文件截回写入前的位置）
+        """
+        if isinstance(chunks, (str, bytes)):
+            chunks = [chunks]
+
+        self._begin_block()
+        try:
+            self._write(law_banner(title))
+            content_offset = self._block_length
+            for chunk in chunks:
+                self._write(chunk)
+            content_length = self._block_length - content_offset
+            self._write("\n\n")
+            offset, length = self._end_block()
+        except BaseException:
+            # 读取中途失败时不留下不完整的数据块，之后的法律仍写在有效的位置
+            self._abort_block()
+            raise
+
+        self.entries.append({
+            'title': title,
+            'offset': offset,
+            'length': length,
+            'content_offset': content_offset,
+            'content_length': content_length,
+        })
+
+    def copy_law_from_file(self, title, file_path, chunk_size=1 << 20):
+        """
+        从单个法律的纯文本文件中分块复制内容，不把整部法律读入内存
+        """
+        with open(file_path, 'rb') as f:
+            self.write_law(title, iter(lambda: f.read(chunk_size), b''))
+
+    def close(self):
+        """
+        关闭文件，把它重命名为最终的合并文件，并写出偏移索引
+        """
+        if self._raw is None:
+            return
+        self._raw.close()
+        self._raw = None
+        os.replace(self._tmp_path, self.file_path)
+
+        if self.index_path:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'merged_file': os.path.basename(self.file_path),
+                    'format': self.merged_format,
+                    'entries': self.entries,
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+
+    def abort(self):
+        """
+        放弃本次写入：关闭并删除临时文件，之前的合并文件和索引保持不变
+        """
+        if self._raw is None:
+            return
+        self._raw.close()
+        self._raw = None
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+def read_law_from_merged(file_path, entry, merged_format='txt'):
+    """
+    根据索引条目从合并文件中读取单部法律的文本（只读取该法律所在的数据块）
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(entry['offset'])
+        block = f.read(entry['length'])
+    if merged_format == 'gzip':
+        block = gzip.decompress(block)
+    elif merged_format == 'zstd':
+        if zstandard is None:
+            raise Exception("zstandard not installed. Please run: pip install zstandard")
+        block = zstandard.ZstdDecompressor().decompressobj().decompress(block)
+    start = entry['content_offset']
+    return block[start:start + entry['content_length']].decode('utf-8')
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Near-Duplicate Law Detection
+
+raw_laws_folder holds many near-identical documents: amended versions,
+re-promulgations and the same law saved as both .doc and .docx. This
+module finds them without comparing every pair of documents:
+
+    1. shingling   every document becomes the set of hashes of its
+                   overlapping 5-character windows (whitespace removed)
+    2. MinHash     the set is reduced to a fixed-length signature; the
+                   share of equal positions in two signatures estimates
+                   the Jaccard similarity of the shingle sets
+    3. LSH         signatures are cut into bands; documents sharing any
+                   band hash land in the same bucket and become candidate
+                   pairs. Each candidate is checked against the bucket's
+                   first member, and pairs at or above the similarity
+                   threshold are merged with union-find.
+
+Each cluster gets a canonical version: the latest version first (by the
+date in the file name), then the preferred extension (.docx before .doc,
+the registry order) among copies of the same version, then the most
+recently modified and the largest file. The
+canonical map written by write_canonical_map() is read back by
+convert_raw_law_to_plaintext.py and vote_items.py (--canonical_map), so a
+statute is extracted, indexed and voted on once.
+
+Signatures are cached per file (size and mtime) in a .npz file, so only
+new or changed files are read again.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.corpus.text_index import normalize_text, text_codepoints
+
+CANONICAL_MAP_VERSION = 1
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_PERMUTATIONS = 128
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.8
+# 文件名中的日期：2018年10月26日、2018-10-26、（2018年修正）
+DATE_PATTERNS = [
+    re.compile(r'(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日'),
+    re.compile(r'(\d{4})[-_.](\d{1,2})[-_.](\d{1,2})'),
+    re.compile(r'(\d{4})\s*年'),
+]
+_MIX_1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX_2 = np.uint64(0x94d049bb133111eb)
+_SHINGLE_BASE = np.uint64(1000003)
+
+def _mix64(values):
+    """
+    splitmix64 终混函数，使多项式哈希的各位分布均匀
+    """
+    values = values ^ (values >> np.uint64(30))
+    values = values * _MIX_1
+    values = values ^ (values >> np.uint64(27))
+    values = values * _MIX_2
+    return values ^ (values >> np.uint64(31))
+
+def shingle_hashes(text, size=DEFAULT_SHINGLE_SIZE):
+    """
+    返回规范化文本所有长度为 size 的字符窗口的 64 位哈希（去重、排序）
+    文本短于 size 时整个文本为一个窗口
+    """
+    codepoints = text_codepoints(normalize_text(text)).astype(np.uint64)
+    if not len(codepoints):
+        return np.zeros(0, dtype=np.uint64)
+    windows = sliding_window_view(codepoints, min(size, len(codepoints)))
+    hashes = np.zeros(len(windows), dtype=np.uint64)
+    for column in range(windows.shape[1]):
+        hashes = hashes * _SHINGLE_BASE + windows[:, column]
+    return np.unique(_mix64(hashes))
+
+class MinHasher:
+    """
+    用 permutations 个随机的 (a * x + b) mod 2^64 哈希函数计算 MinHash 签名（取高 32 位）
+    """
+
+    def __init__(self, permutations=DEFAULT_PERMUTATIONS, seed=1, chunk_size=4096):
+        rng = np.random.default_rng(seed)
+        self.permutations = permutations
+        self.a = rng.integers(1, 1 << 63, size=permutations, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=permutations, dtype=np.uint64)
+        self.chunk_size = chunk_size
+
+    def signature(self, hashes):
+        """
+        返回 uint32 签名；空集合的签名全部为最大值
+        """
+        signature = np.full(self.permutations, np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, len(hashes), self.chunk_size):
+            chunk = hashes[start:start + self.chunk_size, None]
+            values = ((chunk * self.a + self.b) >> np.uint64(32)).astype(np.uint32)
+            np.minimum(signature, values.min(axis=0), out=signature)
+        return signature
+
+def text_signature(text, minhasher, shingle_size=DEFAULT_SHINGLE_SIZE):
+    return minhasher.signature(shingle_hashes(text, shingle_size))
+
+def estimate_similarity(signatures, pairs, chunk_size=1 << 16):
+    """
+    估计每对文档的 Jaccard 相似度（签名中相等位置的比例）
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    similarity = np.empty(len(pairs), dtype=np.float64)
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        similarity[start:start + len(chunk)] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return similarity
+
+def candidate_pairs(signatures, bands=DEFAULT_BANDS):
+    """
+    LSH 分带：任一带完全相同的文档进入同一个桶，桶内每个文档与桶的第一个文档组成候选对
+    返回去重后的候选对数组 (n, 2)，第一列小于第二列
+    """
+    signatures = np.ascontiguousarray(signatures)
+    count, permutations = signatures.shape
+    if count < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    rows = permutations // bands
+    pairs = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        representative = first[inverse.ravel()]
+        members = np.flatnonzero(representative != np.arange(count))
+        if len(members):
+            pairs.append(np.stack([representative[members], members], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+def cluster_signatures(signatures, bands=DEFAULT_BANDS, threshold=DEFAULT_THRESHOLD):
+    """
+    对签名做 LSH 聚类，返回 (簇列表 [[文档下标]]（只含两个及以上文档的簇）, 通过阈值的候选对, 其相似度)
+    """
+    signatures = np.asarray(signatures)
+    pairs = candidate_pairs(signatures, bands)
+    similarity = estimate_similarity(signatures, pairs)
+    accepted = similarity >= threshold
+    pairs, similarity = pairs[accepted], similarity[accepted]
+
+    # 并查集
+    parent = list(range(len(signatures)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs.tolist():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = {}
+    for i in range(len(signatures)):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1], pairs, similarity
+
+def version_date(path):
+    """
+    从文件名中提取版本日期 (年, 月, 日)，没有时返回 (0, 0, 0)
+    """
+    name = os.path.basename(path)
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(name)
+        if match:
+            parts = [int(part) for part in match.groups()]
+            return tuple(parts + [0] * (3 - len(parts)))
+    return (0, 0, 0)
+
+def choose_canonical(records, extension_order):
+    """
+    在一个簇中选择规范版本：最新的版本（文件名中的日期）、同一版本中优先的扩展名、
+    最新的修改时间、最大的文件
+    records 为 [{'path', 'size', 'mtime_ns'}]，返回其下标
+    """
+    def key(i):
+        record = records[i]
+        ext = os.path.splitext(record['path'])[1].lower()
+        rank = extension_order.index(ext) if ext in extension_order else len(extension_order)
+        date = version_date(record['path'])
+        return (tuple(-part for part in date), rank, -record['mtime_ns'], -record['size'], record['path'])
+
+    return min(range(len(records)), key=key)
+
+def build_canonical_map(records, clusters, signatures, extension_order, parameters=None):
+    """
+    生成规范映射：
+        clusters  [{'canonical', 'members': [{'path', 'similarity'}]}]
+        files     {非规范文件路径: 规范文件路径}
+        titles    {非规范文件的标题: 规范文件的标题}（文件名去掉扩展名，标题相同时不列出）
+    """
+    result = {'version': CANONICAL_MAP_VERSION, 'parameters': parameters or {},
+              'clusters': [], 'files': {}, 'titles': {}}
+    for members in clusters:
+        canonical = members[choose_canonical([records[i] for i in members], extension_order)]
+        canonical_path = records[canonical]['path']
+        canonical_title = os.path.splitext(os.path.basename(canonical_path))[0]
+        others = [i for i in members if i != canonical]
+        similarity = estimate_similarity(signatures, [(canonical, i) for i in others])
+        result['clusters'].append({
+            'canonical': canonical_path,
+            'members': [{'path': records[i]['path'], 'similarity': round(float(s), 4)}
+                        for i, s in zip(others, similarity)],
+        })
+        for i in others:
+            path = records[i]['path']
+            result['files'][path] = canonical_path
+            title = os.path.splitext(os.path.basename(path))[0]
+            if title != canonical_title:
+                result['titles'][title] = canonical_title
+    return result
+
+def write_canonical_map(canonical_map, path):
+    """
+    原子地写出规范映射 JSON
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(canonical_map, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def load_canonical_map(path):
+    """
+    读取规范映射，版本不匹配时抛出异常
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        canonical_map = json.load(f)
+    if canonical_map.get('version') != CANONICAL_MAP_VERSION:
+        raise Exception(f"Unsupported canonical map version in {path}: {canonical_map.get('version')}")
+    return canonical_map
+
+class SignatureCache:
+    """
+    按文件 (大小, 修改时间) 缓存 MinHash 签名；参数改变时缓存失效
+    """
+
+    def __init__(self, path, parameters):
+        self.path = path
+        self.parameters = parameters
+        # {文件路径: (大小, 修改时间, 签名)}
+        self.entries = {}
+
+    @classmethod
+    def load(cls, path, parameters):
+        cache = cls(path, parameters)
+        if not path or not os.path.exists(path):
+            return cache
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                signatures = data['signatures']
+            if meta.get('parameters') != parameters:
+                return cache
+            for i, (file_path, size, mtime_ns) in enumerate(meta['files']):
+                cache.entries[file_path] = (size, mtime_ns, signatures[i])
+        except Exception as e:
+            print(f"Warning: Failed to load signature cache {path}: {e}")
+        return cache
+
+    def get(self, record):
+        entry = self.entries.get(record['path'])
+        if entry is not None and entry[0] == record['size'] and entry[1] == record['mtime_ns']:
+            return entry[2]
+        return None
+
+    def put(self, record, signature):
+        self.entries[record['path']] = (record['size'], record['mtime_ns'], signature)
+
+    def save(self, keep=None):
+        """
+        原子地写出缓存；keep 为要保留的文件路径集合（其余条目丢弃）
+        """
+        if not self.path:
+            return
+        paths = [path for path in self.entries if keep is None or path in keep]
+        permutations = self.parameters.get('permutations', DEFAULT_PERMUTATIONS)
+        signatures = (np.stack([self.entries[path][2] for path in paths]) if paths
+                      else np.zeros((0, permutations), dtype=np.uint32))
+        meta = {'parameters': self.parameters,
+                'files': [[path, self.entries[path][0], self.entries[path][1]] for path in paths]}
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8),
+                         signatures=signatures)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Failed to save signature cache {self.path}: {e}")
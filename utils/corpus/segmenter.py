@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Statute Segmenter
+
+This module splits law texts into structural units (编/章/节/条/款/项)
+and stores them column-wise instead of as per-unit Python objects:
+
+    <store>/heap.bin          UTF-8 text of every law, concatenated
+    <store>/<column>.bin      one fixed-width NumPy column per field
+    <store>/meta.json         row count, dtypes, law titles and the first
+                              row of every law
+
+Every unit is one row. Its id is the row number (assigned in document
+order, so ids are stable for the same input), and it has a parent link,
+a level, an ordinal (e.g. 123 for 第一百二十三条, the position for 款) and a
+byte span into heap.bin covering the unit including its children. Law
+texts are streamed line by line; rows are buffered per law only.
+
+ColumnarCorpus memory-maps the columns, so queries such as "every 第N条
+across all laws" are vectorised NumPy scans done in fixed-size chunks.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from utils.corpus.chinese_numerals import NUMERAL_PATTERN, parse_chinese_numeral
+
+# 层级编码；0 表示整部法律
+LEVELS = ['法', '编', '章', '节', '条', '款', '项']
+LEVEL_LAW, LEVEL_PART, LEVEL_CHAPTER, LEVEL_SECTION, LEVEL_ARTICLE, LEVEL_CLAUSE, LEVEL_ITEM = range(7)
+
+# 标题行：第X编 / 第X章 / 第X节
+HEADING_PATTERNS = [
+    (LEVEL_PART, re.compile(r'^[ \t　]*第(' + NUMERAL_PATTERN + r')编')),
+    (LEVEL_CHAPTER, re.compile(r'^[ \t　]*第(' + NUMERAL_PATTERN + r')章')),
+    (LEVEL_SECTION, re.compile(r'^[ \t　]*第(' + NUMERAL_PATTERN + r')节')),
+]
+# 条文：第X条（条文内容可能与标签在同一行）
+ARTICLE_PATTERN = re.compile(r'^[ \t　]*第(' + NUMERAL_PATTERN + r')条[ \t　]*')
+# 项：（一）或 (一)
+ITEM_PATTERN = re.compile(r'^[ \t　]*[（(](' + NUMERAL_PATTERN + r')[）)]')
+
+COLUMNS = {
+    'law_id': np.int32,
+    'level': np.int8,
+    'ordinal': np.int32,
+    'parent': np.int64,
+    'start': np.int64,
+    'length': np.int64,
+}
+
+META_FILENAME = 'meta.json'
+HEAP_FILENAME = 'heap.bin'
+
+def segment_lines(lines):
+    """
+    对一部法律逐行分段，生成行记录 [层级, 序号, 父单元的局部序号, 起始字节, 结束字节]
+    lines 为字符串行的可迭代对象（保留换行符）；单元序号按出现顺序从 0 开始，0 为整部法律
+    """
+    rows = [[LEVEL_LAW, 0, -1, 0, 0]]
+    # 当前打开的单元，每个层级最多一个 {层级: 局部序号}
+    open_units = {LEVEL_LAW: 0}
+    clause_count = 0
+    position = 0
+
+    def open_unit(level, ordinal, start):
+        # 关闭同级及更低层级的单元
+        for open_level in [l for l in open_units if l >= level]:
+            rows[open_units.pop(open_level)][4] = start
+        parent = open_units[max(open_units)]
+        rows.append([level, ordinal, parent, start, start])
+        open_units[level] = len(rows) - 1
+
+    for line in lines:
+        encoded_length = len(line.encode('utf-8'))
+        stripped = line.strip()
+        if stripped:
+            heading = None
+            for level, pattern in HEADING_PATTERNS:
+                match = pattern.match(line)
+                if match:
+                    heading = (level, match)
+                    break
+
+            if heading:
+                level, match = heading
+                open_unit(level, parse_chinese_numeral(match.group(1)) or -1, position)
+            else:
+                article = ARTICLE_PATTERN.match(line)
+                item = ITEM_PATTERN.match(line)
+                if article:
+                    open_unit(LEVEL_ARTICLE, parse_chinese_numeral(article.group(1)) or -1, position)
+                    clause_count = 0
+                    # 条文标签后的同一行内容是第一款
+                    if line[article.end():].strip():
+                        clause_count += 1
+                        open_unit(LEVEL_CLAUSE, clause_count, position)
+                elif LEVEL_ARTICLE in open_units:
+                    if item and LEVEL_CLAUSE in open_units:
+                        open_unit(LEVEL_ITEM, parse_chinese_numeral(item.group(1)) or -1, position)
+                    else:
+                        clause_count += 1
+                        open_unit(LEVEL_CLAUSE, clause_count, position)
+        position += encoded_length
+
+    for index in open_units.values():
+        rows[index][4] = position
+    return rows
+
+class ColumnarCorpusWriter:
+    """
+    逐部法律写入分段结果的列式存储；内存中只保留当前一部法律的行
+    """
+
+    def __init__(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.titles = []
+        # 每部法律的起始行（各法律的行是连续的），最后一项为总行数
+        self.law_offsets = [0]
+        self.row_count = 0
+        self._heap = open(os.path.join(output_dir, HEAP_FILENAME), 'wb', buffering=1 << 20)
+        self._columns = {name: open(os.path.join(output_dir, f"{name}.bin"), 'wb', buffering=1 << 20)
+                         for name in COLUMNS}
+
+    def add_law(self, title, lines):
+        """
+        分段并写入一部法律；lines 为字符串行的可迭代对象（例如打开的文本文件）
+        返回写入的单元数
+        """
+        heap_offset = self._heap.tell()
+        law_id = len(self.titles)
+
+        def tee(source):
+            # 边分段边把原文写入堆
+            for line in source:
+                self._heap.write(line.encode('utf-8'))
+                yield line
+
+        rows = segment_lines(tee(lines))
+        base = self.row_count
+        table = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        parent = table[:, 2]
+        columns = {
+            'law_id': np.full(len(rows), law_id),
+            'level': table[:, 0],
+            'ordinal': table[:, 1],
+            'parent': np.where(parent >= 0, parent + base, -1),
+            'start': table[:, 3] + heap_offset,
+            'length': table[:, 4] - table[:, 3],
+        }
+        for name, dtype in COLUMNS.items():
+            self._columns[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+        self.titles.append(title)
+        self.row_count += len(rows)
+        self.law_offsets.append(self.row_count)
+        return len(rows)
+
+    def add_law_file(self, title, file_path):
+        """
+        从纯文本文件流式读取并写入一部法律
+        """
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            return self.add_law(title, f)
+
+    def close(self):
+        """
+        关闭所有列文件并写出 meta.json
+        """
+        if self._heap is None:
+            return
+        self._heap.close()
+        self._heap = None
+        for f in self._columns.values():
+            f.close()
+        with open(os.path.join(self.output_dir, META_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump({
+                'rows': self.row_count,
+                'levels': LEVELS,
+                'columns': {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+                'titles': self.titles,
+                'law_offsets': self.law_offsets,
+            }, f, ensure_ascii=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+class ColumnarCorpus:
+    """
+    内存映射的列式分段语料，所有查询都是对列的向量化扫描
+    """
+
+    def __init__(self, store_dir, chunk_rows=1 << 22):
+        with open(os.path.join(store_dir, META_FILENAME), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.store_dir = store_dir
+        self.rows = meta['rows']
+        self.titles = meta['titles']
+        # 旧版本写出的 meta.json 没有 law_offsets
+        self.law_offsets = meta.get('law_offsets')
+        self.chunk_rows = chunk_rows
+        self.columns = {}
+        for name, dtype in meta['columns'].items():
+            path = os.path.join(store_dir, f"{name}.bin")
+            self.columns[name] = (np.memmap(path, dtype=np.dtype(dtype), mode='r', shape=(self.rows,))
+                                  if self.rows else np.zeros(0, dtype=np.dtype(dtype)))
+        heap_path = os.path.join(store_dir, HEAP_FILENAME)
+        self.heap = (np.memmap(heap_path, dtype=np.uint8, mode='r')
+                     if os.path.getsize(heap_path) else np.zeros(0, dtype=np.uint8))
+
+    def __len__(self):
+        return self.rows
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def select(self, level=None, ordinal=None, law_id=None):
+        """
+        返回满足条件的单元 id 数组；level 可以是层级编码或名称（如 '条'）
+        按 chunk_rows 分块扫描，临时内存与语料规模无关
+        """
+        if isinstance(level, str):
+            level = LEVELS.index(level)
+        found = []
+        for start in range(0, self.rows, self.chunk_rows):
+            end = min(start + self.chunk_rows, self.rows)
+            mask = np.ones(end - start, dtype=bool)
+            if level is not None:
+                mask &= self.columns['level'][start:end] == level
+            if ordinal is not None:
+                mask &= self.columns['ordinal'][start:end] == ordinal
+            if law_id is not None:
+                mask &= self.columns['law_id'][start:end] == law_id
+            found.append(np.flatnonzero(mask) + start)
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def articles_numbered(self, number):
+        """
+        返回所有法律中 "第 number 条" 的单元 id
+        """
+        return self.select(LEVEL_ARTICLE, number)
+
+    def children(self, unit_id):
+        """
+        返回指定单元的直接子单元 id
+        子单元在父单元之后、同一法律的行范围内（由 law_offsets 给出），只扫描这一段行
+        """
+        law_id = int(self.columns['law_id'][unit_id])
+        if self.law_offsets is None:
+            law_rows = self.select(law_id=law_id)
+            return law_rows[self.columns['parent'][law_rows] == unit_id]
+        start, end = int(unit_id) + 1, self.law_offsets[law_id + 1]
+        return np.flatnonzero(self.columns['parent'][start:end] == unit_id) + start
+
+    def text(self, unit_id):
+        """
+        返回单元（含其所有子单元）的原文
+        """
+        start = int(self.columns['start'][unit_id])
+        length = int(self.columns['length'][unit_id])
+        return self.heap[start:start + length].tobytes().decode('utf-8')
+
+    def key(self, unit_id):
+        """
+        返回单元的稳定标识，如 '中华人民共和国民法典/编1/章3/条500/款2'
+        """
+        parts = []
+        unit_id = int(unit_id)
+        while unit_id >= 0:
+            level = int(self.columns['level'][unit_id])
+            if level == LEVEL_LAW:
+                parts.append(self.titles[int(self.columns['law_id'][unit_id])])
+            else:
+                parts.append(f"{LEVELS[level]}{int(self.columns['ordinal'][unit_id])}")
+            unit_id = int(self.columns['parent'][unit_id])
+        return '/'.join(reversed(parts))
@@ -0,0 +1,589 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Law Text Index
+
+This module builds an inverted index over the plaintext files written by
+scripts/convert_raw_law_to_plaintext.py. Chinese has no whitespace word
+boundaries, so the index terms are character bigrams (plus single
+characters, for one-character queries) of the text with all whitespace
+removed. Postings are at article granularity: every law is split at its
+"第X条" lines and each article (and the text before the first one) is a
+document.
+
+Terms are integer keys built from code points, so the postings of a
+whole law are collected with a few NumPy sorts. Postings are sorted
+document ids stored as delta-encoded varints. New documents always get
+larger ids than existing ones, so re-indexing a law appends to the
+postings and marks its old documents as deleted; compact() drops deleted
+documents once they make up a quarter of the index.
+TextIndex.sync() reads the conversion manifest and only re-indexes laws
+whose output changed, so the index is maintained incrementally.
+
+Queries support phrases and boolean operators:
+
+    所有权 债权              both (AND is implied)
+    所有权 OR 债权           either
+    所有权 AND NOT 债权      the first without the second
+    (抵押权 OR 质权) "善意 第三人"
+
+Bigram postings only give candidates for phrases longer than two
+characters; these are verified against the article text. The whole index
+is kept in one .npz file, saved atomically.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from utils.corpus.merged_reader import ARTICLE_PATTERN
+
+INDEX_VERSION = 1
+CODEPOINT_BITS = 21
+WHITESPACE_PATTERN = re.compile(r'\s+')
+QUERY_TOKEN_PATTERN = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+OPERATORS = ('AND', 'OR', 'NOT')
+# 已删除文档超过该比例时自动压缩
+COMPACT_RATIO = 0.25
+
+def normalize_text(text):
+    """
+    删除所有空白字符（包括全角空格和换行），索引和查询都使用这种形式
+    """
+    return WHITESPACE_PATTERN.sub('', text)
+
+def text_codepoints(text):
+    """
+    返回文本各字符的码位（int64 数组）
+    """
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+def bigram_keys(codepoints):
+    """
+    二元字组的词项键：(前一个字符的码位 + 1) << 21 | 后一个字符的码位，与单字的键（码位本身）不会重合
+    """
+    return ((codepoints[:-1] + 1) << CODEPOINT_BITS) | codepoints[1:]
+
+def phrase_keys(text):
+    """
+    返回检索规范化短语所需的词项键：单字短语为其码位，否则为其中所有二元字组
+    """
+    codepoints = text_codepoints(text)
+    return codepoints[:1] if len(codepoints) == 1 else np.unique(bigram_keys(codepoints))
+
+def document_terms(texts, first_doc):
+    """
+    计算一组连续文档（规范化文本）的所有 (词项键, 文档 id) 对，按键、文档排序并去重
+    """
+    lengths = [len(text) for text in texts]
+    codepoints = text_codepoints(''.join(texts))
+    docs = np.repeat(np.arange(first_doc, first_doc + len(texts), dtype=np.int64), lengths)
+    # 不跨越文档边界的二元字组
+    inside = docs[:-1] == docs[1:]
+    keys = np.concatenate([codepoints, bigram_keys(codepoints)[inside]])
+    docs = np.concatenate([docs, docs[:-1][inside]])
+    order = np.lexsort((docs, keys))
+    keys, docs = keys[order], docs[order]
+    unique = np.ones(len(keys), dtype=bool)
+    unique[1:] = (keys[1:] != keys[:-1]) | (docs[1:] != docs[:-1])
+    return keys[unique], docs[unique]
+
+def _varint_bytes(values):
+    """
+    把非负整数数组编码为 varint（每字节 7 位，低位在前，最高位表示后面还有字节），
+    返回 (uint8 数组, 每个整数占用的字节数)
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= (np.uint64(1) << np.uint64(shift))
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    starts = np.cumsum(lengths) - lengths
+    for i in range(int(lengths.max()) if len(values) else 0):
+        mask = lengths > i
+        byte = (values[mask] >> np.uint64(7 * i)) & np.uint64(0x7f)
+        more = (lengths[mask] > i + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + i] = (byte | more).astype(np.uint8)
+    return out, lengths
+
+def encode_varints(values):
+    """
+    把非负整数数组编码为 varint 字节串
+    """
+    return _varint_bytes(values)[0].tobytes()
+
+def decode_varints(data):
+    """
+    解码 varint 字节串，返回 uint64 数组
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(data)) - starts[group]) * 7
+    parts = (data & 0x7f).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.bitwise_or.reduceat(parts, starts)
+
+def encode_postings(doc_ids, counts, previous):
+    """
+    一次性编码多个词项的倒排表：doc_ids 为各词项（已排序的）文档 id 依次拼接，
+    counts 为每个词项的文档数（均大于 0），previous 为每个词项已有倒排表的最后一个文档 id（没有时为 -1）
+    返回每个词项的差分 varint 字节串列表
+    """
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    if not len(counts):
+        return []
+    starts = np.cumsum(counts) - counts
+    deltas = np.diff(doc_ids, prepend=0)
+    deltas[starts] = doc_ids[starts] - np.asarray(previous, dtype=np.int64)
+    data, lengths = _varint_bytes(deltas)
+    byte_ends = np.cumsum(np.add.reduceat(lengths, starts)).tolist()
+    blob = data.tobytes()
+    return [blob[start:end] for start, end in zip([0] + byte_ends[:-1], byte_ends)]
+
+def decode_postings(blob, byte_lengths):
+    """
+    一次性解码多个拼接在一起的倒排表（每个都不为空），返回 (拼接的文档 id, 每个词项的文档数)
+    """
+    byte_lengths = np.asarray(byte_lengths, dtype=np.int64)
+    if not len(byte_lengths):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    values = decode_varints(blob).astype(np.int64)
+    ends = (np.frombuffer(blob, dtype=np.uint8) < 0x80).astype(np.int64)
+    counts = np.add.reduceat(ends, np.cumsum(byte_lengths) - byte_lengths)
+    starts = np.cumsum(counts) - counts
+    totals = np.cumsum(values)
+    # 每个词项的第一个差分相对于 -1
+    base = np.repeat(totals[starts] - values[starts], counts)
+    return totals - base - 1, counts
+
+def article_spans(data):
+    """
+    按 "第X条" 行把法律正文（UTF-8 字节）切分为 [(条文标签, 起始字节, 结束字节)]
+    第一条之前的内容（标题、目录等）标签为空字符串
+    """
+    starts = [(m.group(1).decode('utf-8'), m.start(1)) for m in ARTICLE_PATTERN.finditer(data)]
+    if not starts or data[:starts[0][1]].strip():
+        starts.insert(0, ('', 0))
+    spans = []
+    for i, (label, start) in enumerate(starts):
+        end = starts[i + 1][1] if i + 1 < len(starts) else len(data)
+        spans.append((label, start, end))
+    return spans
+
+def manifest_signature(entry):
+    """
+    由转换清单条目得到输出文件的签名；签名不变时输出内容不变
+    """
+    return [entry.get('sha256'), entry.get('reader'), entry.get('reader_version'), entry.get('output_size')]
+
+class TextIndex:
+    """
+    条文粒度的二元字组倒排索引
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # 法律列表，被删除的法律为 None：{'title', 'path', 'signature', 'first_doc', 'doc_count'}
+        self.laws = []
+        # 每个文档的法律编号、条文标签和在输出文件中的字节范围
+        self.doc_laws = []
+        self.doc_labels = []
+        self.doc_starts = []
+        self.doc_ends = []
+        self.live = []
+        # {词项键: 倒排表字节串}，以及每个词项倒排表中最后一个文档 id
+        self.postings = {}
+        self.last_doc = {}
+        self._decoded = {}
+        self._texts = {}
+        self._live_mask = None
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取索引文件；文件不存在、损坏或版本不匹配时返回空索引
+        """
+        index = cls(path)
+        if not os.path.exists(path):
+            return index
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                if meta.get('version') != INDEX_VERSION:
+                    raise ValueError(f"unsupported version {meta.get('version')}")
+                terms = data['terms'].tolist()
+                offsets = data['posting_offsets']
+                blob = data['postings'].tobytes()
+                last_doc = data['last_doc'].tolist()
+                index.doc_laws = data['doc_laws'].tolist()
+                index.doc_starts = data['doc_starts'].tolist()
+                index.doc_ends = data['doc_ends'].tolist()
+                index.live = data['live'].tolist()
+        except Exception as e:
+            print(f"Warning: Failed to load text index {path}: {e}")
+            return cls(path)
+
+        index.laws = meta['laws']
+        index.doc_labels = meta['doc_labels']
+        for i, term in enumerate(terms):
+            index.postings[term] = blob[offsets[i]:offsets[i + 1]]
+            index.last_doc[term] = last_doc[i]
+        return index
+
+    def save(self):
+        """
+        原子地写出索引文件（先写临时文件再替换）
+        """
+        terms = list(self.postings)
+        lengths = np.array([len(self.postings[term]) for term in terms], dtype=np.int64)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        meta = {
+            'version': INDEX_VERSION,
+            'laws': self.laws,
+            'doc_labels': self.doc_labels,
+        }
+
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f,
+                         meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8),
+                         terms=np.array(terms, dtype=np.int64),
+                         posting_offsets=offsets,
+                         postings=np.frombuffer(b''.join(self.postings[term] for term in terms), dtype=np.uint8),
+                         last_doc=np.array([self.last_doc[term] for term in terms], dtype=np.int64),
+                         doc_laws=np.array(self.doc_laws, dtype=np.int32),
+                         doc_starts=np.array(self.doc_starts, dtype=np.int64),
+                         doc_ends=np.array(self.doc_ends, dtype=np.int64),
+                         live=np.array(self.live, dtype=bool))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Failed to save text index {self.path}: {e}")
+
+    @property
+    def doc_count(self):
+        """
+        未删除的文档数
+        """
+        return sum(self.live)
+
+    @property
+    def law_count(self):
+        return sum(1 for law in self.laws if law is not None)
+
+    def _law_slots(self):
+        # 按文件名匹配（输出文件都在同一个文件夹中），与运行时的当前目录无关
+        return {os.path.basename(law['path']): i for i, law in enumerate(self.laws) if law is not None}
+
+    def add_law(self, title, path, signature=None, pending=None):
+        """
+        把一个纯文本输出文件按条文加入索引，返回新增的文档数
+        pending 为 [(词项键数组, 文档 id 数组)]，由 sync 批量写入倒排表；为 None 时立即写入
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        flush = pending is None
+        pending = [] if pending is None else pending
+        law_id = len(self.laws)
+        first_doc = len(self.doc_laws)
+        texts = []
+        for label, start, end in article_spans(data):
+            self.doc_laws.append(law_id)
+            self.doc_labels.append(label)
+            self.doc_starts.append(start)
+            self.doc_ends.append(end)
+            self.live.append(True)
+            texts.append(normalize_text(data[start:end].decode('utf-8', errors='replace')))
+        pending.append(document_terms(texts, first_doc))
+        self.laws.append({'title': title, 'path': path, 'signature': signature,
+                          'first_doc': first_doc, 'doc_count': len(self.doc_laws) - first_doc})
+        if flush:
+            self._flush(pending)
+        return len(self.doc_laws) - first_doc
+
+    def remove_law(self, law_id):
+        """
+        删除一部法律：其文档标记为已删除，倒排表在压缩时才清理
+        """
+        law = self.laws[law_id]
+        for doc_id in range(law['first_doc'], law['first_doc'] + law['doc_count']):
+            self.live[doc_id] = False
+        self.laws[law_id] = None
+        self._live_mask = None
+        self._texts.pop(law_id, None)
+
+    def _flush(self, pending):
+        """
+        把新文档的 id 以差分 varint 追加到各词项的倒排表
+        pending 中的文档 id 按法律顺序递增，所以按键稳定排序后每个词项的文档 id 仍然有序
+        """
+        if pending:
+            keys = np.concatenate([keys for keys, _ in pending])
+            docs = np.concatenate([docs for _, docs in pending])
+            order = np.argsort(keys, kind='stable')
+            keys, docs = keys[order], docs[order]
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            counts = np.diff(np.append(starts, len(keys)))
+            terms = keys[starts].tolist()
+            last_ids = docs[starts + counts - 1].tolist()
+            postings = self.postings
+            last_doc = self.last_doc
+            previous = [last_doc.get(term, -1) for term in terms]
+            for term, data, last in zip(terms, encode_postings(docs, counts, previous), last_ids):
+                postings[term] = postings[term] + data if term in postings else data
+                last_doc[term] = last
+            pending.clear()
+        self._decoded.clear()
+        self._live_mask = None
+
+    def sync(self, manifest, output_folder=None, on_law=None):
+        """
+        使索引与转换清单 {源文件: 条目} 一致：输出签名未变的法律保留，
+        变化或新增的法律重新索引，不再出现在清单中的法律删除
+        清单中的 output_path 是相对于转换时的当前目录写入的，给出 output_folder 时
+        按文件名在该文件夹中查找；找不到输出文件的法律给出警告并保留在索引中
+        on_law(title, status, doc_count) 在每部法律处理后调用，status 为 added/updated/removed
+        返回 {'kept', 'added', 'updated', 'removed', 'missing'}
+        """
+        changes = {'kept': 0, 'added': 0, 'updated': 0, 'removed': 0, 'missing': 0}
+        slots = self._law_slots()
+        seen = set()
+        pending = []
+        for source, entry in manifest.items():
+            path = entry.get('output_path')
+            if not path:
+                continue
+            key = os.path.basename(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            if output_folder is not None:
+                path = os.path.join(output_folder, key)
+            if not os.path.exists(path):
+                print(f"Warning: Output file of {source} not found: {path}")
+                changes['missing'] += 1
+                continue
+            signature = manifest_signature(entry)
+            status = 'added'
+            if key in slots:
+                law = self.laws[slots[key]]
+                if law['signature'] == signature:
+                    # 从其他目录运行时更新路径，短语校验才能读取原文
+                    law['path'] = path
+                    changes['kept'] += 1
+                    continue
+                self.remove_law(slots[key])
+                status = 'updated'
+            title = os.path.splitext(os.path.basename(path))[0]
+            doc_count = self.add_law(title, path, signature, pending)
+            changes[status] += 1
+            if on_law is not None:
+                on_law(title, status, doc_count)
+
+        for key, law_id in slots.items():
+            if key not in seen:
+                title = self.laws[law_id]['title']
+                self.remove_law(law_id)
+                changes['removed'] += 1
+                if on_law is not None:
+                    on_law(title, 'removed', 0)
+
+        self._flush(pending)
+        if len(self.live) and self.live.count(False) > COMPACT_RATIO * len(self.live):
+            self.compact()
+        return changes
+
+    def compact(self):
+        """
+        删除已删除的文档，重新编号文档和法律，并重写倒排表
+        """
+        live = np.array(self.live, dtype=bool)
+        new_ids = np.cumsum(live) - 1
+        law_ids = {}
+        laws = []
+        for i, law in enumerate(self.laws):
+            if law is not None:
+                law_ids[i] = len(laws)
+                law['first_doc'] = int(new_ids[law['first_doc']]) if law['doc_count'] else 0
+                laws.append(law)
+
+        terms = list(self.postings)
+        doc_ids, counts = decode_postings(b''.join(self.postings[term] for term in terms),
+                                          [len(self.postings[term]) for term in terms])
+        keep = live[doc_ids] if len(doc_ids) else np.zeros(0, dtype=bool)
+        counts = np.add.reduceat(keep.astype(np.int64), np.cumsum(counts) - counts) if len(counts) else counts
+        doc_ids = new_ids[doc_ids[keep]]
+        last_ids = doc_ids[np.cumsum(counts[counts > 0]) - 1].tolist()
+        terms = [term for term, count in zip(terms, counts.tolist()) if count]
+        encoded = encode_postings(doc_ids, counts[counts > 0], np.full(len(terms), -1))
+        postings = dict(zip(terms, encoded))
+        last_doc = dict(zip(terms, last_ids))
+
+        keep = np.flatnonzero(live).tolist()
+        self.doc_laws = [law_ids[self.doc_laws[i]] for i in keep]
+        self.doc_labels = [self.doc_labels[i] for i in keep]
+        self.doc_starts = [self.doc_starts[i] for i in keep]
+        self.doc_ends = [self.doc_ends[i] for i in keep]
+        self.live = [True] * len(keep)
+        self.laws = laws
+        self.postings = postings
+        self.last_doc = last_doc
+        self._decoded.clear()
+        self._texts.clear()
+        self._live_mask = None
+
+    @staticmethod
+    def _decode(data):
+        return (np.cumsum(decode_varints(data).astype(np.int64)) - 1).astype(np.int64)
+
+    def term_docs(self, term):
+        """
+        返回一个词项键（单字或二元字组）的文档 id 数组（含已删除文档），解码结果会被缓存
+        """
+        if term not in self._decoded:
+            data = self.postings.get(term)
+            self._decoded[term] = self._decode(data) if data else np.zeros(0, dtype=np.int64)
+        return self._decoded[term]
+
+    def doc_text(self, doc_id):
+        """
+        返回文档（条文）的原文
+        """
+        law_id = self.doc_laws[doc_id]
+        if law_id not in self._texts:
+            with open(self.laws[law_id]['path'], 'rb') as f:
+                self._texts[law_id] = f.read()
+        return self._texts[law_id][self.doc_starts[doc_id]:self.doc_ends[doc_id]].decode('utf-8', errors='replace')
+
+    def live_mask(self):
+        """
+        返回文档是否未删除的布尔数组（缓存）
+        """
+        if self._live_mask is None or len(self._live_mask) != len(self.live):
+            self._live_mask = np.array(self.live, dtype=bool)
+        return self._live_mask
+
+    def all_docs(self):
+        return np.flatnonzero(self.live_mask())
+
+    def phrase(self, text):
+        """
+        返回包含短语的未删除文档 id（已排序）；短语中的空白被忽略
+        """
+        text = normalize_text(text)
+        if not text:
+            return self.all_docs()
+        # 从最短的倒排表开始求交集
+        terms = sorted(phrase_keys(text).tolist(), key=lambda term: len(self.postings.get(term, b'')))
+        candidates = self.term_docs(terms[0])
+        for term in terms[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, self.term_docs(term), assume_unique=True)
+        candidates = candidates[self.live_mask()[candidates]] if len(candidates) else candidates
+        if len(text) <= 2:
+            return candidates
+        # 二元字组都出现不代表短语出现，用原文验证
+        return np.array([doc_id for doc_id in candidates.tolist() if text in normalize_text(self.doc_text(doc_id))],
+                        dtype=np.int64)
+
+    def search(self, query):
+        """
+        执行布尔查询，返回匹配的文档 id（已排序）
+        """
+        return _QueryParser(self, query).parse()
+
+    def hits(self, doc_ids):
+        """
+        把文档 id 转换为 [(法律标题, 条文标签)]
+        """
+        return [(self.laws[self.doc_laws[doc_id]]['title'], self.doc_labels[doc_id]) for doc_id in doc_ids]
+
+    def laws_matching(self, query):
+        """
+        返回至少有一个条文匹配查询的法律标题（按索引顺序）
+        """
+        law_ids = sorted({self.doc_laws[doc_id] for doc_id in self.search(query).tolist()})
+        return [self.laws[law_id]['title'] for law_id in law_ids]
+
+class _QueryParser:
+    """
+    递归下降的查询解析器：
+        expr := and ('OR' and)*
+        and  := not (['AND'] not)*
+        not  := 'NOT' not | '(' expr ')' | 短语
+    """
+
+    def __init__(self, index, query):
+        self.index = index
+        self.tokens = []
+        for match in QUERY_TOKEN_PATTERN.finditer(query):
+            quoted, left, right, word = match.groups()
+            if quoted is not None:
+                self.tokens.append(('phrase', quoted))
+            elif left:
+                self.tokens.append(('(', left))
+            elif right:
+                self.tokens.append((')', right))
+            elif word in OPERATORS:
+                self.tokens.append((word, word))
+            else:
+                self.tokens.append(('phrase', word))
+        self.position = 0
+
+    def _peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty query")
+        result = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.position][1]}' in query")
+        return result
+
+    def _or(self):
+        result = self._and()
+        while self._peek() == 'OR':
+            self._next()
+            result = np.union1d(result, self._and())
+        return result
+
+    def _and(self):
+        result = self._not()
+        while self._peek() in ('AND', 'NOT', '(', 'phrase'):
+            if self._peek() == 'AND':
+                self._next()
+            result = np.intersect1d(result, self._not(), assume_unique=True)
+        return result
+
+    def _not(self):
+        kind = self._peek()
+        if kind is None:
+            raise ValueError("Unexpected end of query")
+        if kind == 'NOT':
+            self._next()
+            return np.setdiff1d(self.index.all_docs(), self._not(), assume_unique=True)
+        if kind == '(':
+            self._next()
+            result = self._or()
+            if self._peek() != ')':
+                raise ValueError("Missing ')' in query")
+            self._next()
+            return result
+        if kind == 'phrase':
+            return self.index.phrase(self._next()[1])
+        raise ValueError(f"Unexpected '{self._next()[1]}' in query")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Append-Only Journal
+
+A write-ahead journal of JSON records, one per line. Each record is
+flushed to the OS as soon as it is appended, so it survives the process
+being killed (e.g. by the OOM killer). It is also fsynced at most every
+fsync_interval seconds (0 = after every record), so at most that much
+work is lost when the machine itself goes down.
+
+A crash can leave a torn last line. read_journal() stops at the first
+line that is not a complete JSON record, and Journal.open(resume=True)
+cuts the file back to the last complete record before appending again.
+"""
+
+import json
+import os
+import time
+
+def read_journal(path):
+    """
+    读取日志，返回 (记录列表, 完整记录的字节长度)；文件不存在时返回 ([], 0)
+    遇到不完整或损坏的行（崩溃时写了一半）即停止
+    """
+    records = []
+    valid_length = 0
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_length += len(line)
+    except FileNotFoundError:
+        pass
+    return records, valid_length
+
+class Journal:
+    """
+    追加写入的 JSONL 日志：每条记录立即 flush，按间隔 fsync
+    """
+
+    def __init__(self, path, fsync_interval=1.0, truncate=True):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = open(path, 'wb' if truncate else 'ab')
+        self._last_sync = time.monotonic()
+        self._dirty = False
+
+    @classmethod
+    def open(cls, path, resume=False, fsync_interval=1.0):
+        """
+        打开日志，返回 (日志, 已有记录)；resume 为 False 时清空已有日志
+        resume 为 True 时保留所有完整记录，截掉崩溃时写了一半的末尾
+        """
+        if not resume:
+            return cls(path, fsync_interval, truncate=True), []
+        records, valid_length = read_journal(path)
+        if os.path.exists(path) and os.path.getsize(path) != valid_length:
+            print(f"Warning: Discarding a torn record at the end of {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_length)
+        return cls(path, fsync_interval, truncate=False), records
+
+    def append(self, record):
+        """
+        追加一条记录
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        self._file.flush()
+        self._dirty = True
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        把已写入的记录同步到磁盘
+        """
+        if self._dirty and self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+    def remove(self):
+        """
+        关闭并删除日志（运行正常结束后调用）
+        """
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Directory Snapshot
+
+This module enumerates files with os.scandir. The file/directory type of
+each entry comes from the directory listing itself (DirEntry caches it),
+so no extra stat is needed just to tell files from directories; a stat is
+only made when size and mtime are requested. Recursive scans visit
+directories in the same top-down order as os.walk.
+
+A snapshot (path, size, mtime_ns and optionally sha256 per file) can be
+written as JSONL or CSV and read back, so later runs of the conversion
+and voting scripts can use it as their input index instead of walking
+the directory tree again.
+"""
+
+import csv
+import hashlib
+import json
+import os
+
+SNAPSHOT_FORMATS = ('jsonl', 'csv')
+SNAPSHOT_FIELDS = ['path', 'size', 'mtime_ns', 'sha256']
+
+def iter_directory(root, recursive=False):
+    """
+    生成目录下的文件 os.DirEntry；recursive=True 时按 os.walk 的自顶向下顺序递归子目录
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # DirEntry 缓存了目录项类型，这里不会产生额外的 stat
+                    if entry.is_file():
+                        yield entry
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+        except OSError as e:
+            print(f"Warning: Cannot list directory {directory}: {e}")
+        # 子目录按列出的顺序访问
+        stack.extend(reversed(subdirs))
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """
+    计算文件内容的 SHA-256（分块读取）
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def iter_snapshot(root, recursive=True, with_hash=False):
+    """
+    生成目录的快照记录 {'path', 'size', 'mtime_ns'[, 'sha256']}
+    """
+    return snapshot_records(iter_directory(root, recursive), with_hash)
+
+def snapshot_records(entries, with_hash=False):
+    """
+    为已列出的 DirEntry 生成快照记录
+    """
+    for entry in entries:
+        try:
+            stat = entry.stat()
+            record = {'path': entry.path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            if with_hash:
+                record['sha256'] = file_sha256(entry.path)
+        except OSError as e:
+            print(f"Warning: Cannot stat {entry.path}: {e}")
+            continue
+        yield record
+
+def detect_snapshot_format(file_path, snapshot_format=None):
+    """
+    确定快照格式：显式指定的格式优先，否则按扩展名判断（.csv 为 CSV，其余为 JSONL）
+    """
+    if snapshot_format:
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        return snapshot_format
+    return 'csv' if file_path.lower().endswith('.csv') else 'jsonl'
+
+def write_snapshot(records, file_path, snapshot_format=None):
+    """
+    把快照记录写入 JSONL 或 CSV 文件（先写临时文件再替换），返回写入的记录数
+    """
+    fmt = detect_snapshot_format(file_path, snapshot_format)
+    count = 0
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=SNAPSHOT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+                count += 1
+        else:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+    os.replace(tmp_path, file_path)
+    return count
+
+def read_snapshot(file_path, snapshot_format=None):
+    """
+    逐条读取快照记录，size 和 mtime_ns 转为整数，没有哈希时 sha256 为 None
+    """
+    fmt = detect_snapshot_format(file_path, snapshot_format)
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        rows = csv.DictReader(f) if fmt == 'csv' else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            yield {
+                'path': row['path'],
+                'size': int(row['size']),
+                'mtime_ns': int(row['mtime_ns']),
+                'sha256': row.get('sha256') or None,
+            }
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Stage Profiler
+
+Hot-path instrumentation for scripts/convert_raw_law_to_plaintext.py
+(--profile). Each file goes through stages such as locate (find_law_file),
+cache (manifest lookup), extract (the reader backend), hash, write and
+merge; stage_timer() adds the wall time, CPU time of this process, CPU
+time of finished child processes (antiword/catdoc) and bytes in/out of a
+block to a plain dict of stages. The dict is picklable, so worker
+processes time their own stages and return them with the result.
+
+StageProfiler collects the per-file stages, writes one JSONL trace
+record per file (and per run-level stage such as building the file
+index), and aggregates them: count, totals, MB/s and wall-time
+percentiles per stage and per extract backend, plus peak RSS. cProfile
+and tracemalloc can be switched on for the main process on request.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERCENTILES = (50, 90, 99)
+# 每个阶段记录的计数项
+STAGE_FIELDS = ('wall', 'cpu', 'child_cpu', 'bytes_in', 'bytes_out')
+
+def peak_rss_kb(children=False):
+    """
+    本进程（children 为 True 时为已结束子进程中最大者）的峰值常驻内存 KB；不支持时返回 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上 ru_maxrss 的单位是字节
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def new_stage():
+    return {field: 0.0 if field in ('wall', 'cpu', 'child_cpu') else 0 for field in STAGE_FIELDS}
+
+@contextmanager
+def stage_timer(stages, name, bytes_in=0, bytes_out=0):
+    """
+    把代码块的耗时累加到 stages[name]，返回的记录可以在块内继续累加 bytes_in/bytes_out
+    stages 为 None（未开启 --profile）时不计时
+    """
+    if stages is None:
+        yield new_stage()
+        return
+    record = stages.get(name)
+    if record is None:
+        record = stages[name] = new_stage()
+    record['bytes_in'] += bytes_in
+    record['bytes_out'] += bytes_out
+    wall, cpu, child_cpu = time.perf_counter(), time.process_time(), _children_cpu()
+    try:
+        yield record
+    finally:
+        record['wall'] += time.perf_counter() - wall
+        record['cpu'] += time.process_time() - cpu
+        record['child_cpu'] += _children_cpu() - child_cpu
+
+def aggregate_stage(records):
+    """
+    汇总同一阶段的多条记录：次数、各项总和、吞吐量和墙钟时间分位数
+    """
+    walls = np.array([record['wall'] for record in records], dtype=np.float64)
+    summary = {'count': len(records)}
+    for field in STAGE_FIELDS:
+        summary[field] = sum(record[field] for record in records)
+    processed = max(summary['bytes_in'], summary['bytes_out'])
+    summary['mb_per_sec'] = processed / 1e6 / summary['wall'] if summary['wall'] > 0 and processed else None
+    for p, value in zip(PERCENTILES, np.percentile(walls, PERCENTILES) if len(walls) else [0.0] * len(PERCENTILES)):
+        summary[f'p{p}'] = float(value)
+    summary['max'] = float(walls.max()) if len(walls) else 0.0
+    return summary
+
+class StageProfiler:
+    """
+    收集每个文件的阶段耗时，写出 JSONL 追踪并计算汇总
+    """
+
+    def __init__(self, trace_path=None, cprofile_path=None, trace_malloc=False):
+        self.trace_path = trace_path
+        self.cprofile_path = cprofile_path
+        self.trace_malloc = trace_malloc
+        self._trace = open(trace_path, 'w', encoding='utf-8') if trace_path else None
+        # {阶段: [记录]}，{后端: [extract 记录]}，{运行级阶段: 记录}
+        self.file_stages = {}
+        self.backend_stages = {}
+        self.run_stages = {}
+        self.file_count = 0
+        self.worker_peak_rss_kb = 0
+        self.tracemalloc_peak = 0
+        self._cprofile = None
+        self._snapshot = None
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+
+    def start(self):
+        if self.trace_malloc:
+            tracemalloc.start()
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def _write(self, record):
+        if self._trace is not None:
+            self._trace.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def run_stage(self, name, **fields):
+        """
+        计时一个运行级阶段（如构建文件索引、保存清单），结束时写出一条追踪记录
+        """
+        stages = {}
+        with stage_timer(stages, name) as record:
+            yield record
+        self.run_stages[name] = record
+        self._write({'type': 'run', 'stage': name, **fields, **record})
+
+    def add_file(self, title, result, stages):
+        """
+        记录一个标题的所有阶段；result 为 convert_title 的结果
+        """
+        stages = stages or {}
+        self.file_count += 1
+        for name, record in stages.items():
+            self.file_stages.setdefault(name, []).append(record)
+        backend = result.get('backend')
+        if backend and 'extract' in stages:
+            self.backend_stages.setdefault(backend, []).append(stages['extract'])
+        # 在子进程中转换时记录子进程的峰值内存
+        worker_peak = None
+        if result.get('pid') not in (None, os.getpid()):
+            worker_peak = result.get('peak_rss_kb')
+            self.worker_peak_rss_kb = max(self.worker_peak_rss_kb, worker_peak or 0)
+
+        record = {
+            'type': 'file',
+            'index': self.file_count,
+            'title': title,
+            'file': result.get('file_path'),
+            'format': result.get('file_ext'),
+            'status': result.get('status'),
+            'backend': backend,
+            'wall': sum(stage['wall'] for stage in stages.values()),
+            'cpu': sum(stage['cpu'] for stage in stages.values()),
+            'stages': stages,
+            'peak_rss_kb': peak_rss_kb(),
+            'worker_pid': result.get('pid') if worker_peak is not None else None,
+            'worker_peak_rss_kb': worker_peak,
+        }
+        if self.trace_malloc:
+            # 本文件处理期间 Python 分配的峰值，随后重置峰值
+            _, peak = tracemalloc.get_traced_memory()
+            record['tracemalloc_peak'] = peak
+            self.tracemalloc_peak = max(self.tracemalloc_peak, peak)
+            tracemalloc.reset_peak()
+        self._write(record)
+
+    def stop(self):
+        """
+        停止 cProfile/tracemalloc 并写出 cProfile 统计；只能调用一次
+        """
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+        if self.trace_malloc and tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def summary(self):
+        """
+        汇总为可序列化的字典
+        """
+        return {
+            'files': self.file_count,
+            'wall': time.perf_counter() - self._started,
+            'cpu': time.process_time() - self._started_cpu,
+            'stages': {name: aggregate_stage(records) for name, records in self.file_stages.items()},
+            'backends': {name: aggregate_stage(records) for name, records in self.backend_stages.items()},
+            'run_stages': self.run_stages,
+            'peak_rss_kb': {'main': peak_rss_kb(), 'children': peak_rss_kb(children=True),
+                            'workers': self.worker_peak_rss_kb or None},
+            'tracemalloc_peak': self.tracemalloc_peak if self.trace_malloc else None,
+        }
+
+    def format_summary(self, summary=None, top=15):
+        """
+        汇总的文本形式（写入 conversion_summary.txt 并打印），返回行列表
+        """
+        summary = summary or self.summary()
+        lines = [f"Profile: {summary['files']} titles in {summary['wall']:.2f}s wall, "
+                 f"{summary['cpu']:.2f}s CPU (main process)"]
+
+        def table(title, stages):
+            lines.append("")
+            lines.append(f"{title:<14} {'count':>6} {'wall s':>9} {'cpu s':>8} {'child s':>8} {'MB in':>9} "
+                         f"{'MB out':>9} {'MB/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for name, stage in sorted(stages.items(), key=lambda item: -item[1]['wall']):
+                mb_per_sec = f"{stage['mb_per_sec']:.2f}" if stage['mb_per_sec'] else "-"
+                lines.append(f"{name:<14} {stage['count']:>6} {stage['wall']:>9.3f} {stage['cpu']:>8.3f} "
+                             f"{stage['child_cpu']:>8.3f} {stage['bytes_in'] / 1e6:>9.2f} "
+                             f"{stage['bytes_out'] / 1e6:>9.2f} {mb_per_sec:>8} {stage['p50'] * 1000:>8.1f} "
+                             f"{stage['p90'] * 1000:>8.1f} {stage['p99'] * 1000:>8.1f} {stage['max'] * 1000:>8.1f}")
+
+        table("stage", summary['stages'])
+        if summary['backends']:
+            table("extract via", summary['backends'])
+        if summary['run_stages']:
+            lines.append("")
+            lines.append("Run stages: " + ", ".join(f"{name} {stage['wall']:.3f}s"
+                                                    for name, stage in summary['run_stages'].items()))
+        peak = summary['peak_rss_kb']
+        lines.append("Peak RSS: " + ", ".join(f"{name} {value / 1024:.1f} MB"
+                                              for name, value in peak.items() if value))
+        if summary['tracemalloc_peak'] is not None:
+            lines.append(f"tracemalloc peak per title: {summary['tracemalloc_peak'] / 1e6:.2f} MB")
+            if self._snapshot is not None:
+                lines.append("Top allocations:")
+                for stat in self._snapshot.statistics('lineno')[:top]:
+                    lines.append(f"  {stat}")
+        if self._cprofile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats('cumulative').print_stats(top)
+            lines.append(f"cProfile (main process, saved to {self.cprofile_path}):")
+            lines.extend("  " + line for line in stream.getvalue().strip().splitlines()
+                         if line.strip() and not line.lstrip().startswith(('Ordered by', 'List reduced')))
+        return lines
+
+    def close(self, summary_path=None, summary=None):
+        """
+        关闭追踪文件，并原子地写出汇总 JSON
+        """
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+        if summary_path:
+            tmp_path = summary_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(summary or self.summary(), f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, summary_path)
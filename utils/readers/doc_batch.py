@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+DOC Batch Reader
+
+This module converts many .doc files with an external tool (antiword or
+catdoc) through a bounded pool of worker threads, each driving one tool
+subprocess at a time. Every file has its own timeout and a hung process
+is killed, so a single broken document cannot stall a batch. Results are
+yielded as soon as each file finishes.
+
+antiword and catdoc have no server mode, so the pool keeps a fixed number
+of processes busy rather than reusing a single long-lived process.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.readers.doc_reader import read_doc_plaintext_antiword, read_doc_plaintext_catdoc
+
+# 单个文件的默认超时秒数
+DEFAULT_TIMEOUT = 120
+
+# 支持批量调用的外部工具后端
+BATCH_BACKENDS = {
+    'antiword': read_doc_plaintext_antiword,
+    'catdoc': read_doc_plaintext_catdoc,
+}
+
+def default_batch_workers():
+    """
+    默认的并发子进程数（CPU 核数）
+    """
+    return os.cpu_count() or 1
+
+class DocBatchReader:
+    """
+    外部工具批量读取器
+    submit() 返回 Future，其结果为文本内容，失败或超时时抛出异常
+    """
+
+    def __init__(self, backend='antiword', max_workers=None, timeout=DEFAULT_TIMEOUT):
+        if backend not in BATCH_BACKENDS:
+            raise ValueError(f"Backend {backend} does not support batch mode")
+        self.backend = backend
+        self.timeout = timeout
+        self.max_workers = max_workers or default_batch_workers()
+        self._read = BATCH_BACKENDS[backend]
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix=f"{backend}-batch")
+
+    def submit(self, file_path):
+        """
+        提交一个文件，返回 Future
+        """
+        return self._executor.submit(self._read, file_path, self.timeout)
+
+    def iter_as_completed(self, file_paths):
+        """
+        按完成顺序生成 (文件路径, 文本内容, 错误信息)
+        同时在途的文件数不超过 2 * max_workers，避免结果堆积在内存中
+        """
+        pending_paths = deque(file_paths)
+        in_flight = {}
+        while pending_paths or in_flight:
+            while pending_paths and len(in_flight) < 2 * self.max_workers:
+                file_path = pending_paths.popleft()
+                in_flight[self.submit(file_path)] = file_path
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = in_flight.pop(future)
+                try:
+                    yield file_path, future.result(), None
+                except Exception as e:
+                    yield file_path, None, str(e)
+
+    def shutdown(self, cancel_pending=True):
+        """
+        关闭线程池；cancel_pending 为 True 时取消尚未开始的文件
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
+
+def iter_doc_plaintext_batch(file_paths, backend='antiword', max_workers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    批量读取 .doc 文件，按完成顺序生成 (文件路径, 文本内容, 错误信息)
+    """
+    with DocBatchReader(backend, max_workers, timeout) as reader:
+        yield from reader.iter_as_completed(file_paths)
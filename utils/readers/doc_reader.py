@@ -5,13 +5,21 @@
 DOC File Reader
 
 This module provides functions to read text from .doc files.
-Requires pywin32 on Windows or antiword on Linux/Mac.
+Word 97-2003 files are read in-process by the OLE2/Word97 parser in
+ole_doc_reader; pywin32 on Windows or antiword/catdoc on Linux/Mac are used
+as fallbacks (e.g. for Word 6/95 or encrypted files).
 """
 
 import os
 import subprocess
 import sys
 
+from utils.readers.external_tools import tool_available, tool_path
+from utils.readers.ole_doc_reader import read_doc_plaintext_ole
+
+# 读取器输出格式的版本号；输出发生变化时递增，使转换缓存失效
+READER_VERSION = 2
+
 def read_doc_plaintext_win32(file_path):
     """
     使用 win32com 读取 .doc 文件（Windows only）
@@ -37,26 +45,25 @@ def read_doc_plaintext_win32(file_path):
     except Exception as e:
         raise Exception(f"Error reading .doc file with win32com: {e}")
 
-def read_doc_plaintext_antiword(file_path):
+def read_doc_plaintext_antiword(file_path, timeout=None):
     """
     使用 antiword 读取 .doc 文件（Linux/Mac）
+    timeout 为单个文件的超时秒数，超时后进程会被杀死
     需要安装 antiword: 
         Ubuntu/Debian: sudo apt-get install antiword
         Mac: brew install antiword
     """
     try:
-        # 检查 antiword 是否可用
-        result = subprocess.run(['antiword', '-v'], 
-                              capture_output=True, 
-                              text=True)
-        if result.returncode != 0:
-            raise Exception("antiword not found")
+        # 检查 antiword 是否可用（每个进程只查找一次）
+        if not tool_available('antiword'):
+            raise FileNotFoundError('antiword')
             
         # 使用 antiword 读取 .doc 文件
-        result = subprocess.run(['antiword', file_path], 
+        result = subprocess.run([tool_path('antiword'), file_path], 
                               capture_output=True, 
                               text=True, 
-                              encoding='utf-8')
+                              encoding='utf-8',
+                              timeout=timeout)
         
         if result.returncode == 0:
             return result.stdout
@@ -65,27 +72,30 @@ def read_doc_plaintext_antiword(file_path):
             
     except FileNotFoundError:
         raise Exception("antiword not installed. Please install antiword first.")
+    except subprocess.TimeoutExpired:
+        raise Exception(f"antiword timed out after {timeout}s and was killed")
     except Exception as e:
         raise Exception(f"Error reading .doc file with antiword: {e}")
 
-def read_doc_plaintext_catdoc(file_path):
+def read_doc_plaintext_catdoc(file_path, timeout=None):
     """
     使用 catdoc 读取 .doc 文件（Linux/Mac）
+    timeout 为单个文件的超时秒数，超时后进程会被杀死
     需要安装 catdoc:
         Ubuntu/Debian: sudo apt-get install catdoc
         Mac: brew install catdoc
     """
     try:
-        # 检查 catdoc 是否可用
-        result = subprocess.run(['catdoc', '-v'], 
-                              capture_output=True, 
-                              text=True)
+        # 检查 catdoc 是否可用（每个进程只查找一次）
+        if not tool_available('catdoc'):
+            raise FileNotFoundError('catdoc')
         
         # 使用 catdoc 读取 .doc 文件
-        result = subprocess.run(['catdoc', file_path], 
+        result = subprocess.run([tool_path('catdoc'), file_path], 
                               capture_output=True, 
                               text=True, 
-                              encoding='utf-8')
+                              encoding='utf-8',
+                              timeout=timeout)
         
         if result.returncode == 0:
             return result.stdout
@@ -94,6 +104,8 @@ def read_doc_plaintext_catdoc(file_path):
             
     except FileNotFoundError:
         raise Exception("catdoc not installed. Please install catdoc first.")
+    except subprocess.TimeoutExpired:
+        raise Exception(f"catdoc timed out after {timeout}s and was killed")
     except Exception as e:
         raise Exception(f"Error reading .doc file with catdoc: {e}")
 
@@ -126,10 +138,11 @@ def read_doc_plaintext_textutil(file_path):
     except Exception as e:
         raise Exception(f"Error reading .doc file with textutil: {e}")
 
-def read_doc_plaintext(file_path):
+def read_doc_plaintext(file_path, backend='auto'):
     """
     主函数：读取 .doc 文件并返回文本内容
-    根据操作系统自动选择合适的方法
+    backend 为 'auto' 时先使用进程内的 OLE 解析器，失败后根据操作系统选择外部工具；
+    也可以指定 DOC_BACKENDS 中的某一个后端
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -137,6 +150,17 @@ def read_doc_plaintext(file_path):
     if not file_path.lower().endswith('.doc'):
         raise ValueError(f"File is not a .doc file: {file_path}")
     
+    if backend != 'auto':
+        if backend not in DOC_BACKENDS:
+            raise ValueError(f"Unknown .doc backend: {backend}")
+        return DOC_BACKENDS[backend](file_path)
+    
+    # 进程内解析（Word 97-2003），无需启动外部进程
+    try:
+        return read_doc_plaintext_ole(file_path)
+    except Exception as e:
+        print(f"OLE method failed: {e}")
+    
     system = sys.platform
     
     # Windows 系统
@@ -203,4 +227,14 @@ def read_doc_simple(file_path):
         
         return '\n'.join(text)
     except Exception as e:
-        raise Exception(f"Simple read failed: {e}")
\ No newline at end of file
+        raise Exception(f"Simple read failed: {e}")
+
+# 可选择的 .doc 读取后端
+DOC_BACKENDS = {
+    'ole': read_doc_plaintext_ole,
+    'antiword': read_doc_plaintext_antiword,
+    'catdoc': read_doc_plaintext_catdoc,
+    'textutil': read_doc_plaintext_textutil,
+    'win32': read_doc_plaintext_win32,
+    'simple': read_doc_simple,
+}
@@ -5,54 +5,230 @@
 DOCX File Reader
 
 This module provides functions to read text from .docx files.
-Requires python-docx: pip install python-docx
+The default reader stream-parses word/document.xml directly from the zip
+archive; python-docx (pip install python-docx) is used as a fallback.
 """
 
-from docx import Document
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+# 读取器输出格式的版本号；输出发生变化时递增，使转换缓存失效
+READER_VERSION = 1
+
+# WordprocessingML 命名空间
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_HYPERLINK = W_NS + 'hyperlink'
+W_TBL = W_NS + 'tbl'
+W_TR = W_NS + 'tr'
+W_TC = W_NS + 'tc'
+W_TRPR = W_NS + 'trPr'
+W_TCPR = W_NS + 'tcPr'
+
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+PACKAGE_RELS_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+def _main_document_part(archive):
+    """
+    从 _rels/.rels 中找到主文档部件的路径（通常是 word/document.xml）
+    """
+    try:
+        rels = ET.fromstring(archive.read('_rels/.rels'))
+        for rel in rels.iter(PACKAGE_RELS_NS + 'Relationship'):
+            if rel.get('Type') == OFFICE_DOCUMENT_REL:
+                return posixpath.normpath(rel.get('Target').lstrip('/'))
+    except KeyError:
+        pass
+    return 'word/document.xml'
+
+def _run_text(r):
+    """
+    与 python-docx 的 Run.text 相同：只转换 w:r 的直接子元素
+    """
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W_NS + 't':
+            parts.append(child.text or '')
+        elif tag == W_NS + 'tab' or tag == W_NS + 'ptab':
+            parts.append('\t')
+        elif tag == W_NS + 'br':
+            # 只有换行型的 br 转为换行，分页符和分栏符为空
+            if child.get(W_NS + 'type', 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag == W_NS + 'cr':
+            parts.append('\n')
+        elif tag == W_NS + 'noBreakHyphen':
+            parts.append('-')
+    return ''.join(parts)
+
+def _paragraph_text(p):
+    """
+    与 python-docx 的 Paragraph.text 相同：只包含直接子元素 w:r 和 w:hyperlink
+    """
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == W_R)
+    return ''.join(parts)
+
+def _int_val(parent, tag, default):
+    """
+    读取 parent/tag/@w:val 整数属性
+    """
+    if parent is not None:
+        el = parent.find(tag)
+        if el is not None:
+            try:
+                return int(el.get(W_NS + 'val'))
+            except (TypeError, ValueError):
+                pass
+    return default
+
+def iter_docx_plaintext_stream(file_path):
+    """
+    流式解析 .docx 的主文档 XML，逐行生成纯文本
+    输出与 read_docx_plaintext_python_docx 相同：先输出正文段落，再输出顶层表格的各行
+    （单元格以 ' | ' 连接，合并单元格按 python-docx 的方式重复）；
+    每个段落和表格行处理完后立即从树中删除，内存占用与文档大小无关
+    """
+    table_rows = []
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(_main_document_part(archive)) as xml_stream:
+            stack = []
+            cell_paragraphs = []
+            row_cells = []
+            prev_row = {}
+
+            for event, elem in ET.iterparse(xml_stream, events=('start', 'end')):
+                if event == 'start':
+                    stack.append(elem)
+                    if elem.tag == W_TBL and len(stack) == 3 and stack[1].tag == W_BODY:
+                        prev_row = {}
+                    continue
+
+                stack.pop()
+                parent = stack[-1] if stack else None
+                depth = len(stack)
+                tag = elem.tag
+
+                if tag == W_P:
+                    if depth == 2 and parent.tag == W_BODY:
+                        text = _paragraph_text(elem)
+                        if text:
+                            yield text
+                    elif depth == 5 and parent.tag == W_TC and stack[2].tag == W_TBL:
+                        # 顶层表格单元格中的段落 (document/body/tbl/tr/tc/p)
+                        cell_paragraphs.append(_paragraph_text(elem))
+                    # 段落处理完毕后删除，避免整棵树留在内存中
+                    del parent[-1]
+                elif tag == W_TC and depth == 4 and stack[2].tag == W_TBL:
+                    tc_pr = elem.find(W_TCPR)
+                    v_merge = None
+                    if tc_pr is not None:
+                        v_merge_el = tc_pr.find(W_NS + 'vMerge')
+                        if v_merge_el is not None:
+                            v_merge = v_merge_el.get(W_NS + 'val', 'continue')
+                    row_cells.append(('\n'.join(cell_paragraphs),
+                                      _int_val(tc_pr, W_NS + 'gridSpan', 1),
+                                      v_merge))
+                    cell_paragraphs = []
+                    del parent[-1]
+                elif tag == W_TR and depth == 3 and parent.tag == W_TBL:
+                    offset = _int_val(elem.find(W_TRPR), W_NS + 'gridBefore', 0)
+                    cells = []
+                    current_row = {}
+                    for text, span, v_merge in row_cells:
+                        if v_merge == 'continue':
+                            # 纵向合并的后续单元格取上一行同一网格位置的内容
+                            if offset not in prev_row:
+                                raise ValueError(f"no `tc` element at grid_offset={offset}")
+                            text = prev_row[offset]
+                        current_row[offset] = text
+                        cells.extend([text] * span)
+                        offset += span
+                    row_text = [text for text in cells if text]
+                    if row_text:
+                        table_rows.append(' | '.join(row_text))
+                    prev_row = current_row
+                    row_cells = []
+                    del parent[-1]
+                elif tag == W_TBL and parent is not None:
+                    # 顶层表格，或单元格中的嵌套表格（python-docx 不输出嵌套表格）
+                    del parent[-1]
+
+    yield from table_rows
+
+def read_docx_plaintext_stream(file_path):
+    """
+    使用流式 XML 解析读取 .docx 文件（不依赖 python-docx）
+    """
+    return "\n".join(iter_docx_plaintext_stream(file_path))
+
+def read_docx_plaintext_python_docx(file_path):
+    """
+    使用 python-docx 读取 .docx 文件并返回纯文本内容
+    需要安装 python-docx: pip install python-docx
+    """
+    from docx import Document
+
+    doc = Document(file_path)
+    full_text = []
+
+    # 读取所有段落
+    for para in doc.paragraphs:
+        if para.text:
+            full_text.append(para.text)
+
+    # 读取表格中的文本
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = []
+            for cell in row.cells:
+                if cell.text:
+                    row_text.append(cell.text)
+            if row_text:
+                full_text.append(' | '.join(row_text))
+
+    return "\n".join(full_text)
 
 def read_docx_plaintext(file_path):
     """
     读取 .docx 文件并返回纯文本内容
+    优先使用流式解析，失败时回退到 python-docx
     """
     try:
-        doc = Document(file_path)
-        full_text = []
-        
-        # 读取所有段落
-        for para in doc.paragraphs:
-            if para.text:
-                full_text.append(para.text)
-        
-        # 读取表格中的文本
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = []
-                for cell in row.cells:
-                    if cell.text:
-                        row_text.append(cell.text)
-                if row_text:
-                    full_text.append(' | '.join(row_text))
-        
-        return "\n".join(full_text)
-        
-    except Exception as e:
-        raise Exception(f"Error reading .docx file: {e}")
+        return read_docx_plaintext_stream(file_path)
+    except Exception as stream_error:
+        try:
+            return read_docx_plaintext_python_docx(file_path)
+        except ImportError:
+            raise Exception(f"Error reading .docx file: {stream_error}")
+        except Exception as e:
+            raise Exception(f"Error reading .docx file: {e}")
 
 def read_docx_with_formatting(file_path):
     """
     读取 .docx 文件，保留基本格式信息（可选）
     """
     try:
+        from docx import Document
+
         doc = Document(file_path)
         paragraphs_info = []
-        
+
         for para in doc.paragraphs:
             para_info = {
                 'text': para.text,
                 'style': para.style.name if para.style else 'Normal',
                 'runs': []
             }
-            
+
             # 获取每个run的格式信息
             for run in para.runs:
                 run_info = {
@@ -63,11 +239,11 @@ def read_docx_with_formatting(file_path):
                 }
                 if run_info['text']:
                     para_info['runs'].append(run_info)
-            
+
             if para_info['text']:
                 paragraphs_info.append(para_info)
-        
+
         return paragraphs_info
-        
+
     except Exception as e:
-        raise Exception(f"Error reading .docx file: {e}")
\ No newline at end of file
+        raise Exception(f"Error reading .docx file: {e}")
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+External Tool Helpers
+
+This module locates command-line converters (antiword, catdoc, textutil,
+pdftotext, ...) once per process and caches the result, so readers do not
+spawn a probe process before every document.
+"""
+
+import shutil
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def tool_path(name):
+    """
+    返回外部工具的完整路径，未安装时返回 None（每个进程只查找一次）
+    """
+    return shutil.which(name)
+
+def tool_available(name):
+    """
+    判断外部工具是否可用
+    """
+    return tool_path(name) is not None
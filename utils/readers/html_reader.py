@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTML File Reader
+
+This module provides functions to read text from .html/.htm files using
+the standard library HTML parser (no external dependencies).
+"""
+
+import re
+from html.parser import HTMLParser
+
+from utils.readers.text_reader import read_txt_plaintext
+
+# 读取器输出格式的版本号；输出发生变化时递增，使转换缓存失效
+READER_VERSION = 1
+
+# 这些元素结束时换行
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'tr', 'table', 'section', 'article',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'title',
+}
+# 这些元素的内容不是正文
+SKIP_TAGS = {'script', 'style', 'head', 'noscript'}
+
+class _TextExtractor(HTMLParser):
+    """
+    收集 HTML 中的可见文本，块级元素之间插入换行，表格单元格以 ' | ' 分隔
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in ('td', 'th'):
+            self.parts.append(' | ')
+        elif tag == 'br':
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+def read_html_plaintext(file_path):
+    """
+    读取 .html/.htm 文件并返回纯文本内容
+    """
+    try:
+        parser = _TextExtractor()
+        parser.feed(read_txt_plaintext(file_path))
+        parser.close()
+        text = ''.join(parser.parts)
+    except Exception as e:
+        raise Exception(f"Error reading .html file: {e}")
+
+    lines = []
+    for line in text.split('\n'):
+        # 合并空白并去掉行首的单元格分隔符
+        line = re.sub(r'[ \t　]+', ' ', line).strip()
+        if line.startswith('| '):
+            line = line[2:]
+        if line:
+            lines.append(line)
+    return '\n'.join(lines)
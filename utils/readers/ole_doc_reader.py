@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+OLE2 / Word97 DOC Reader
+
+This module extracts text from Word 97-2003 .doc files in-process, without
+antiword, catdoc or Word. It parses the OLE compound file (CFB) container,
+then the Word File Information Block (FIB) and the piece table (Clx) to
+decode both compressed (cp1252) and UTF-16 text runs.
+
+Only the main document text is returned; Word 6/95 files and encrypted
+files are rejected so that callers can fall back to external tools.
+"""
+
+import bisect
+import struct
+
+CFB_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# 特殊扇区编号
+MAXREGSECT = 0xFFFFFFFA
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+# 目录项类型
+STGTY_STORAGE = 1
+STGTY_STREAM = 2
+STGTY_ROOT = 5
+
+WORD_IDENT = 0xA5EC
+# Word 97 的 nFib；更早的版本（Word 6/95）使用不同的文件格式
+MIN_WORD97_NFIB = 101
+
+# FIB 中的标志位
+FIB_FLAG_ENCRYPTED = 0x0100
+FIB_FLAG_WHICH_TABLE = 0x0200
+
+# FibRgFcLcb97 中 fcPlcfBtePapx/lcbPlcfBtePapx 和 fcClx/lcbClx 的序号
+FC_PLCF_BTE_PAPX_INDEX = 13
+FC_CLX_INDEX = 33
+
+# 段落属性 FKP 页的大小，以及表示“行结束标记”的 sprmPFTtp
+FKP_SIZE = 512
+SPRM_P_F_TTP = 0x2417
+# 操作数长度特殊的 sprm：sprmTDefTable（2 字节长度）和 sprmPChgTabs
+SPRM_T_DEF_TABLE = 0xD608
+SPRM_P_CHG_TABS = 0xC615
+# 按 spra（sprm 的高 3 位）确定的操作数长度，None 表示变长
+SPRA_OPERAND_SIZES = (1, 1, 2, 4, 2, 2, None, 3)
+
+class OleFileError(Exception):
+    """
+    OLE 复合文档或 Word 二进制结构无法解析
+    """
+
+class OleCompoundFile:
+    """
+    最小化的 OLE 复合文档（CFB）读取器，只支持读取根存储下的流
+    """
+
+    def __init__(self, data):
+        if len(data) < 512 or data[:8] != CFB_SIGNATURE:
+            raise OleFileError("Not an OLE compound file")
+        self.data = data
+
+        (major_version, byte_order, sector_shift, mini_sector_shift) = struct.unpack_from('<HHHH', data, 0x1A)
+        if byte_order != 0xFFFE:
+            raise OleFileError("Invalid byte order mark in OLE header")
+        self.major_version = major_version
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+
+        (first_dir_sector, _, self.mini_stream_cutoff, first_minifat_sector,
+         num_minifat_sectors, first_difat_sector, num_difat_sectors) = struct.unpack_from('<IIIIIII', data, 0x30)
+
+        self.fat = self._load_fat(first_difat_sector, num_difat_sectors)
+        self.entries = self._load_directory(first_dir_sector)
+
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root['start'], root['size'])
+        if num_minifat_sectors and first_minifat_sector < MAXREGSECT:
+            minifat_data = self._read_chain(first_minifat_sector)
+            self.minifat = list(struct.unpack_from(f'<{len(minifat_data) // 4}I', minifat_data))
+        else:
+            self.minifat = []
+
+    def _sector(self, sector):
+        """
+        返回指定扇区的数据（扇区 0 紧跟在 512 字节的文件头之后）
+        """
+        offset = (sector + 1) * self.sector_size
+        if offset >= len(self.data):
+            raise OleFileError(f"Sector {sector} beyond end of file")
+        return self.data[offset:offset + self.sector_size]
+
+    def _load_fat(self, first_difat_sector, num_difat_sectors):
+        """
+        通过文件头中的 109 个 DIFAT 项及 DIFAT 扇区链读取 FAT
+        """
+        difat = list(struct.unpack_from('<109I', self.data, 0x4C))
+        entries_per_sector = self.sector_size // 4
+        sector = first_difat_sector
+        for _ in range(num_difat_sectors):
+            if sector >= MAXREGSECT:
+                break
+            values = struct.unpack(f'<{entries_per_sector}I', self._sector(sector))
+            difat.extend(values[:-1])
+            sector = values[-1]
+
+        fat = []
+        for fat_sector in difat:
+            if fat_sector >= MAXREGSECT:
+                continue
+            fat.extend(struct.unpack(f'<{entries_per_sector}I', self._sector(fat_sector)))
+        return fat
+
+    def _read_chain(self, start, size=None):
+        """
+        沿 FAT 链读取一个普通流；size 为 None 时读取整条链
+        """
+        chunks = []
+        sector = start
+        visited = 0
+        while sector < MAXREGSECT:
+            if sector >= len(self.fat) or visited > len(self.fat):
+                raise OleFileError("Corrupted FAT chain")
+            chunks.append(self._sector(sector))
+            sector = self.fat[sector]
+            visited += 1
+        data = b''.join(chunks)
+        return data if size is None else data[:size]
+
+    def _read_mini_chain(self, start, size):
+        """
+        沿 MiniFAT 链从迷你流中读取一个小流
+        """
+        chunks = []
+        sector = start
+        visited = 0
+        step = self.mini_sector_size
+        while sector < MAXREGSECT:
+            if sector >= len(self.minifat) or visited > len(self.minifat):
+                raise OleFileError("Corrupted MiniFAT chain")
+            chunks.append(self.mini_stream[sector * step:(sector + 1) * step])
+            sector = self.minifat[sector]
+            visited += 1
+        return b''.join(chunks)[:size]
+
+    def _load_directory(self, first_dir_sector):
+        """
+        解析目录项（每项 128 字节）
+        """
+        data = self._read_chain(first_dir_sector)
+        entries = []
+        for offset in range(0, len(data) - 127, 128):
+            name_length, entry_type = struct.unpack_from('<HB', data, offset + 64)
+            left, right, child = struct.unpack_from('<III', data, offset + 68)
+            start, size_low, size_high = struct.unpack_from('<III', data, offset + 116)
+            name = data[offset:offset + max(name_length - 2, 0)].decode('utf-16-le', errors='replace')
+            # 版本 3 的文件中大小的高 32 位可能是垃圾数据
+            size = size_low if self.major_version == 3 else size_low | (size_high << 32)
+            entries.append({
+                'name': name,
+                'type': entry_type,
+                'left': left,
+                'right': right,
+                'child': child,
+                'start': start,
+                'size': size,
+            })
+        if not entries or entries[0]['type'] != STGTY_ROOT:
+            raise OleFileError("Missing root directory entry")
+        return entries
+
+    def root_stream_names(self):
+        """
+        返回根存储下所有流的 {名称: 目录项序号}（遍历目录的红黑树）
+        """
+        names = {}
+        pending = [self.entries[0]['child']]
+        seen = set()
+        while pending:
+            index = pending.pop()
+            if index == NOSTREAM or index >= len(self.entries) or index in seen:
+                continue
+            seen.add(index)
+            entry = self.entries[index]
+            if entry['type'] == STGTY_STREAM:
+                names[entry['name']] = index
+            pending.append(entry['left'])
+            pending.append(entry['right'])
+        return names
+
+    def open_stream(self, name):
+        """
+        读取根存储下指定名称的流，不存在时抛出 OleFileError
+        """
+        index = self.root_stream_names().get(name)
+        if index is None:
+            raise OleFileError(f"Stream not found: {name}")
+        entry = self.entries[index]
+        if entry['size'] < self.mini_stream_cutoff:
+            return self._read_mini_chain(entry['start'], entry['size'])
+        return self._read_chain(entry['start'], entry['size'])
+
+def _build_compressed_map():
+    """
+    压缩文本按 cp1252 解码；cp1252 中未定义的字节（如 0x81）保留为同值字符
+    """
+    table = {}
+    for b in range(0x80, 0xA0):
+        try:
+            table[b] = bytes([b]).decode('cp1252')
+        except UnicodeDecodeError:
+            pass
+    return table
+
+_COMPRESSED_MAP = _build_compressed_map()
+
+def _decode_compressed(raw):
+    """
+    解码压缩（8 位）文本片段
+    """
+    return raw.decode('latin-1').translate(_COMPRESSED_MAP)
+
+def _read_piece_table(word_stream, table_stream, fc_clx, lcb_clx):
+    """
+    解析 Clx 结构，返回 [(起始 CP, 结束 CP, fc, 是否压缩)]
+    """
+    clx = table_stream[fc_clx:fc_clx + lcb_clx]
+    pos = 0
+    while pos < len(clx):
+        clxt = clx[pos]
+        if clxt == 0x01:
+            # Prc：属性修饰，跳过
+            (cb_grpprl,) = struct.unpack_from('<H', clx, pos + 1)
+            pos += 3 + cb_grpprl
+        elif clxt == 0x02:
+            (lcb,) = struct.unpack_from('<I', clx, pos + 1)
+            plc = clx[pos + 5:pos + 5 + lcb]
+            count = (lcb - 4) // 12
+            cps = struct.unpack_from(f'<{count + 1}I', plc, 0)
+            pieces = []
+            for i in range(count):
+                (fc,) = struct.unpack_from('<I', plc, 4 * (count + 1) + 8 * i + 2)
+                compressed = bool(fc & 0x40000000)
+                fc &= 0x3FFFFFFF
+                pieces.append((cps[i], cps[i + 1], fc // 2 if compressed else fc, compressed))
+            return pieces
+        else:
+            raise OleFileError(f"Invalid Clx entry type: {clxt:#x}")
+    raise OleFileError("Piece table (Pcdt) not found")
+
+def _grpprl_has_ttp(grpprl):
+    """
+    段落的 grpprl 中是否包含 sprmPFTtp=1（该段落是表格的行结束标记）
+    """
+    pos = 0
+    while pos + 2 <= len(grpprl):
+        (sprm,) = struct.unpack_from('<H', grpprl, pos)
+        pos += 2
+        if sprm == SPRM_P_F_TTP:
+            return pos < len(grpprl) and grpprl[pos] != 0
+        size = SPRA_OPERAND_SIZES[sprm >> 13]
+        if sprm == SPRM_T_DEF_TABLE:
+            if pos + 2 > len(grpprl):
+                break
+            # cb 为其后内容的长度 + 1
+            size = 2 + struct.unpack_from('<H', grpprl, pos)[0] - 1
+        elif sprm == SPRM_P_CHG_TABS and pos < len(grpprl) and grpprl[pos] == 255:
+            # 长度为 255 时结构更复杂，不影响正文，停止解析
+            break
+        elif size is None:
+            if pos >= len(grpprl):
+                break
+            size = 1 + grpprl[pos]
+        pos += size
+    return False
+
+def _read_row_end_runs(word_stream, table_stream, fc_plcf, lcb_plcf):
+    """
+    解析段落属性（PlcBtePapx 和 PAPX FKP），返回行结束段落的 WordDocument 字节范围 [(起始 fc, 结束 fc)]
+    """
+    if lcb_plcf < 4 or fc_plcf + lcb_plcf > len(table_stream):
+        raise OleFileError("Paragraph property table (PlcBtePapx) not found")
+    count = (lcb_plcf - 4) // 8
+    plc = table_stream[fc_plcf:fc_plcf + lcb_plcf]
+    page_numbers = struct.unpack_from(f'<{count}I', plc, 4 * (count + 1))
+    runs = []
+    for page_number in page_numbers:
+        offset = (page_number & 0x3FFFFF) * FKP_SIZE
+        fkp = word_stream[offset:offset + FKP_SIZE]
+        if len(fkp) < FKP_SIZE:
+            raise OleFileError(f"PAPX FKP page {page_number} out of range")
+        crun = fkp[FKP_SIZE - 1]
+        fcs = struct.unpack_from(f'<{crun + 1}I', fkp, 0)
+        for i in range(crun):
+            # BxPap 的第一个字节为 PapxInFkp 的位置（以 2 字节为单位），0 表示没有属性
+            papx = fkp[4 * (crun + 1) + 13 * i] * 2
+            if papx == 0:
+                continue
+            cb = fkp[papx]
+            if cb:
+                grpprl_and_istd = fkp[papx + 1:papx + 2 * cb]
+            else:
+                grpprl_and_istd = fkp[papx + 2:papx + 2 + 2 * fkp[papx + 1]]
+            # 跳过开头 2 字节的 istd
+            if _grpprl_has_ttp(grpprl_and_istd[2:]):
+                runs.append((fcs[i], fcs[i + 1]))
+    runs.sort()
+    return runs
+
+def _clean_word_text(text, row_ends=None):
+    """
+    将 Word 的控制字符转换为纯文本：
+    段落标记转换为换行，表格单元格以 ' | ' 连接，域只保留显示结果
+    row_ends 为行结束标记（\x07）在 text 中的位置；为 None（段落属性无法解析）时
+    把连续两个单元格标记视为行结束
+    """
+    if row_ends is None:
+        row_ends = set()
+        i = text.find('\x07\x07')
+        while i >= 0:
+            row_ends.add(i + 1)
+            i = text.find('\x07\x07', i + 2)
+    out = []
+    # 域嵌套栈，元素表示当前是否处于域代码（而非域结果）部分
+    field_stack = []
+    for i, ch in enumerate(text):
+        if ch == '\x13':
+            field_stack.append(True)
+            continue
+        if ch == '\x14':
+            if field_stack:
+                field_stack[-1] = False
+            continue
+        if ch == '\x15':
+            if field_stack:
+                field_stack.pop()
+            continue
+        if field_stack and field_stack[-1]:
+            continue
+
+        if ch in '\r\x0b\x0c\x0e':
+            out.append('\n')
+        elif ch == '\x07':
+            if i in row_ends:
+                # 行结束：去掉最后一个单元格后的分隔符
+                if out and out[-1] == ' | ':
+                    out[-1] = '\n'
+                else:
+                    out.append('\n')
+            else:
+                out.append(' | ')
+        elif ch == '\x1e':
+            out.append('-')
+        elif ch == '\t' or ch >= ' ':
+            out.append(ch)
+        # 其余控制字符（图片、脚注引用、可选连字符等）直接丢弃
+
+    return ''.join(out)
+
+def read_doc_text(data):
+    """
+    从 .doc 文件的字节内容中提取正文文本
+    """
+    ole = OleCompoundFile(data)
+    word_stream = ole.open_stream('WordDocument')
+    if len(word_stream) < 0x1AA:
+        raise OleFileError("WordDocument stream too short")
+
+    w_ident, n_fib = struct.unpack_from('<HH', word_stream, 0)
+    if w_ident != WORD_IDENT:
+        raise OleFileError("Invalid Word FIB identifier")
+    if n_fib < MIN_WORD97_NFIB:
+        raise OleFileError(f"Unsupported Word version (nFib={n_fib}), Word 97 or later is required")
+
+    (flags,) = struct.unpack_from('<H', word_stream, 0x0A)
+    if flags & FIB_FLAG_ENCRYPTED:
+        raise OleFileError("Encrypted .doc files are not supported")
+    table_stream = ole.open_stream('1Table' if flags & FIB_FLAG_WHICH_TABLE else '0Table')
+
+    # FibBase(32) + csw + fibRgW + cslw + fibRgLw + cbRgFcLcb + fibRgFcLcbBlob
+    (csw,) = struct.unpack_from('<H', word_stream, 32)
+    rg_lw_offset = 34 + csw * 2 + 2
+    (cslw,) = struct.unpack_from('<H', word_stream, rg_lw_offset - 2)
+    (ccp_text,) = struct.unpack_from('<i', word_stream, rg_lw_offset + 12)
+    rg_fc_lcb_offset = rg_lw_offset + cslw * 4 + 2
+    fc_clx, lcb_clx = struct.unpack_from('<II', word_stream, rg_fc_lcb_offset + FC_CLX_INDEX * 8)
+    fc_papx, lcb_papx = struct.unpack_from('<II', word_stream, rg_fc_lcb_offset + FC_PLCF_BTE_PAPX_INDEX * 8)
+    # 表格行结束标记由段落属性（TTP）确定；解析失败时退回到文本规则
+    try:
+        row_end_runs = _read_row_end_runs(word_stream, table_stream, fc_papx, lcb_papx)
+        row_end_starts = [start for start, _ in row_end_runs]
+        row_ends = set()
+    except (OleFileError, struct.error):
+        row_end_runs = row_ends = None
+
+    parts = []
+    length = 0
+    for cp_start, cp_end, fc, compressed in _read_piece_table(word_stream, table_stream, fc_clx, lcb_clx):
+        # 只提取正文部分（CP 小于 ccpText），不含脚注、页眉等
+        if cp_start >= ccp_text:
+            break
+        count = min(cp_end, ccp_text) - cp_start
+        if compressed:
+            part = _decode_compressed(word_stream[fc:fc + count])
+        else:
+            part = word_stream[fc:fc + 2 * count].decode('utf-16-le', errors='replace')
+        if row_end_runs:
+            i = part.find('\x07')
+            while i >= 0:
+                position = fc + (i if compressed else 2 * i)
+                run = bisect.bisect_right(row_end_starts, position) - 1
+                if run >= 0 and position < row_end_runs[run][1]:
+                    row_ends.add(length + i)
+                i = part.find('\x07', i + 1)
+        parts.append(part)
+        length += len(part)
+
+    return _clean_word_text(''.join(parts), row_ends)
+
+def read_doc_plaintext_ole(file_path):
+    """
+    纯 Python 读取 .doc 文件（Word 97-2003），不依赖任何外部程序
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return read_doc_text(data)
+    except Exception as e:
+        raise Exception(f"Error reading .doc file with OLE parser: {e}")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PDF File Reader
+
+This module provides functions to read text from .pdf files with the
+local pdftotext tool (poppler-utils):
+    Ubuntu/Debian: sudo apt-get install poppler-utils
+    Mac: brew install poppler
+"""
+
+import subprocess
+
+from utils.readers.external_tools import tool_path
+
+# 读取器输出格式的版本号；输出发生变化时递增，使转换缓存失效
+READER_VERSION = 1
+
+def read_pdf_plaintext_pdftotext(file_path, timeout=None):
+    """
+    使用 pdftotext 读取 .pdf 文件（保留版面布局，输出 UTF-8）
+    """
+    executable = tool_path('pdftotext')
+    if executable is None:
+        raise Exception("pdftotext not installed. Please install poppler-utils first.")
+
+    try:
+        result = subprocess.run([executable, '-layout', '-enc', 'UTF-8', file_path, '-'],
+                                capture_output=True,
+                                timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise Exception(f"pdftotext timed out after {timeout}s")
+
+    if result.returncode != 0:
+        raise Exception(f"pdftotext error: {result.stderr.decode('utf-8', errors='replace')}")
+    return result.stdout.decode('utf-8', errors='replace').replace('\f', '\n')
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reader Registry
+
+This module maps file extensions to reader backends. Each backend declares
+the extensions it handles, a priority (lower is faster / preferred) and an
+optional probe that checks whether it can run on this machine. Probes are
+run once per process and cached, and read_plaintext() uses the fastest
+available backend, falling back to the next one if it fails on a file.
+
+New formats register themselves with register_backend(); callers such as
+scripts/convert_raw_law_to_plaintext.py do not need to change.
+"""
+
+import importlib.util
+import os
+import sys
+
+from utils.readers import doc_reader, docx_reader, html_reader, pdf_reader, text_reader
+from utils.readers.external_tools import tool_available
+
+class ReaderBackend:
+    """
+    一个读取后端：名称、支持的扩展名、读取函数、优先级、版本和可用性探测函数
+    """
+
+    def __init__(self, name, extensions, read, priority=100, version=1, probe=None):
+        self.name = name
+        self.extensions = [ext.lower() for ext in extensions]
+        self.read = read
+        self.priority = priority
+        self.version = version
+        self.probe = probe
+
+    def __repr__(self):
+        return f"ReaderBackend({self.name!r}, {self.extensions}, priority={self.priority})"
+
+# 按注册顺序保存的所有后端
+_BACKENDS = []
+# 探测结果缓存 {后端名称: 是否可用}
+_PROBE_CACHE = {}
+
+def register_backend(name, extensions, read, priority=100, version=1, probe=None):
+    """
+    注册一个读取后端；同名后端会被替换
+    extensions 为带点的扩展名列表，如 ['.pdf']
+    probe 为无参数函数，返回该后端在当前环境中是否可用（结果会被缓存）
+    """
+    unregister_backend(name)
+    backend = ReaderBackend(name, extensions, read, priority, version, probe)
+    _BACKENDS.append(backend)
+    return backend
+
+def unregister_backend(name):
+    """
+    移除指定名称的后端
+    """
+    _BACKENDS[:] = [backend for backend in _BACKENDS if backend.name != name]
+    _PROBE_CACHE.pop(name, None)
+
+def get_backend(name):
+    """
+    按名称查找后端，不存在时返回 None
+    """
+    for backend in _BACKENDS:
+        if backend.name == name:
+            return backend
+    return None
+
+def backend_available(backend):
+    """
+    返回后端是否可用；每个后端在每个进程中只探测一次
+    """
+    if backend.name not in _PROBE_CACHE:
+        try:
+            _PROBE_CACHE[backend.name] = bool(backend.probe()) if backend.probe else True
+        except Exception:
+            _PROBE_CACHE[backend.name] = False
+    return _PROBE_CACHE[backend.name]
+
+def supported_extensions():
+    """
+    返回所有已注册的扩展名，按首次注册的顺序排列（即文件查找时的优先顺序）
+    """
+    extensions = []
+    for backend in _BACKENDS:
+        for ext in backend.extensions:
+            if ext not in extensions:
+                extensions.append(ext)
+    return extensions
+
+def backends_for(ext, include_unavailable=False):
+    """
+    返回处理指定扩展名的后端列表，按优先级排序（默认只包含可用的后端）
+    """
+    ext = ext.lower() if ext.startswith('.') else '.' + ext.lower()
+    backends = [backend for backend in _BACKENDS if ext in backend.extensions]
+    if not include_unavailable:
+        backends = [backend for backend in backends if backend_available(backend)]
+    return sorted(backends, key=lambda backend: backend.priority)
+
+def read_plaintext(file_path, backend=None):
+    """
+    读取文件并返回 (文本内容, 实际使用的后端名称)
+    未指定 backend 时按优先级依次尝试可用的后端，全部失败时抛出异常并附带各后端的错误
+    """
+    ext = os.path.splitext(file_path)[1]
+    if backend is not None:
+        selected = get_backend(backend)
+        if selected is None or ext.lower() not in selected.extensions:
+            raise Exception(f"Backend {backend} does not support {ext} files")
+        if not backend_available(selected):
+            raise Exception(f"Backend {backend} is not available on this system")
+        candidates = [selected]
+    else:
+        candidates = backends_for(ext)
+        if not candidates:
+            raise Exception(f"Unsupported file format: {ext} (no available reader backend)")
+
+    errors = []
+    for candidate in candidates:
+        try:
+            return candidate.read(file_path), candidate.name
+        except Exception as e:
+            errors.append(f"{candidate.name}: {e}")
+    raise Exception("; ".join(errors))
+
+def _module_available(module_name):
+    """
+    判断 Python 模块是否已安装（不导入该模块）
+    """
+    return importlib.util.find_spec(module_name) is not None
+
+def _register_builtin_backends():
+    """
+    注册内置的读取后端；注册顺序决定查找文件时扩展名的优先级（.docx 优先于 .doc）
+    """
+    register_backend('docx-stream', ['.docx'], docx_reader.read_docx_plaintext_stream,
+                     priority=10, version=docx_reader.READER_VERSION)
+    register_backend('python-docx', ['.docx'], docx_reader.read_docx_plaintext_python_docx,
+                     priority=50, version=docx_reader.READER_VERSION,
+                     probe=lambda: _module_available('docx'))
+
+    register_backend('ole', ['.doc'], doc_reader.read_doc_plaintext_ole,
+                     priority=10, version=doc_reader.READER_VERSION)
+    register_backend('win32', ['.doc'], doc_reader.read_doc_plaintext_win32,
+                     priority=20, version=doc_reader.READER_VERSION,
+                     probe=lambda: sys.platform == 'win32' and _module_available('win32com'))
+    register_backend('textutil', ['.doc'], doc_reader.read_doc_plaintext_textutil,
+                     priority=30, version=doc_reader.READER_VERSION,
+                     probe=lambda: sys.platform == 'darwin' and tool_available('textutil'))
+    register_backend('antiword', ['.doc'], doc_reader.read_doc_plaintext_antiword,
+                     priority=40, version=doc_reader.READER_VERSION,
+                     probe=lambda: tool_available('antiword'))
+    register_backend('catdoc', ['.doc'], doc_reader.read_doc_plaintext_catdoc,
+                     priority=50, version=doc_reader.READER_VERSION,
+                     probe=lambda: tool_available('catdoc'))
+
+    register_backend('text', ['.txt'], text_reader.read_txt_plaintext,
+                     priority=10, version=text_reader.READER_VERSION)
+    register_backend('html', ['.html', '.htm'], html_reader.read_html_plaintext,
+                     priority=10, version=html_reader.READER_VERSION)
+    register_backend('pdftotext', ['.pdf'], pdf_reader.read_pdf_plaintext_pdftotext,
+                     priority=40, version=pdf_reader.READER_VERSION,
+                     probe=lambda: tool_available('pdftotext'))
+
+_register_builtin_backends()
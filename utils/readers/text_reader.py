@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+TXT File Reader
+
+This module provides functions to read plain-text law files, trying the
+encodings commonly used for Chinese statutes.
+"""
+
+# 读取器输出格式的版本号；输出发生变化时递增，使转换缓存失效
+READER_VERSION = 1
+
+# 依次尝试的编码
+TEXT_ENCODINGS = ['utf-8-sig', 'gb18030', 'utf-16']
+
+def read_txt_plaintext(file_path):
+    """
+    读取 .txt 文件，依次尝试 UTF-8、GB18030 和 UTF-16 编码
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding).replace('\r\n', '\n')
+        except UnicodeDecodeError:
+            continue
+    raise Exception(f"Error reading .txt file: unknown encoding ({', '.join(TEXT_ENCODINGS)} failed)")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vote File Ingestion
+
+This module feeds voter files into a VoteEngine. File paths are produced
+lazily (os.walk order), files are read concurrently by a thread pool,
+and each file's lines are de-duplicated into a set while it is being
+read. Results are merged into the engine as soon as they are ready, in
+input order, with at most a small window of files in flight, so peak
+memory stays close to the size of the item vocabulary.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.filesystem.snapshot import file_sha256
+
+def iter_files(paths, warn=print):
+    """
+    惰性生成要处理的文件路径；目录会被递归展开（与 os.walk 的顺序相同）
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+        elif os.path.isdir(path):
+            for root, dirs, filenames in os.walk(path):
+                for filename in filenames:
+                    yield os.path.join(root, filename)
+        else:
+            warn(f"Warning: {path} is not a valid file or directory")
+
+def file_fingerprint(file_path, with_hash=True):
+    """
+    返回文件指纹 {'size', 'mtime_ns', 'sha256'}（with_hash=False 时不计算哈希）
+    """
+    stat = os.stat(file_path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        fingerprint['sha256'] = file_sha256(file_path)
+    return fingerprint
+
+def read_item_set(file_path, fingerprint=False):
+    """
+    流式读取文件，返回 (去重后的条目集合, 非空行数, 文件字节数, 错误信息, 文件指纹)
+    读取出错时返回已读取的部分；fingerprint=False 时文件指纹为 None
+    """
+    items = set()
+    line_count = 0
+    size = 0
+    error = None
+    file_print = None
+    try:
+        if fingerprint:
+            # 先记录指纹，读取期间文件被修改时下次运行会重新读取
+            file_print = file_fingerprint(file_path)
+            size = file_print['size']
+        else:
+            size = os.path.getsize(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:  # 跳过空行
+                    items.add(line)
+                    line_count += 1
+    except Exception as e:
+        error = str(e)
+    return items, line_count, size, error, file_print
+
+class IngestStats:
+    """
+    读取进度和吞吐量统计
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.lines = 0
+        self.bytes = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def add(self, line_count, size, error):
+        self.files += 1
+        self.lines += line_count
+        self.bytes += size
+        if error:
+            self.errors += 1
+
+    def report(self, unique_items):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{self.files} files, {self.lines} lines, {self.bytes / 1e6:.1f} MB, "
+                f"{unique_items} unique items in {elapsed:.2f}s "
+                f"({self.files / elapsed:.1f} files/s, {self.bytes / 1e6 / elapsed:.1f} MB/s)")
+
+def ingest_files(engine, file_paths, max_workers=8, on_file=None, progress_interval=None,
+                 weight_of=None, fingerprint=False):
+    """
+    用线程池并发读取文件并按输入顺序合并到投票引擎
+    on_file(file_path, line_count, error, fingerprint) 在每个文件合并后调用
+    progress_interval 为进度报告的间隔秒数（None 表示不报告）
+    weight_of(file_path) 返回文件权重（默认均为 1）；fingerprint=True 时同时计算文件指纹
+    返回 IngestStats
+    """
+    stats = IngestStats()
+    last_report = stats.started
+    window = max(1, max_workers) * 2
+    pending = deque()
+
+    def merge(file_path, future):
+        nonlocal last_report
+        items, line_count, size, error, file_print = future.result()
+        weight = weight_of(file_path) if weight_of is not None else 1.0
+        engine.add_file(file_path, items, line_count=line_count, weight=weight)
+        stats.add(line_count, size, error)
+        if on_file is not None:
+            on_file(file_path, line_count, error, file_print)
+        now = time.perf_counter()
+        if progress_interval is not None and now - last_report >= progress_interval:
+            print(f"  Progress: {stats.report(len(engine))}")
+            last_report = now
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for file_path in file_paths:
+            pending.append((file_path, executor.submit(read_item_set, file_path, fingerprint)))
+            # 限制同时在读的文件数，已完成的文件立即合并并释放其集合
+            while len(pending) >= window:
+                merge(*pending.popleft())
+        while pending:
+            merge(*pending.popleft())
+    return stats
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persisted Vote Tallies
+
+This module keeps the state of scripts/vote_items.py between runs in one
+.npz file: the item vocabulary, every counted file with its fingerprint
+(size, mtime, sha256), weight and line count, and each file's item ids.
+
+On the next run TallyStore.sync() compares the current file list with
+the stored fingerprints. Only new or modified files are read; files that
+disappeared are subtracted, and unchanged files are reused without being
+read again. A file whose mtime changed but whose size did not is hashed
+first and reused when its SHA-256 still matches. Each of these updates touches only the items of that file, so an
+annotation round that adds one file costs O(items in that file) instead
+of a full re-read of every list.
+"""
+
+import json
+import os
+from collections import Counter, deque
+
+import numpy as np
+
+from utils.voting.ingest import file_fingerprint, ingest_files
+from utils.voting.vote_engine import VoteEngine
+
+STORE_VERSION = 1
+
+class TallyStore:
+    """
+    持久化的计票：投票引擎加上每个文件的指纹
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.engine = VoteEngine()
+        # {文件路径: {'size', 'mtime_ns', 'sha256'}}
+        self.fingerprints = {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取计票文件；文件不存在、损坏或版本不匹配时返回空的计票
+        """
+        store = cls(path)
+        if not os.path.exists(path):
+            return store
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                ids = data['ids']
+                offsets = data['offsets']
+            if meta.get('version') != STORE_VERSION:
+                raise ValueError(f"unsupported version {meta.get('version')}")
+        except Exception as e:
+            print(f"Warning: Failed to load tally store {path}: {e}")
+            return store
+
+        engine = store.engine
+        engine.items = meta['items']
+        engine.item_ids = {item: i for i, item in enumerate(engine.items)}
+        for i, entry in enumerate(meta['files']):
+            column = ids[offsets[i]:offsets[i + 1]].astype(np.int64)
+            engine.add_column(entry['path'], column, entry['line_count'], entry['weight'])
+            store.fingerprints[entry['path']] = entry['fingerprint']
+        return store
+
+    def save(self):
+        """
+        原子地写出计票文件（先写临时文件再替换）
+        """
+        engine = self.engine
+        engine.compact()
+        columns = engine.columns
+        offsets = np.zeros(len(columns) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(column) for column in columns])
+        ids = np.concatenate(columns).astype(np.int32) if columns else np.zeros(0, dtype=np.int32)
+        meta = {
+            'version': STORE_VERSION,
+            'items': engine.items,
+            'files': [{
+                'path': path,
+                'line_count': line_count,
+                'weight': weight,
+                'fingerprint': self.fingerprints.get(path, {}),
+            } for path, line_count, weight in zip(engine.files, engine.line_counts, engine.weights)],
+        }
+
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8),
+                         ids=ids, offsets=offsets)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Failed to save tally store {self.path}: {e}")
+
+    def sync(self, file_paths, weight_of=None, max_workers=8, on_file=None, on_reuse=None,
+             progress_interval=None):
+        """
+        使计票与当前的文件列表一致：
+        - 指纹（大小和修改时间）未变的文件直接复用，只在权重改变时更新加权票数
+        - 大小未变但修改时间变了的文件比较 SHA-256，内容相同时同样复用，只更新指纹
+        - 新文件和被修改的文件重新读取（被修改的文件先撤销旧的投票）
+        - 不在列表中的文件撤销其投票
+        与不使用计票文件时一样，列表中重复出现的文件每次出现都计一票
+        读取出错的文件不保存指纹（下次运行重新读取），计入 unreadable 而不是 added/replaced
+        on_reuse(file_path, line_count) 在复用文件时调用，其余参数同 ingest_files
+        返回 (IngestStats, {'reused', 'added', 'replaced', 'removed', 'unreadable'})
+        """
+        engine = self.engine
+        changes = {'reused': 0, 'added': 0, 'replaced': 0, 'removed': 0, 'unreadable': 0}
+        # 已提交读取的文件是新增还是替换（ingest_files 按输入顺序合并，与回调顺序一致）
+        read_kinds = deque()
+        # 每个路径在上次计票中还可复用的份数（重复列出的文件有多份）
+        reusable = Counter(engine.files)
+        reused_weights = {}
+        seen = set()
+
+        def unchanged(file_path):
+            old = self.fingerprints.get(file_path) or {}
+            try:
+                stat = os.stat(file_path)
+                if stat.st_size == old.get('size') and stat.st_mtime_ns == old.get('mtime_ns'):
+                    return True
+                if stat.st_size != old.get('size') or not old.get('sha256'):
+                    return False
+                fingerprint = file_fingerprint(file_path)
+            except OSError:
+                return False
+            if fingerprint['sha256'] != old['sha256']:
+                return False
+            self.fingerprints[file_path] = fingerprint
+            return True
+
+        def files_to_read():
+            for file_path in file_paths:
+                if file_path not in seen:
+                    seen.add(file_path)
+                    if reusable[file_path] and not unchanged(file_path):
+                        for _ in range(reusable[file_path]):
+                            engine.remove_file(file_path)
+                        reusable[file_path] = 0
+                        read_kinds.append('replaced')
+                        yield file_path
+                        continue
+                if reusable[file_path]:
+                    reusable[file_path] -= 1
+                    reused_weights[file_path] = weight_of(file_path) if weight_of is not None else 1.0
+                    changes['reused'] += 1
+                    if on_reuse is not None:
+                        on_reuse(file_path, engine.line_count(file_path))
+                    continue
+                read_kinds.append('added')
+                yield file_path
+
+        def record(file_path, line_count, error, fingerprint):
+            # 读取出错的文件不保存指纹，下次运行会重新读取
+            kind = read_kinds.popleft()
+            if error or fingerprint is None:
+                self.fingerprints.pop(file_path, None)
+                changes['unreadable'] += 1
+            else:
+                self.fingerprints[file_path] = fingerprint
+                changes[kind] += 1
+            if on_file is not None:
+                on_file(file_path, line_count, error, fingerprint)
+
+        stats = ingest_files(engine, files_to_read(), max_workers=max_workers, on_file=record,
+                             progress_interval=progress_interval, weight_of=weight_of, fingerprint=True)
+
+        # 撤销不在列表中的文件以及比上次少列出的重复份数
+        for file_path, count in reusable.items():
+            for _ in range(count):
+                engine.remove_file(file_path)
+                changes['removed'] += 1
+            if file_path not in seen:
+                self.fingerprints.pop(file_path, None)
+        for position, file_path in enumerate(engine.files):
+            weight = reused_weights.get(file_path)
+            if weight is not None and weight != engine.weights[position]:
+                engine.set_weight(file_path, weight, position)
+        return stats, changes
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vote Engine
+
+This module backs scripts/vote_items.py. Every distinct item (a law title)
+is interned to an integer id once. Each voter file is then stored as a
+sorted NumPy array of the item ids it contains (its column of the
+item x file membership matrix), and vote counts are kept in one integer
+array updated with vectorised adds. Memory therefore grows with the
+number of distinct items and file memberships, not with total lines read.
+
+Files can carry weights and can be removed again in O(items in that
+file), which lets utils/voting/tally_store.py update persisted tallies
+incrementally. The full membership matrix (boolean or bit-packed) and
+pairwise file agreement are available for inter-annotator statistics.
+"""
+
+import numpy as np
+
+class VoteEngine:
+    """
+    投票引擎：条目映射为整数 id，每个文件保存为一列条目 id，票数用 NumPy 数组统计
+    """
+
+    def __init__(self):
+        # 条目 -> id，以及 id -> 条目
+        self.item_ids = {}
+        self.items = []
+        # 每个文件的路径、读取的行数（含重复行）和权重；移除的文件先留下空位（路径为 None），
+        # 读取文件列表时再一次性整理
+        self._files = []
+        self._line_counts = []
+        self._weights = []
+        # 每个文件包含的条目 id（已排序、去重）
+        self._columns = []
+        # 路径 -> 该路径仍在计票中的位置列表（同一路径可能重复出现）
+        self.file_positions = {}
+        self._removed = 0
+        # 每个条目的票数和加权票数
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._weight_sums = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        """
+        至少有一票的条目数（移除文件后票数为 0 的条目不计）
+        """
+        return int(np.count_nonzero(self.vote_counts()))
+
+    @property
+    def file_count(self):
+        return len(self._files) - self._removed
+
+    @property
+    def files(self):
+        self._compact_files()
+        return self._files
+
+    @property
+    def line_counts(self):
+        self._compact_files()
+        return self._line_counts
+
+    @property
+    def weights(self):
+        self._compact_files()
+        return self._weights
+
+    @property
+    def columns(self):
+        self._compact_files()
+        return self._columns
+
+    def _compact_files(self):
+        """
+        去掉移除文件留下的空位并重建 file_positions（O(文件数)，只在有空位时进行）
+        """
+        if not self._removed:
+            return
+        keep = [i for i, file_path in enumerate(self._files) if file_path is not None]
+        self._files = [self._files[i] for i in keep]
+        self._line_counts = [self._line_counts[i] for i in keep]
+        self._weights = [self._weights[i] for i in keep]
+        self._columns = [self._columns[i] for i in keep]
+        self.file_positions = {}
+        for i, file_path in enumerate(self._files):
+            self.file_positions.setdefault(file_path, []).append(i)
+        self._removed = 0
+
+    def intern(self, item):
+        """
+        返回条目的 id，新条目分配下一个 id
+        """
+        item_id = self.item_ids.get(item)
+        if item_id is None:
+            item_id = len(self.items)
+            self.item_ids[item] = item_id
+            self.items.append(item)
+        return item_id
+
+    def _grow(self):
+        """
+        条目数增加时扩展票数数组（按倍数扩展，均摊 O(1)）
+        """
+        if len(self._counts) < len(self.items):
+            size = max(len(self.items), 2 * len(self._counts))
+            counts = np.zeros(size, dtype=np.int64)
+            counts[:len(self._counts)] = self._counts
+            weight_sums = np.zeros(size, dtype=np.float64)
+            weight_sums[:len(self._weight_sums)] = self._weight_sums
+            self._counts, self._weight_sums = counts, weight_sums
+
+    def add_file(self, file_path, items, line_count=None, weight=1.0):
+        """
+        加入一个文件的投票；items 为条目的可迭代对象，文件内重复的条目只计一票
+        line_count 为读取的行数（默认为 items 的长度），weight 为该文件的权重
+        返回该文件的条目 id 数组
+        """
+        if not isinstance(items, (list, tuple, set, frozenset)):
+            items = list(items)
+        column = np.unique(np.fromiter((self.intern(item) for item in items),
+                                       dtype=np.int64, count=len(items)))
+        return self.add_column(file_path, column, len(items) if line_count is None else line_count, weight)
+
+    def add_column(self, file_path, column, line_count, weight=1.0):
+        """
+        直接用已去重的条目 id 数组加入一个文件（用于从持久化的计票中恢复）
+        """
+        self._grow()
+        # column 已去重，可以直接按下标累加
+        self._counts[column] += 1
+        self._weight_sums[column] += weight
+
+        self.file_positions.setdefault(file_path, []).append(len(self._files))
+        self._files.append(file_path)
+        self._line_counts.append(line_count)
+        self._weights.append(weight)
+        self._columns.append(column)
+        return column
+
+    def remove_file(self, file_path):
+        """
+        撤销一个文件的投票，只更新该文件包含的条目；同一路径重复出现时撤销最后一次
+        文件的位置留下空位，连续移除多个文件时不需要反复移动列表
+        """
+        positions = self.file_positions[file_path]
+        position = positions.pop()
+        if not positions:
+            del self.file_positions[file_path]
+        column = self._columns[position]
+        self._counts[column] -= 1
+        self._weight_sums[column] -= self._weights[position]
+        self._files[position] = None
+        self._line_counts[position] = 0
+        self._weights[position] = 0.0
+        self._columns[position] = column[:0]
+        self._removed += 1
+
+    def line_count(self, file_path):
+        """
+        返回文件读取的行数（同一路径重复出现时为最后一次）
+        """
+        return self._line_counts[self.file_positions[file_path][-1]]
+
+    def set_weight(self, file_path, weight, position=None):
+        """
+        修改一个文件的权重，只更新该文件包含的条目
+        position 指定重复出现的文件中的哪一次（默认为最后一次）
+        """
+        if position is None:
+            position = self.file_positions[file_path][-1]
+        self._weight_sums[self._columns[position]] += weight - self._weights[position]
+        self._weights[position] = weight
+
+    def vote_counts(self):
+        """
+        返回每个条目的票数数组（按条目 id 索引）
+        """
+        return self._counts[:len(self.items)]
+
+    def weighted_counts(self):
+        """
+        返回每个条目的加权票数数组（按条目 id 索引）
+        """
+        return self._weight_sums[:len(self.items)]
+
+    def total_weight(self):
+        """
+        所有文件的权重之和
+        """
+        return float(sum(self._weights))
+
+    def counts_by_item(self):
+        """
+        返回 {条目: 票数}，按条目首次出现的顺序
+        """
+        return {item: count for item, count in zip(self.items, self.vote_counts().tolist()) if count}
+
+    def select(self, threshold):
+        """
+        返回票数 >= threshold 的条目，按字母顺序排序
+        """
+        counts = self.vote_counts()
+        selected_ids = np.flatnonzero((counts >= threshold) & (counts > 0))
+        return sorted(self.items[i] for i in selected_ids)
+
+    def select_quorum(self, ratio, min_votes=1):
+        """
+        加权法定票数规则：加权票数 >= ratio * 总权重，且至少有 min_votes 个文件投票
+        所有权重为 1 时与 select(文件数 * ratio) 的结果相同
+        """
+        counts = self.vote_counts()
+        mask = (self.weighted_counts() >= self.total_weight() * ratio) & (counts >= max(min_votes, 1))
+        return sorted(self.items[i] for i in np.flatnonzero(mask))
+
+    def compact(self):
+        """
+        删除票数为 0 的条目并重新编号（移除文件之后使用）
+        """
+        self._compact_files()
+        counts = self.vote_counts()
+        weight_sums = self.weighted_counts()
+        keep = counts > 0
+        if keep.all():
+            return
+        remap = np.cumsum(keep) - 1
+        self.items = [item for item, kept in zip(self.items, keep) if kept]
+        self.item_ids = {item: i for i, item in enumerate(self.items)}
+        self._columns = [remap[column] for column in self._columns]
+        self._counts = counts[keep].copy()
+        self._weight_sums = weight_sums[keep].copy()
+
+    def merge_items(self, aliases):
+        """
+        把别名条目并入其规范条目 {别名: 规范条目}（例如同一部法律的不同版本），
+        同一文件中同时出现的别名和规范条目只计一票；返回被合并的条目数
+        """
+        present = [(self.item_ids[alias], canonical) for alias, canonical in aliases.items()
+                   if alias in self.item_ids and alias != canonical]
+        if not present:
+            return 0
+        targets = [self.intern(canonical) for _, canonical in present]
+        self._grow()
+        remap = np.arange(len(self.items))
+        for (alias_id, _), target in zip(present, targets):
+            remap[alias_id] = target
+
+        self._columns = [np.unique(remap[column]) for column in self.columns]
+        ids = np.concatenate(self.columns) if self.columns else np.zeros(0, dtype=np.int64)
+        weights = np.repeat(self.weights, [len(column) for column in self.columns])
+        self._counts = np.bincount(ids, minlength=len(self.items)).astype(np.int64)
+        self._weight_sums = np.bincount(ids, weights=weights, minlength=len(self.items))
+        self.compact()
+        return len(present)
+
+    def vote_distribution(self):
+        """
+        返回 {票数: 条目数}，只包含至少有一个条目的票数
+        """
+        distribution = np.bincount(self.vote_counts(), minlength=1)
+        return {votes: int(n) for votes, n in enumerate(distribution) if n and votes > 0}
+
+    def matrix(self):
+        """
+        返回 条目 x 文件 的布尔成员矩阵
+        """
+        membership = np.zeros((len(self.items), len(self.files)), dtype=bool)
+        for j, column in enumerate(self.columns):
+            membership[column, j] = True
+        return membership
+
+    def packed_matrix(self):
+        """
+        返回按条目打包为位图的成员矩阵，形状为 (ceil(条目数 / 8), 文件数)
+        """
+        return np.packbits(self.matrix(), axis=0)
+
+    def agreement(self):
+        """
+        返回文件两两之间的一致度 (交集数, Jaccard 系数) 两个 文件 x 文件 矩阵
+        """
+        membership = self.matrix().astype(np.int64)
+        intersection = membership.T @ membership
+        sizes = np.diag(intersection)
+        union = sizes[:, None] + sizes[None, :] - intersection
+        # 两个文件都为空时视为完全一致
+        jaccard = np.where(union > 0, intersection / np.maximum(union, 1), 1.0)
+        return intersection, jaccard